@@ -0,0 +1,203 @@
+# benchmarks/executar_benchmark.py
+#
+# Executa o pipeline completo (Bronze → Silver → Gold) sobre dados sintéticos em várias
+# escalas e grava um arquivo de resultados comparável entre execuções.
+#
+# Uso:
+#   python executar_benchmark.py --escalas 10k 100k 1m
+#   python executar_benchmark.py --escalas 1m --paralelo --comparar resultados/benchmark_<anterior>.json
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+DIRETORIO_BENCHMARKS = Path(__file__).resolve().parent
+sys.path.insert(0, str(DIRETORIO_BENCHMARKS.parent / "src"))
+
+from gerar_dados import SEMENTE_PADRAO, gerar_dados  # noqa: E402
+
+# Escalas nomeadas: número de eventos no log de auditoria
+ESCALAS = {
+    "10k": 10_000,
+    "100k": 100_000,
+    "1m": 1_000_000,
+    "10m": 10_000_000,
+    "100m": 100_000_000,
+}
+ESCALAS_PADRAO = ["10k", "100k", "1m"]
+
+DIRETORIO_DADOS_SINTETICOS = DIRETORIO_BENCHMARKS / "dados"
+DIRETORIO_RESULTADOS = DIRETORIO_BENCHMARKS / "resultados"
+
+
+def _rodar_pipeline(fontes, opcoes):
+    """
+    Executa as três camadas medindo cada uma (e seus passos internos) com instrumentacao.py.
+    Roda dentro de um processo próprio por escala, para o pico de memória ser só dela.
+    """
+    import contextlib
+    import io
+
+    from bronze import processar_camada_bronze
+    from contexto import ContextoPipeline
+    from gold import processar_camada_gold
+    from instrumentacao import etapa, iniciar_execucao
+    from silver import processar_camada_silver
+
+    rastreador = iniciar_execucao()
+    resultados = {}
+    with tempfile.TemporaryDirectory(prefix="benchmark_coe_") as diretorio_dados, \
+            contextlib.redirect_stdout(io.StringIO()), \
+            ContextoPipeline(diretorio_dados, opcoes["formato"]) as contexto:
+        with etapa("bronze") as medida:
+            resultados["bronze"] = processar_camada_bronze(
+                modo_streaming=opcoes["streaming"], formato=opcoes["formato"],
+                diretorio_dados=diretorio_dados, fontes_de_dados=fontes
+            )
+            medida.linhas_saida = sum(resultados["bronze"].values())
+        with etapa("silver") as medida:
+            resultados["silver"] = processar_camada_silver(
+                formato=opcoes["formato"], diretorio_dados=diretorio_dados,
+                usuarios_aproximados=opcoes["usuarios_aproximados"],
+                paralelo=opcoes["paralelo"], trabalhadores=opcoes["trabalhadores"], contexto=contexto
+            )
+            medida.linhas_saida = sum(resultados["silver"].values())
+        with etapa("gold") as medida:
+            resultados["gold"] = processar_camada_gold(formato=opcoes["formato"], diretorio_dados=diretorio_dados,
+                                                       contexto=contexto)
+            medida.linhas_saida = sum((resultados["gold"] or {}).values())
+    return rastreador.relatorio(resultados=resultados)
+
+
+def medir_escala(nome, linhas_auditoria, opcoes):
+    """
+    Gera (ou reaproveita) os dados da escala e mede o pipeline em um subprocesso.
+    """
+    fontes = gerar_dados(DIRETORIO_DADOS_SINTETICOS / nome, linhas_auditoria, opcoes["semente"])
+    with tempfile.NamedTemporaryFile("r", suffix=".json") as saida:
+        comando = [sys.executable, __file__, "--interno", json.dumps({"fontes": fontes, "opcoes": opcoes}), saida.name]
+        subprocess.run(comando, check=True)
+        relatorio = json.load(open(saida.name, encoding="utf-8"))
+
+    etapas = {}
+    for e in relatorio["etapas"]:
+        registro = etapas.setdefault(e["nome"], {"duracao_s": 0.0, "cpu_s": 0.0, "linhas_entrada": None, "linhas_saida": None})
+        registro["duracao_s"] += e["duracao_s"]
+        registro["cpu_s"] += e["cpu_s"]
+        registro["linhas_entrada"] = e["linhas_entrada"]
+        registro["linhas_saida"] = e["linhas_saida"]
+        if e["erro"]:
+            registro["erro"] = e["erro"]
+
+    # Vazão de cada camada em eventos de auditoria por segundo (a medida que cresce com a escala)
+    for camada in ("bronze", "silver", "gold"):
+        if camada in etapas and etapas[camada]["duracao_s"] > 0:
+            etapas[camada]["eventos_por_s"] = linhas_auditoria / etapas[camada]["duracao_s"]
+
+    return {
+        "linhas_auditoria": linhas_auditoria,
+        "duracao_total_s": sum(etapas[c]["duracao_s"] for c in ("bronze", "silver", "gold") if c in etapas),
+        "pico_memoria_mb": relatorio["pico_memoria_mb"],
+        "resultados": relatorio["metadados"]["resultados"],
+        "etapas": etapas,
+    }
+
+
+def ambiente_execucao():
+    import numpy
+    import pandas
+    import pyarrow
+    return {
+        "python": platform.python_version(),
+        "pandas": pandas.__version__,
+        "numpy": numpy.__version__,
+        "pyarrow": pyarrow.__version__,
+        "plataforma": platform.platform(),
+        "processador": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def comparar(atual, anterior):
+    """
+    Imprime, por escala e etapa, a duração anterior, a atual e a razão entre elas.
+    """
+    print(f"\n{'Escala':>6} {'Etapa':<50} {'Antes (s)':>10} {'Agora (s)':>10} {'Razão':>7}")
+    for escala, medidas in atual["escalas"].items():
+        base = anterior["escalas"].get(escala)
+        if base is None:
+            continue
+        for nome, etapa in medidas["etapas"].items():
+            if nome not in base["etapas"]:
+                continue
+            antes, agora = base["etapas"][nome]["duracao_s"], etapa["duracao_s"]
+            razao = agora / antes if antes > 0 else float("nan")
+            alerta = "  ⚠️" if razao > 1.25 and agora - antes > 0.5 else ""
+            print(f"{escala:>6} {nome:<50} {antes:>10.3f} {agora:>10.3f} {razao:>6.2f}x{alerta}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark do pipeline CoE com dados sintéticos")
+    parser.add_argument("--escalas", nargs="+", default=ESCALAS_PADRAO, choices=sorted(ESCALAS))
+    parser.add_argument("--semente", type=int, default=SEMENTE_PADRAO)
+    parser.add_argument("--formato", choices=("csv", "parquet"), default="csv")
+    parser.add_argument("--streaming", action="store_true")
+    parser.add_argument("--paralelo", action="store_true")
+    parser.add_argument("--trabalhadores", type=int, default=None)
+    parser.add_argument("--usuarios-aproximados", action="store_true")
+    parser.add_argument("--comparar", default=None, help="Arquivo de resultados anterior para comparação")
+    parser.add_argument("--saida", default=None, help="Arquivo de resultados (padrão: resultados/benchmark_<data>.json)")
+    args = parser.parse_args(argv)
+
+    opcoes = {
+        "semente": args.semente,
+        "formato": args.formato,
+        "streaming": args.streaming,
+        "paralelo": args.paralelo,
+        "trabalhadores": args.trabalhadores,
+        "usuarios_aproximados": args.usuarios_aproximados,
+    }
+    resultado = {
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "ambiente": ambiente_execucao(),
+        "opcoes": opcoes,
+        "escalas": {},
+    }
+    for nome in args.escalas:
+        print(f"\n=== Escala {nome} ({ESCALAS[nome]} eventos de auditoria) ===")
+        medidas = medir_escala(nome, ESCALAS[nome], opcoes)
+        resultado["escalas"][nome] = medidas
+        memoria = medidas["pico_memoria_mb"]
+        print(f"Total: {medidas['duracao_total_s']:.2f}s, pico de memória: "
+              f"{f'{memoria:.0f} MB' if memoria is not None else 'não medido'}")
+        for camada in ("bronze", "silver", "gold"):
+            if camada in medidas["etapas"]:
+                e = medidas["etapas"][camada]
+                vazao = f", {e['eventos_por_s']:,.0f} eventos/s" if "eventos_por_s" in e else ""
+                falha = "" if medidas["resultados"].get(camada) else " (sem resultados: camada falhou)"
+                print(f"  {camada}: {e['duracao_s']:.2f}s{vazao}{falha}")
+
+    saida = Path(args.saida) if args.saida else \
+        DIRETORIO_RESULTADOS / f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    saida.parent.mkdir(parents=True, exist_ok=True)
+    saida.write_text(json.dumps(resultado, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"\nResultados gravados em {saida}")
+
+    if args.comparar:
+        comparar(resultado, json.loads(Path(args.comparar).read_text(encoding="utf-8")))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "--interno":
+        # Processo filho: mede uma escala e grava o relatório no arquivo indicado
+        parametros = json.loads(sys.argv[2])
+        relatorio = _rodar_pipeline(parametros["fontes"], parametros["opcoes"])
+        Path(sys.argv[3]).write_text(json.dumps(relatorio, default=str), encoding="utf-8")
+    else:
+        main()
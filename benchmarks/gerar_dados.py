@@ -0,0 +1,235 @@
+# benchmarks/gerar_dados.py
+#
+# Gera exportações sintéticas do CoE Starter Kit (apps, ambientes, usuários e log de
+# auditoria) em qualquer escala, de forma determinística pela semente.
+#
+# Uso: python gerar_dados.py --linhas-auditoria 1000000 --destino ./dados/1m
+
+import argparse
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+SEMENTE_PADRAO = 42
+
+# Linhas do log de auditoria geradas e gravadas por vez (limita a memória em escalas grandes)
+LINHAS_POR_BLOCO = 1_000_000
+
+# Tipos de app do CoE: 597910002 e 597910003 são formulários (o último, SharePointFormApp)
+TIPOS_APP = np.array(['597910000', '597910001', '597910002', '597910003'])
+PESOS_TIPOS_APP = [0.55, 0.25, 0.08, 0.12]
+
+NOMES_BASE = ["Portal", "Aprovações", "Inventário", "Reembolso", "Chamados", "Férias", "Visitas", "Contratos"]
+SUFIXOS_NOME = ["", "", "", " Teste", " Demo", " Forms", " Formulário", " COE Settings", " System"]
+
+ARQUIVOS = {
+    "apps": "admin_apps.csv",
+    "ambientes": "admin_environments.csv",
+    "auditoria": "admin_auditlog.csv",
+    "usuarios": "admin_powerplatformusers.csv",
+}
+
+
+def dimensoes_para(linhas_auditoria):
+    """
+    Tamanho das tabelas de cadastro proporcional ao volume do log de auditoria.
+    """
+    apps = int(np.clip(linhas_auditoria // 100, 300, 500_000))
+    return {
+        "apps": apps,
+        "usuarios": int(np.clip(apps * 2, 100, 1_000_000)),
+        "ambientes": int(np.clip(apps // 100, 8, 2_000)),
+    }
+
+
+def _guids(prefixo, n):
+    # GUIDs determinísticos e únicos: o prefixo identifica a tabela de origem
+    return np.array([f"{i:08x}-{prefixo}-4000-8000-{i * 2654435761 % 16 ** 12:012x}" for i in range(n)], dtype=object)
+
+
+def _popularidade(rng, n, expoente=1.1):
+    """
+    Pesos com cauda longa (poucos apps/usuários concentram a maior parte do uso).
+    """
+    pesos = 1.0 / np.arange(1, n + 1) ** expoente
+    rng.shuffle(pesos)
+    return pesos / pesos.sum()
+
+
+def _datas(rng, n, inicio, fim, vazias=0.0):
+    """
+    Datas aleatórias como texto, misturando os formatos que aparecem nas exportações
+    (com e sem fração de 7 dígitos) e uma fração de valores vazios.
+    """
+    segundos = rng.integers(0, int((fim - inicio).total_seconds()), n)
+    datas = pd.Series(inicio + pd.to_timedelta(segundos, unit="s"))
+    texto = datas.dt.strftime("%Y-%m-%d %H:%M:%S")
+    com_fracao = rng.random(n) < 0.5
+    texto[com_fracao] = texto[com_fracao] + ".0000000"
+    texto[rng.random(n) < vazias] = ""
+    return texto.to_numpy(dtype=object)
+
+
+def gerar_ambientes(rng, n):
+    ids = _guids("e000", n)
+    nomes = ["eletrobras"] + [f"Ambiente {i:04d}" for i in range(1, n)]
+    # Exportações reais trazem espaços no cabeçalho e nas chaves
+    return pd.DataFrame({
+        " admin_environmentid": [f" {guid} " if i % 3 == 0 else guid for i, guid in enumerate(ids)],
+        "admin_displayname": nomes,
+        "admin_environmenttype": rng.choice(["Production", "Sandbox", "Developer", "Default"], n),
+        "admin_environmentregion": rng.choice(["brazil", "unitedstates", "europe"], n),
+    }), ids
+
+
+def gerar_usuarios(rng, n):
+    ids = _guids("a000", n)
+    emails = np.array([f"usuario{i}@empresa.com.br" for i in range(n)], dtype=object)
+    upns = emails.copy()
+    # Parte dos usuários sem UPN: o pipeline usa o e-mail como alternativa
+    upns[rng.random(n) < 0.1] = None
+    return pd.DataFrame({
+        "admin_recordguidasstring": ids,
+        "admin_useremail": emails,
+        "admin_userprincipalname": upns,
+        "admin_displayname": [f"Usuário {i}" for i in range(n)],
+        "admin_department": rng.choice(["TI", "Financeiro", "RH", "Operação", "Jurídico", None], n),
+    }), ids, emails
+
+
+def gerar_apps(rng, n, ids_ambientes, ids_usuarios, colunas_extras=20):
+    ids = _guids("b000", n)
+    n_ambientes = len(ids_ambientes)
+    ambiente = ids_ambientes[rng.integers(0, n_ambientes, n)].astype(object)
+    # Prefixo "Default-" no ID do ambiente padrão e espaços nas chaves
+    prefixo = rng.random(n) < 0.2
+    ambiente[prefixo] = "Default-" + ambiente[prefixo]
+    espacos = rng.random(n) < 0.1
+    ambiente[espacos] = " " + ambiente[espacos] + " "
+
+    # Proprietários: a maioria existe na tabela de usuários, alguns ausentes ou desconhecidos
+    dono = ids_usuarios[rng.integers(0, len(ids_usuarios), n)].astype(object)
+    sorteio = rng.random(n)
+    dono[sorteio < 0.05] = None
+    dono[(sorteio >= 0.05) & (sorteio < 0.07)] = _guids("dead", int(((sorteio >= 0.05) & (sorteio < 0.07)).sum()))
+
+    editores = rng.integers(0, 6, n).astype(float)
+    editores[rng.random(n) < 0.3] = np.nan
+
+    inicio, fim = pd.Timestamp("2021-01-01"), pd.Timestamp("2025-06-30")
+    df = pd.DataFrame({
+        "admin_appid": ids,
+        "admin_displayname": [
+            f"{NOMES_BASE[i % len(NOMES_BASE)]} {i}{SUFIXOS_NOME[j]}"
+            for i, j in enumerate(rng.integers(0, len(SUFIXOS_NOME), n))
+        ],
+        "admin_appownerdisplayname": [f"Usuário {i}" for i in rng.integers(0, len(ids_usuarios), n)],
+        "admin_appenvironmentid": ambiente,
+        "admin_appcreatedon": _datas(rng, n, inicio, fim),
+        "admin_appmodifiedon": _datas(rng, n, inicio, fim),
+        "admin_applastlaunchedon": _datas(rng, n, pd.Timestamp("2024-01-01"), fim, vazias=0.15),
+        "admin_appsharedusers": rng.geometric(0.08, n).astype(float) - 1,
+        "admin_appsharedwithtenant": rng.choice(["True", "False"], n, p=[0.05, 0.95]),
+        "admin_appsharedgroups": rng.integers(0, 4, n),
+        "admin_appcomplexityscore": np.round(rng.random(n) * 100, 2),
+        "admin_appsharededitors": editores,
+        "admin_appowner": "",
+        "admin_appownerprincipaltype": rng.choice(["User", "ServicePrincipal"], n, p=[0.97, 0.03]),
+        "admin_powerappstype": rng.choice(TIPOS_APP, n, p=PESOS_TIPOS_APP),
+        "admin_appplanclassification": rng.choice(["Standard", "Premium"], n, p=[0.7, 0.3]),
+        "admin_appdeleted": rng.choice(["False", "True"], n, p=[0.92, 0.08]),
+        "admin_appowner.admin_recordguidasstring": dono,
+    })
+    # As exportações reais têm ~140 colunas; as extras não são usadas pelo pipeline
+    for i in range(colunas_extras):
+        df[f"admin_campo_extra_{i:03d}"] = rng.choice(["", "valor", "outro valor, com vírgula"], n)
+    return df, ids
+
+
+def gravar_auditoria(rng, caminho, linhas, ids_apps, emails, linhas_por_bloco=LINHAS_POR_BLOCO):
+    """
+    Grava o log de auditoria em blocos, em ordem cronológica, sem montá-lo inteiro na memória.
+    """
+    pesos_apps = _popularidade(rng, len(ids_apps))
+    pesos_usuarios = _popularidade(rng, len(emails), expoente=0.8)
+    # Eventos de apps que não existem mais no inventário
+    ids_orfaos = _guids("c000", max(1, len(ids_apps) // 50))
+
+    inicio = pd.Timestamp("2025-01-01")
+    segundos_totais = 180 * 86400
+    escritas = 0
+    for bloco_inicio in range(0, linhas, linhas_por_bloco):
+        n = min(linhas_por_bloco, linhas - bloco_inicio)
+        # Cada bloco cobre um intervalo de tempo seguinte ao anterior
+        de = segundos_totais * bloco_inicio // max(linhas, 1)
+        ate = segundos_totais * (bloco_inicio + n) // max(linhas, 1)
+        segundos = np.sort(rng.integers(de, max(ate, de + 1), n))
+
+        app = ids_apps[rng.choice(len(ids_apps), n, p=pesos_apps)]
+        orfao = rng.random(n) < 0.02
+        app[orfao] = ids_orfaos[rng.integers(0, len(ids_orfaos), orfao.sum())]
+        usuario = emails[rng.choice(len(emails), n, p=pesos_usuarios)]
+
+        bloco = pd.DataFrame({
+            "Id": [f"{bloco_inicio + i:012d}" for i in range(n)],
+            "Creation Time": (inicio + pd.to_timedelta(segundos, unit="s")).strftime("%Y-%m-%dT%H:%M:%S"),
+            "Operation": "LaunchPowerApp",
+            "Workload": "PowerApps",
+            "App ID": app,
+            "User UPN": usuario,
+        })
+        bloco.to_csv(caminho, mode="a" if escritas else "w", header=not escritas, index=False)
+        escritas += n
+    return escritas
+
+
+def gerar_dados(destino, linhas_auditoria, semente=SEMENTE_PADRAO, colunas_extras=20):
+    """
+    Gera os quatro CSVs em `destino` e retorna {nome: caminho} no formato de FONTES_DE_DADOS.
+
+    Se os dados já existirem com os mesmos parâmetros, não são gerados de novo.
+    """
+    destino = Path(destino)
+    destino.mkdir(parents=True, exist_ok=True)
+    fontes = {nome: str(destino / arquivo) for nome, arquivo in ARQUIVOS.items()}
+    parametros = {"linhas_auditoria": linhas_auditoria, "semente": semente, "colunas_extras": colunas_extras}
+
+    marcador = destino / "parametros.json"
+    if marcador.exists() and json.loads(marcador.read_text()) == parametros \
+            and all(Path(caminho).exists() for caminho in fontes.values()):
+        print(f"Dados sintéticos já existem em {destino}")
+        return fontes
+
+    rng = np.random.default_rng(semente)
+    tamanhos = dimensoes_para(linhas_auditoria)
+    print(f"Gerando dados sintéticos em {destino}: {linhas_auditoria} eventos de auditoria, {tamanhos}")
+
+    df_ambientes, ids_ambientes = gerar_ambientes(rng, tamanhos["ambientes"])
+    df_ambientes.to_csv(fontes["ambientes"], index=False)
+
+    df_usuarios, ids_usuarios, emails = gerar_usuarios(rng, tamanhos["usuarios"])
+    df_usuarios.to_csv(fontes["usuarios"], index=False)
+
+    df_apps, ids_apps = gerar_apps(rng, tamanhos["apps"], ids_ambientes, ids_usuarios, colunas_extras)
+    df_apps.to_csv(fontes["apps"], index=False)
+
+    gravar_auditoria(rng, fontes["auditoria"], linhas_auditoria, ids_apps, emails)
+
+    marcador.write_text(json.dumps(parametros))
+    return fontes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera dados sintéticos do CoE para benchmarks")
+    parser.add_argument("--linhas-auditoria", type=int, default=10_000)
+    parser.add_argument("--destino", default="./dados")
+    parser.add_argument("--semente", type=int, default=SEMENTE_PADRAO)
+    parser.add_argument("--colunas-extras", type=int, default=20)
+    args = parser.parse_args(argv)
+    gerar_dados(args.destino, args.linhas_auditoria, args.semente, args.colunas_extras)
+
+
+if __name__ == "__main__":
+    main()
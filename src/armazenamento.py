@@ -0,0 +1,470 @@
+# src/armazenamento.py
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pathlib import Path
+
+# Diretório raiz das camadas (bronze, silver, gold)
+DIRETORIO_DADOS = Path("./data")
+
+# Formatos de armazenamento suportados pelas camadas
+FORMATOS = ("csv", "parquet")
+FORMATO_PADRAO = "csv"
+
+# Tipos lógicos usados nos esquemas e o tipo Arrow correspondente
+TIPOS_ARROW = {
+    "guid": pa.dictionary(pa.int32(), pa.string()),   # GUIDs e códigos repetidos
+    "texto": pa.string(),
+    "inteiro": pa.int64(),
+    "decimal": pa.float64(),
+    "data": pa.timestamp("us"),
+    "booleano": pa.bool_(),
+}
+
+# Esquema explícito por tabela. Colunas não listadas são mantidas como texto.
+ESQUEMAS = {
+    "apps": {
+        "admin_appid": "guid",
+        "admin_displayname": "texto",
+        "admin_appownerdisplayname": "guid",
+        "admin_appenvironmentid": "guid",
+        "admin_appowner": "guid",
+        "admin_appowner.admin_recordguidasstring": "guid",
+        "admin_appownerprincipaltype": "guid",
+        "admin_appcreatedon": "data",
+        "admin_appmodifiedon": "data",
+        "admin_applastlaunchedon": "data",
+        "admin_appsharedusers": "inteiro",
+        "admin_appsharedgroups": "inteiro",
+        "admin_appsharededitors": "inteiro",
+        "admin_appcomplexityscore": "decimal",
+        "admin_appsharedwithtenant": "booleano",
+        "admin_appdeleted": "booleano",
+        "admin_powerappstype": "guid",
+        "admin_appplanclassification": "guid",
+    },
+    "ambientes": {
+        "admin_environmentid": "guid",
+        "admin_displayname": "texto",
+        "admin_environmentcreatedon": "data",
+    },
+    "auditoria": {
+        "App ID": "guid",
+        "User UPN": "guid",
+        "Operation": "guid",
+        "Creation Time": "data",
+    },
+    "usuarios": {
+        "admin_recordguidasstring": "guid",
+        "admin_useremail": "texto",
+        "admin_userprincipalname": "texto",
+        "admin_displayname": "texto",
+        "admin_department": "guid",
+    },
+    # Dimensões indexadas (dimensoes.py): a coluna chave é a chave substituta (posição)
+    "dim_usuarios": {
+        "chave": "inteiro",
+        "admin_recordguidasstring": "guid",
+        "admin_useremail": "texto",
+        "admin_userprincipalname": "texto",
+        "admin_displayname": "texto",
+        "admin_department": "guid",
+        "admin_appownerupn": "texto",
+    },
+    "dim_ambientes": {
+        "chave": "inteiro",
+        "admin_environmentid": "guid",
+        "admin_displayname": "texto",
+    },
+    "apps_com_metricas": {
+        "ID_App": "guid",
+        "Nome_App": "texto",
+        "Nome_Criador": "texto",
+        "Email_Proprietario_App": "texto",
+        "ID_Ambiente": "guid",
+        "Nome_Ambiente": "guid",
+        "Data_Criacao_App": "data",
+        "Data_Modificacao_App": "data",
+        "Data_Ultimo_Acesso": "data",
+        "usuarios_unicos": "inteiro",
+        "sessoes_totais": "inteiro",
+        "Usuarios_Compartilhados": "inteiro",
+        "Compartilhado_Tenant": "booleano",
+        "Compartilhado_Grupos": "inteiro",
+        "Score_Complexidade": "decimal",
+        "total_proprietarios": "inteiro",
+        "Tipo_App": "guid",
+        "Produtividade_Pessoal": "booleano",
+        "Promover": "booleano",
+        "Classificacao_Plano": "guid",
+        "ROI": "guid",
+        "Dias_Sem_Uso": "inteiro",
+        "Status_Atividade": "guid",
+        "Categoria_App": "guid",
+        "Score_Limpeza": "inteiro",
+        "Adocao_Incerta": "booleano",
+        "usuarios_7d": "inteiro",
+        "sessoes_7d": "inteiro",
+        "usuarios_30d": "inteiro",
+        "sessoes_30d": "inteiro",
+        "usuarios_90d": "inteiro",
+        "sessoes_90d": "inteiro",
+        "Ultimo_Acesso_Log": "data",
+        "DAU_Medio_30d": "decimal",
+        "Razao_DAU_MAU": "decimal",
+    },
+    # Totais de apps, usuários e sessões por ambiente
+    "resumo_por_ambiente": {
+        "ID_Ambiente": "guid",
+        "Nome_Ambiente": "guid",
+        "total_apps": "inteiro",
+        "total_usuarios_unicos": "inteiro",
+        "total_sessoes": "inteiro",
+    },
+    # Apps de alta adoção por proprietário (GUID) e ambiente, base dos rankings da Gold
+    "resumo_por_proprietario": {
+        "ID_Proprietario": "guid",
+        "Nome_Proprietario": "texto",
+        "Email_Proprietario": "texto",
+        "Departamento": "guid",
+        "ID_Ambiente": "guid",
+        "Nome_Ambiente": "guid",
+        "total_apps": "inteiro",
+        "usuarios_unicos": "inteiro",
+        "sessoes_totais": "inteiro",
+        "complexidade_total": "decimal",
+    },
+    # Todos os apps com status de atividade e score de limpeza (candidatos a limpeza)
+    "apps_limpeza": {
+        "ID_App": "guid",
+        "Nome_App": "texto",
+        "ID_Ambiente": "guid",
+        "Nome_Ambiente": "guid",
+        "Nome_Criador": "texto",
+        "Email_Proprietario_App": "texto",
+        "Tipo_App": "guid",
+        "Categoria_App": "guid",
+        "Data_Ultimo_Acesso": "data",
+        "usuarios_unicos": "inteiro",
+        "sessoes_totais": "inteiro",
+        "Status_Atividade": "guid",
+        "Dias_Sem_Uso": "inteiro",
+        "Score_Limpeza": "inteiro",
+        "Adocao_Incerta": "booleano",
+    },
+    # Usuários únicos e sessões por app segundo o log de auditoria (com a margem de erro
+    # de usuarios_unicos no modo aproximado)
+    "metricas_uso_auditoria": {
+        "admin_appinternalname": "guid",
+        "usuarios_unicos": "inteiro",
+        "sessoes_totais": "inteiro",
+        "margem_usuarios": "decimal",
+    },
+    # Baldes diários de uso por app e usuário (series_temporais.py)
+    "uso_diario": {
+        "App ID": "guid",
+        "Dia": "data",
+        "User UPN": "guid",
+        "sessoes": "inteiro",
+        "Ultimo_Evento": "data",
+    },
+    # Estado do cálculo incremental de métricas de uso (incremental.py)
+    "estado_sessoes": {
+        "App ID": "guid",
+        "sessoes_totais": "inteiro",
+    },
+    "estado_usuarios": {
+        "App ID": "guid",
+        "User UPN": "guid",
+    },
+}
+
+# Os apps de alta adoção têm as mesmas colunas da tabela principal da Silver
+ESQUEMAS["apps_alta_adocao"] = ESQUEMAS["apps_com_metricas"]
+
+# Tabelas da Gold (nomes amigáveis do Power BI). Com esquema, uma tabela relida do disco
+# (etapa pulada pelo cache) tem os mesmos tipos da calculada na execução
+ESQUEMAS.update({
+    "apps_alta_adocao_final": {
+        "Nome do App": "texto",
+        "Ambiente": "texto",
+        "Proprietário Principal": "texto",
+        "Total de Proprietários/Editores": "inteiro",
+        "Usuários Únicos": "inteiro",
+        "Total de Sessões": "inteiro",
+        "Último Acesso": "data",
+    },
+    "dimensao_macro_governanca": {
+        "Etapa do Funil de Governança": "texto",
+        "Quantidade de Aplicativos": "inteiro",
+        "% em Relação ao Total": "texto",
+    },
+    "ranking_usuarios_unicos": {
+        "Nome do App": "texto",
+        "Proprietário": "texto",
+        "Usuários Únicos": "inteiro",
+        "Total de Sessões": "inteiro",
+        "Ambiente": "texto",
+    },
+    "analise_por_ambiente": ESQUEMAS["resumo_por_ambiente"],
+    "top_proprietarios": {
+        "Ambiente": "texto",
+        "Posição": "inteiro",
+        "Proprietário": "texto",
+        "Total de Apps": "inteiro",
+        "Total de Usuários": "inteiro",
+        "Total de Sessões": "inteiro",
+        "Complexidade Total": "decimal",
+        "E-mail": "texto",
+        "Departamento": "texto",
+    },
+    "metricas_executivas_kpis": {
+        "KPI": "texto",
+        "Valor": "decimal",
+    },
+    "apps_alta_adocao_30d": {
+        "Nome do App": "texto",
+        "Ambiente": "texto",
+        "Proprietário Principal": "texto",
+        "Total de Proprietários/Editores": "inteiro",
+        "Usuários (30 dias)": "inteiro",
+        "Sessões (30 dias)": "inteiro",
+        "DAU/MAU": "decimal",
+        "Último Acesso (log)": "data",
+    },
+    "tendencia_uso_diario": {
+        "Dia": "data",
+        "Usuários Ativos": "inteiro",
+        "Apps Ativos": "inteiro",
+        "Total de Sessões": "inteiro",
+    },
+})
+# Os rankings por ambiente e por departamento têm as colunas do ranking geral (com a posição)
+ESQUEMAS["top_proprietarios_por_ambiente"] = ESQUEMAS["top_proprietarios"]
+ESQUEMAS["top_proprietarios_por_departamento"] = ESQUEMAS["top_proprietarios"]
+
+# Tipos em memória do modo compacto de ler_tabela, por tipo lógico do esquema (os demais
+# seguem preparar_tipos: Int64 e boolean anuláveis, float64 e datetime64)
+TIPOS_PANDAS_COMPACTOS = {
+    "guid": "category",
+}
+
+# Acima desta fração de valores distintos (ex.: o ID de cada app) a categórica não economiza
+# nada e a coluna fica como texto
+LIMITE_CARDINALIDADE_CATEGORICA = 0.5
+
+# Valores textuais aceitos como verdadeiro/falso nas colunas booleanas
+VALORES_VERDADEIROS = {"true", "1", "yes", "sim"}
+VALORES_FALSOS = {"false", "0", "no", "nao", "não"}
+
+
+def caminho_camada(camada, diretorio_dados=None):
+    """
+    Retorna (e cria, se necessário) o diretório de uma camada do pipeline.
+    """
+    caminho = Path(diretorio_dados or DIRETORIO_DADOS) / camada
+    caminho.mkdir(parents=True, exist_ok=True)
+    return caminho
+
+
+def caminho_tabela(camada_path, nome, formato=FORMATO_PADRAO):
+    """
+    Caminho do arquivo de uma tabela dentro da camada, conforme o formato.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato de armazenamento desconhecido: {formato}. Use um de {FORMATOS}")
+    return Path(camada_path) / f"{nome}.{formato}"
+
+
+def _converter_booleano(serie):
+    if pd.api.types.is_bool_dtype(serie):
+        return serie.astype("boolean")
+    texto = serie.astype("string").str.strip().str.lower()
+    resultado = pd.Series(pd.NA, index=serie.index, dtype="boolean")
+    resultado[texto.isin(VALORES_VERDADEIROS).fillna(False)] = True
+    resultado[texto.isin(VALORES_FALSOS).fillna(False)] = False
+    return resultado
+
+
+def _sem_fuso(datas):
+    if isinstance(datas.dtype, pd.DatetimeTZDtype):
+        return datas.dt.tz_convert(None)
+    return datas
+
+
+def converter_datas(serie, coluna=None):
+    """
+    Converte a coluna para datetime. O formato ISO 8601 (o dos arquivos gravados pelo
+    pipeline) é lido primeiro, de forma vetorizada; os valores que ele rejeita (ex.:
+    "3/1/2025 4:05 PM" de exports do Dataverse) são lidos com a inferência de formato do
+    pandas, valor a valor. Horários com fuso são convertidos para UTC, sem fuso. Valores que
+    nenhuma das leituras aceita viram nulos, com aviso.
+    """
+    try:
+        datas = pd.to_datetime(serie, errors="coerce", format="ISO8601")
+    except ValueError:
+        # Valores com e sem fuso na mesma coluna: os sem fuso são tomados como UTC
+        datas = pd.to_datetime(serie, errors="coerce", format="ISO8601", utc=True)
+    datas = _sem_fuso(datas)
+    preenchidos = serie.notna() & (serie.astype("string").str.strip() != "").fillna(False)
+    rejeitados = datas.isna() & preenchidos
+    if rejeitados.any():
+        alternativas = _sem_fuso(pd.to_datetime(serie[rejeitados], errors="coerce", format="mixed", utc=True))
+        datas = datas.astype("datetime64[us]")
+        datas[rejeitados] = alternativas.astype("datetime64[us]")
+        invalidos = int((datas.isna() & preenchidos).sum())
+        if invalidos:
+            print(f"⚠️ {invalidos} valores de data inválidos{f' em {coluna}' if coluna else ''} convertidos em nulo")
+    return datas
+
+
+def preparar_tipos(df, tabela, compacto=False):
+    """
+    Converte as colunas declaradas no esquema da tabela para o tipo pandas correspondente.
+    Colunas fora do esquema viram texto.
+
+    Com compacto=True as colunas "guid" (GUIDs e códigos repetidos) viram categóricas,
+    guardando cada valor distinto uma única vez (veja TIPOS_PANDAS_COMPACTOS), exceto as
+    quase todas distintas (LIMITE_CARDINALIDADE_CATEGORICA).
+    """
+    esquema = ESQUEMAS.get(tabela, {})
+    df = df.copy()
+    for coluna in df.columns:
+        tipo = esquema.get(coluna.strip(), "texto")
+        serie = df[coluna]
+        if tipo == "data":
+            if not pd.api.types.is_datetime64_any_dtype(serie):
+                serie = converter_datas(serie, f"{tabela}.{coluna}")
+            df[coluna] = serie.astype("datetime64[us]")
+        elif tipo == "inteiro":
+            df[coluna] = pd.to_numeric(serie, errors="coerce").round().astype("Int64")
+        elif tipo == "decimal":
+            df[coluna] = pd.to_numeric(serie, errors="coerce").astype("float64")
+        elif tipo == "booleano":
+            df[coluna] = _converter_booleano(serie)
+        elif compacto and tipo in TIPOS_PANDAS_COMPACTOS:
+            if serie.nunique() > LIMITE_CARDINALIDADE_CATEGORICA * len(serie):
+                df[coluna] = serie.astype("string")
+            elif serie.dtype != TIPOS_PANDAS_COMPACTOS[tipo]:
+                df[coluna] = serie.astype(TIPOS_PANDAS_COMPACTOS[tipo])
+        else:
+            df[coluna] = serie.astype("string")
+    return df
+
+
+def memoria_mb(df):
+    """
+    Memória ocupada pelo DataFrame (incluindo o conteúdo dos textos), em MB.
+    """
+    return df.memory_usage(index=True, deep=True).sum() / (1024 * 1024)
+
+
+def esquema_arrow(tabela, colunas):
+    """
+    Monta o esquema Arrow de uma tabela para a lista de colunas informada.
+    """
+    esquema = ESQUEMAS.get(tabela, {})
+    return pa.schema([
+        pa.field(coluna, TIPOS_ARROW[esquema.get(coluna.strip(), "texto")])
+        for coluna in colunas
+    ])
+
+
+def para_arrow(df, tabela, schema=None):
+    """
+    Converte um DataFrame em uma tabela Arrow com o esquema explícito da tabela.
+    """
+    df = preparar_tipos(df, tabela)
+    schema = schema or esquema_arrow(tabela, df.columns)
+    tabela_arrow = pa.Table.from_pandas(df, preserve_index=False)
+    return tabela_arrow.select(schema.names).cast(schema)
+
+
+def salvar_tabela(df, camada_path, nome, formato=FORMATO_PADRAO, tabela=None):
+    """
+    Salva um DataFrame na camada usando o formato escolhido.
+    `tabela` indica qual esquema aplicar (por padrão, o próprio nome).
+    """
+    caminho = caminho_tabela(camada_path, nome, formato)
+    if formato == "parquet":
+        pq.write_table(para_arrow(df, tabela or nome), caminho)
+    else:
+        df.to_csv(caminho, index=False, encoding='utf-8', header=True)
+    return caminho
+
+
+def ler_tabela(camada_path, nome, formato=FORMATO_PADRAO, colunas=None, filtros=None,
+               tipar=False, tabela=None, compacto=False):
+    """
+    Lê uma tabela da camada. Quando `colunas` é informado, apenas essas colunas são lidas
+    (colunas ausentes no arquivo são ignoradas e nomes são comparados sem espaços nas pontas).
+    Em Parquet os tipos do esquema são preservados. Em CSV tudo é lido como texto, como antes,
+    a menos que `tipar=True`: aí o esquema da tabela é aplicado (ou, sem esquema, os tipos
+    são inferidos pelo pandas).
+    `filtros` segue a sintaxe de predicados do pyarrow e só é aplicado em Parquet.
+    Com `compacto=True`, em qualquer formato, o esquema é aplicado com os tipos compactos
+    (categóricas para colunas "guid", inteiros e booleanos anuláveis).
+    """
+    caminho = caminho_tabela(camada_path, nome, formato)
+    selecionadas = None if colunas is None else set(colunas)
+
+    if formato == "parquet":
+        if selecionadas is not None:
+            colunas = [col for col in pq.read_schema(caminho).names if col.strip() in selecionadas]
+        df = pq.read_table(caminho, columns=colunas, filters=filtros).to_pandas()
+        return preparar_tipos(df, tabela or nome, compacto=True) if compacto else df
+
+    usecols = None
+    if selecionadas is not None:
+        usecols = lambda col: col.strip() in selecionadas
+
+    tabela = tabela or nome
+    if tipar and not compacto and tabela not in ESQUEMAS:
+        return pd.read_csv(caminho, index_col=False, usecols=usecols, encoding='utf-8')
+
+    df = pd.read_csv(caminho, index_col=False, dtype=str, usecols=usecols, encoding='utf-8')
+    return preparar_tipos(df, tabela, compacto) if tipar or compacto else df
+
+
+class EscritorIncremental:
+    """
+    Grava uma tabela bloco a bloco (CSV em modo append ou Parquet via ParquetWriter).
+    """
+
+    def __init__(self, camada_path, nome, formato=FORMATO_PADRAO, tabela=None):
+        self.caminho = caminho_tabela(camada_path, nome, formato)
+        self.formato = formato
+        self.tabela = tabela or nome
+        self._schema = None
+        self._writer = None
+        self._primeiro_bloco = True
+
+    def escrever(self, bloco):
+        if self.formato == "parquet":
+            if self._writer is None:
+                self._schema = esquema_arrow(self.tabela, bloco.columns)
+                self._writer = pq.ParquetWriter(self.caminho, self._schema)
+            self._writer.write_table(para_arrow(bloco, self.tabela, self._schema))
+        else:
+            # Apenas o primeiro bloco cria o arquivo e escreve o cabeçalho
+            bloco.to_csv(
+                self.caminho,
+                index=False,
+                encoding='utf-8',
+                header=self._primeiro_bloco,
+                mode='w' if self._primeiro_bloco else 'a'
+            )
+        self._primeiro_bloco = False
+
+    def fechar(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+        return False
@@ -1,50 +1,177 @@
+import csv
+from functools import partial
+
 import pandas as pd
-from pathlib import Path
+import pyarrow as pa
+from pyarrow import csv as pa_csv
+
+from armazenamento import EscritorIncremental, FORMATO_PADRAO, caminho_camada, salvar_tabela
+from dimensoes import assinatura_fontes, construir_e_salvar_dimensoes
+from instrumentacao import etapa
+from paralelo import executar_em_threads, numero_trabalhadores
+
+# Dicionário com os caminhos dos datasets
+FONTES_DE_DADOS = {
+    "apps": "../datasets/admin_apps.csv",
+    "ambientes": "../datasets/admin_environments.csv",
+    "auditoria": "../datasets/admin_auditlog.csv",
+    "usuarios": "../datasets/admin_powerplatformusers.csv"
+}
+
+# Orçamento padrão de memória (em MB) para cada bloco lido no modo streaming
+ORCAMENTO_MEMORIA_MB = 256
 
-def processar_camada_bronze():
+# Quantidade de linhas usada para estimar o tamanho médio de uma linha em memória
+LINHAS_AMOSTRA = 1000
+
+
+def estimar_linhas_por_bloco(caminho, orcamento_memoria_mb=ORCAMENTO_MEMORIA_MB):
+    """
+    Estima quantas linhas cabem no orçamento de memória a partir de uma amostra do arquivo.
+    """
+    amostra = pd.read_csv(caminho, encoding='utf-8', nrows=LINHAS_AMOSTRA, dtype=str)
+    if len(amostra) == 0:
+        return LINHAS_AMOSTRA
+
+    bytes_por_linha = amostra.memory_usage(index=False, deep=True).sum() / len(amostra)
+    orcamento_bytes = orcamento_memoria_mb * 1024 * 1024
+    return max(1, int(orcamento_bytes // max(bytes_por_linha, 1)))
+
+
+def copiar_fonte_em_blocos(caminho, base_path, nome, orcamento_memoria_mb=ORCAMENTO_MEMORIA_MB,
+                           formato=FORMATO_PADRAO):
+    """
+    Lê a fonte em blocos de tamanho limitado e grava a saída Bronze de forma incremental.
+    Retorna o caminho de saída e o total de registros e de colunas processados.
+    """
+    linhas_por_bloco = estimar_linhas_por_bloco(caminho, orcamento_memoria_mb)
+    print(f"Modo streaming: blocos de até {linhas_por_bloco} linhas (~{orcamento_memoria_mb} MB)")
+
+    total_registros = 0
+    total_colunas = 0
+    # dtype=str evita que cada bloco infira tipos diferentes (ex.: 597910003 vs 597910003.0)
+    leitor = pd.read_csv(caminho, encoding='utf-8', chunksize=linhas_por_bloco, dtype=str)
+    with leitor, EscritorIncremental(base_path, nome, formato) as escritor:
+        for bloco in leitor:
+            escritor.escrever(bloco)
+            total_registros += len(bloco)
+            total_colunas = len(bloco.columns)
+        if total_colunas == 0:
+            # Fonte só com cabeçalho: dependendo da versão do pandas o leitor não devolve
+            # nenhum bloco, e a Bronze precisa da tabela vazia (como no modo sem streaming)
+            vazio = pd.read_csv(caminho, encoding='utf-8', nrows=0, dtype=str)
+            escritor.escrever(vazio)
+            total_colunas = len(vazio.columns)
+
+    return escritor.caminho, total_registros, total_colunas
+
+
+def ler_csv_como_texto(caminho):
+    """
+    Lê o CSV com todas as colunas como texto (como dtype=str do pandas) usando o leitor do
+    pyarrow, que divide o arquivo em blocos entre várias threads e não segura o GIL.
+    """
+    with open(caminho, encoding='utf-8-sig', newline='') as arquivo:
+        colunas = next(csv.reader(arquivo), [])
+    tabela = pa_csv.read_csv(
+        caminho,
+        # Campos entre aspas podem ter quebras de linha (ex.: descrições de violações de DLP)
+        parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+        convert_options=pa_csv.ConvertOptions(
+            column_types={coluna: pa.string() for coluna in colunas},
+            strings_can_be_null=True
+        )
+    )
+    return tabela.to_pandas()
+
+
+def processar_fonte(nome, caminho, base_path, modo_streaming=False, orcamento_memoria_mb=ORCAMENTO_MEMORIA_MB,
+                    formato=FORMATO_PADRAO):
+    """
+    Copia uma fonte para a camada Bronze e retorna o número de registros.
+    """
+    print(f"Lendo {nome} de {caminho}...")
+    if modo_streaming:
+        with etapa("copiar_em_blocos") as medida:
+            output_path, registros, colunas = copiar_fonte_em_blocos(
+                caminho, base_path, nome, orcamento_memoria_mb, formato
+            )
+            medida.linhas_saida = registros
+    else:
+        # Em Parquet os tipos vêm do esquema, não da inferência: tudo é lido como texto
+        with etapa("ler_csv") as medida:
+            if formato == "parquet":
+                df = ler_csv_como_texto(caminho)
+            else:
+                df = pd.read_csv(caminho, encoding='utf-8')
+            medida.linhas_saida = len(df)
+        registros, colunas = len(df), len(df.columns)
+
+        with etapa("gravar", linhas_entrada=registros):
+            output_path = salvar_tabela(df, base_path, nome, formato)
+
+    print(f"{nome}: {registros} registros, {colunas} colunas")
+    print(f"Salvo: {output_path}")
+    return registros
+
+
+def processar_camada_bronze(modo_streaming=False, orcamento_memoria_mb=ORCAMENTO_MEMORIA_MB,
+                            formato=FORMATO_PADRAO, diretorio_dados=None, fontes_de_dados=None,
+                            trabalhadores=None, cache_dimensoes=None):
     """
     Lê os dados brutos dos CSVs incluindo log de auditoria.
+
+    As fontes são independentes e são lidas e gravadas ao mesmo tempo, em até
+    `trabalhadores` threads (padrão: uma por fonte, limitado ao número de CPUs). Uma fonte
+    com erro não interrompe as demais.
+    Com modo_streaming=True cada fonte é lida em blocos e gravada incrementalmente, mantendo
+    o pico de memória estável para arquivos grandes; orcamento_memoria_mb é dividido entre
+    as fontes lidas simultaneamente.
+    Com formato="parquet" as tabelas são gravadas com o esquema tipado de armazenamento.py.
+    fontes_de_dados substitui os caminhos padrão de FONTES_DE_DADOS (ex.: dados sintéticos).
+    cache_dimensoes (dimensoes.CacheDimensoes) reaproveita as dimensões já construídas a
+    partir dos mesmos arquivos de usuários e ambientes (ex.: outro tenant do modo lote).
     """
     print("Iniciando processamento da Camada Bronze (incluindo auditoria)...")
 
     # Criar diretório de saída
-    base_path = Path("./data/bronze")
-    base_path.mkdir(parents=True, exist_ok=True)
-
-    # Dicionário com os caminhos dos datasets
-    fontes_de_dados = {
-        "apps": "../datasets/admin_apps.csv",
-        "ambientes": "../datasets/admin_environments.csv",
-        "auditoria": "../datasets/admin_auditlog.csv",
-        "usuarios": "../datasets/admin_powerplatformusers.csv"
+    base_path = caminho_camada("bronze", diretorio_dados)
+
+    fontes = fontes_de_dados or FONTES_DE_DADOS
+    simultaneas = min(len(fontes), numero_trabalhadores(trabalhadores)) or 1
+    orcamento_por_fonte = max(1, orcamento_memoria_mb // simultaneas)
+    tarefas = {
+        nome: partial(processar_fonte, nome, caminho, base_path, modo_streaming, orcamento_por_fonte, formato)
+        for nome, caminho in fontes.items()
     }
+    registros, erros, duracoes = executar_em_threads(tarefas, simultaneas, prefixo="fonte:")
 
     dados_processados = {}
+    for nome in fontes:
+        if nome in erros:
+            print(f"Erro ao processar {nome}: {erros[nome]}")
+        else:
+            dados_processados[nome] = registros[nome]
 
-    for nome, caminho in fontes_de_dados.items():
-        print(f"Lendo {nome} de {caminho}...")
+    # Dimensões de usuários e ambientes com chaves já normalizadas, usadas nas buscas da Silver
+    if "usuarios" in dados_processados and "ambientes" in dados_processados:
         try:
-            # Ler CSV com Pandas
-            df = pd.read_csv(caminho, encoding='utf-8')
-            print(f"{nome}: {len(df)} registros, {len(df.columns)} colunas")
-            
-            # Salvar como CSV
-            output_path = base_path / f"{nome}.csv"
-            df.to_csv(output_path, index=False, encoding='utf-8', header=True)
-            print(f"Salvo: {output_path}")
-            
-            dados_processados[nome] = len(df)
-            
+            with etapa("dimensoes") as medida:
+                chave = assinatura_fontes(fontes["usuarios"], fontes["ambientes"]) if cache_dimensoes is not None else None
+                dimensoes = construir_e_salvar_dimensoes(base_path, formato, cache_dimensoes, chave)
+                medida.linhas_saida = sum(dimensoes.values())
+            for nome, count in dimensoes.items():
+                print(f"Dimensão {nome}: {count} chaves")
         except Exception as e:
-            print(f"Erro ao processar {nome}: {e}")
+            print(f"Erro ao construir as dimensões: {e}")
 
     print("\nCamada Bronze processada com sucesso!")
     print(f"Dados salvos em: {base_path}")
     print("\nResumo dos dados processados:")
     for nome, count in dados_processados.items():
-        print(f"  - {nome}: {count} registros")
+        print(f"  - {nome}: {count} registros ({duracoes[nome]:.2f}s)")
 
     return dados_processados
 
 if __name__ == "__main__":
-    processar_camada_bronze()
\ No newline at end of file
+    processar_camada_bronze()
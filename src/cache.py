@@ -0,0 +1,220 @@
+# src/cache.py
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+
+from armazenamento import DIRETORIO_DADOS, caminho_camada
+
+# Artefatos e manifesto ficam em ./data/.cache
+CAMADA_CACHE = ".cache"
+ARQUIVO_MANIFESTO = "manifesto.json"
+
+# Quantas execuções (impressões digitais) diferentes manter por etapa; as menos usadas saem primeiro
+MAX_ENTRADAS_POR_ETAPA = 3
+
+# Tamanho do bloco lido ao calcular o hash de conteúdo
+TAMANHO_BLOCO = 1024 * 1024
+
+
+def hash_arquivo(caminho):
+    """
+    Hash rápido (BLAKE2b, 128 bits) do conteúdo de um arquivo.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    with open(caminho, "rb") as arquivo:
+        while bloco := arquivo.read(TAMANHO_BLOCO):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def hash_texto(texto):
+    return hashlib.blake2b(texto.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def hash_codigo(modulos):
+    """
+    Versão do código de uma etapa: hash do fonte dos módulos que ela usa.
+    """
+    partes = []
+    for nome in sorted(modulos):
+        modulo = sys.modules.get(nome) or __import__(nome)
+        partes.append(f"{nome}:{hash_arquivo(modulo.__file__)}")
+    return hash_texto("|".join(partes))
+
+
+def _listar_arquivos(diretorio):
+    """
+    {caminho: (tamanho, mtime_ns)} de todos os arquivos sob o diretório.
+    """
+    arquivos = {}
+    for raiz, _, nomes in os.walk(diretorio):
+        for nome in nomes:
+            caminho = Path(raiz) / nome
+            info = caminho.stat()
+            arquivos[str(caminho)] = (info.st_size, info.st_mtime_ns)
+    return arquivos
+
+
+class CacheEtapas:
+    """
+    Cache das etapas do pipeline por impressão digital das entradas.
+
+    A impressão digital de uma etapa combina o hash de conteúdo de cada arquivo de entrada,
+    o hash do código da etapa e a configuração da execução. Se ela já foi vista em uma
+    execução bem-sucedida, a etapa é pulada: as saídas que estiverem faltando ou diferentes
+    em disco são restauradas da cópia guardada e as contagens de registros são reaproveitadas.
+
+    O hash de conteúdo de cada arquivo é memorizado por (tamanho, mtime), então arquivos
+    que não mudaram não são relidos.
+    """
+
+    def __init__(self, diretorio_dados=None, max_entradas=MAX_ENTRADAS_POR_ETAPA, forcar=False):
+        self.raiz_dados = Path(diretorio_dados or DIRETORIO_DADOS)
+        self.diretorio = caminho_camada(CAMADA_CACHE, diretorio_dados)
+        self.max_entradas = max_entradas
+        self.forcar = forcar
+        # Etapas desta execução que foram puladas (reaproveitadas do cache)
+        self.reaproveitadas = set()
+        self.manifesto = self._ler_manifesto()
+
+    def _ler_manifesto(self):
+        caminho = self.diretorio / ARQUIVO_MANIFESTO
+        if not caminho.exists():
+            return {"hashes": {}, "etapas": {}}
+        try:
+            with open(caminho, encoding="utf-8") as arquivo:
+                return json.load(arquivo)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"⚠️ Manifesto do cache ilegível, começando do zero: {e}")
+            return {"hashes": {}, "etapas": {}}
+
+    def _gravar_manifesto(self):
+        # Grava em um arquivo temporário e troca de uma vez (não deixa manifesto pela metade)
+        caminho = self.diretorio / ARQUIVO_MANIFESTO
+        temporario = caminho.with_suffix(".tmp")
+        with open(temporario, "w", encoding="utf-8") as arquivo:
+            json.dump(self.manifesto, arquivo, indent=2, ensure_ascii=False)
+        os.replace(temporario, caminho)
+
+    def hash_conteudo(self, caminho):
+        """
+        Hash de conteúdo do arquivo, reaproveitando o valor memorizado se tamanho e mtime
+        não mudaram. Arquivos inexistentes têm o hash "ausente".
+        """
+        caminho = Path(caminho)
+        if not caminho.exists():
+            return "ausente"
+        info = caminho.stat()
+        memo = self.manifesto["hashes"].get(str(caminho))
+        if memo and memo["tamanho"] == info.st_size and memo["mtime_ns"] == info.st_mtime_ns:
+            return memo["hash"]
+        valor = hash_arquivo(caminho)
+        self.manifesto["hashes"][str(caminho)] = {
+            "tamanho": info.st_size, "mtime_ns": info.st_mtime_ns, "hash": valor
+        }
+        return valor
+
+    def impressao_digital(self, entradas, modulos, config):
+        """
+        Impressão digital de uma etapa: entradas (conteúdo), código e configuração.
+        """
+        partes = {
+            "entradas": {str(caminho): self.hash_conteudo(caminho) for caminho in entradas},
+            "codigo": hash_codigo(modulos),
+            "config": config,
+        }
+        return hash_texto(json.dumps(partes, sort_keys=True, default=str))
+
+    def _diretorio_artefatos(self, etapa, impressao):
+        return self.diretorio / etapa / impressao
+
+    def _restaurar(self, etapa, impressao, registro):
+        """
+        Garante que as saídas em disco são as da execução em cache, copiando de volta
+        as que faltam ou mudaram. Retorna False se algum artefato se perdeu.
+        """
+        artefatos = self._diretorio_artefatos(etapa, impressao)
+        for relativo, valor in registro["saidas"].items():
+            destino = self.raiz_dados / relativo
+            if self.hash_conteudo(destino) == valor:
+                continue
+            origem = artefatos / relativo
+            if not origem.exists():
+                return False
+            destino.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(origem, destino)
+            print(f"  ♻️ Restaurado do cache: {relativo}")
+        return True
+
+    def _guardar(self, etapa, impressao, saidas, resultado):
+        artefatos = self._diretorio_artefatos(etapa, impressao)
+        shutil.rmtree(artefatos, ignore_errors=True)
+        registro_saidas = {}
+        total_bytes = 0
+        for caminho in saidas:
+            relativo = Path(caminho).relative_to(self.raiz_dados).as_posix()
+            destino = artefatos / relativo
+            destino.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(caminho, destino)
+            registro_saidas[relativo] = self.hash_conteudo(caminho)
+            total_bytes += Path(caminho).stat().st_size
+
+        entradas = self.manifesto["etapas"].setdefault(etapa, {})
+        entradas[impressao] = {
+            "resultado": resultado,
+            "saidas": registro_saidas,
+            "bytes": total_bytes,
+            "usado_em": time.time(),
+        }
+        self._limpar(etapa)
+
+    def _limpar(self, etapa):
+        """
+        Remove as entradas menos usadas recentemente além de max_entradas (LRU).
+        """
+        entradas = self.manifesto["etapas"].get(etapa, {})
+        excedentes = sorted(entradas, key=lambda chave: entradas[chave]["usado_em"], reverse=True)[self.max_entradas:]
+        for impressao in excedentes:
+            shutil.rmtree(self._diretorio_artefatos(etapa, impressao), ignore_errors=True)
+            del entradas[impressao]
+            print(f"  🧹 Cache antigo removido: {etapa}/{impressao}")
+
+        # Hashes memorizados de arquivos que não existem mais só ocupam espaço
+        self.manifesto["hashes"] = {
+            caminho: memo for caminho, memo in self.manifesto["hashes"].items() if Path(caminho).exists()
+        }
+
+    def executar(self, etapa, funcao, entradas, modulos, config, saidas_em):
+        """
+        Executa `funcao` (uma etapa do pipeline) só se a impressão digital mudou.
+
+        entradas: arquivos lidos pela etapa; modulos: módulos cujo código define a etapa;
+        config: opções da execução que afetam o resultado; saidas_em: diretório da etapa.
+        Todos os arquivos do diretório depois da execução são as saídas guardadas no cache,
+        inclusive os que a etapa não precisou regravar (ex.: tabelas Gold sem mudança,
+        puladas pelo GrafoTabelas): restaurar a impressão digital devolve todos eles.
+        Retorna o resultado da etapa (contagens de registros), como a própria função.
+        """
+        impressao = self.impressao_digital(entradas, modulos, config)
+        registro = self.manifesto["etapas"].get(etapa, {}).get(impressao)
+
+        if registro and not self.forcar:
+            if self._restaurar(etapa, impressao, registro):
+                print(f"⏭️ {etapa}: entradas, código e configuração sem mudanças, reaproveitando o cache ({impressao[:12]})")
+                registro["usado_em"] = time.time()
+                self._limpar(etapa)
+                self._gravar_manifesto()
+                self.reaproveitadas.add(etapa)
+                return registro["resultado"]
+            print(f"⚠️ {etapa}: artefatos do cache incompletos, executando novamente")
+
+        resultado = funcao()
+        if resultado:
+            self._guardar(etapa, impressao, list(_listar_arquivos(saidas_em)), resultado)
+            self._gravar_manifesto()
+        return resultado
@@ -0,0 +1,381 @@
+# src/consultas.py
+
+import argparse
+import json
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+
+from armazenamento import FORMATO_PADRAO, caminho_camada, caminho_tabela, converter_datas, ler_tabela
+from snapshots import ARQUIVO_MANIFESTO, caminho_snapshot, caminho_snapshots, carregar_snapshot, ler_manifesto
+
+# Serviço de consultas sobre as tabelas Silver e Gold da última execução: as tabelas ficam
+# em memória (lidas dos snapshots Arrow, ou das camadas) e os resultados num cache LRU,
+# descartado quando o pipeline publica uma execução nova.
+
+# Tabelas consultáveis e a camada de cada uma
+TABELAS_CONSULTA = {
+    "apps_com_metricas": "silver",
+    "apps_alta_adocao": "silver",
+    "resumo_por_ambiente": "silver",
+    "resumo_por_proprietario": "silver",
+    "apps_limpeza": "silver",
+    "metricas_executivas_kpis": "gold",
+    "dimensao_macro_governanca": "gold",
+    "apps_alta_adocao_final": "gold",
+    "apps_alta_adocao_30d": "gold",
+    "ranking_usuarios_unicos": "gold",
+    "analise_por_ambiente": "gold",
+    "top_proprietarios": "gold",
+    "top_proprietarios_por_ambiente": "gold",
+    "top_proprietarios_por_departamento": "gold",
+    "tendencia_uso_diario": "gold",
+}
+
+# Colunas de cada filtro, com os nomes da Silver e os nomes amigáveis da Gold. Um registro
+# passa no filtro quando alguma das colunas presentes na tabela corresponde ao valor.
+COLUNAS_FILTRO = {
+    "ambiente": ("Nome_Ambiente", "ID_Ambiente", "Ambiente"),
+    "proprietario": ("Nome_Criador", "Email_Proprietario_App", "Nome_Proprietario", "Email_Proprietario",
+                     "ID_Proprietario", "Proprietário", "Proprietário Principal", "E-mail"),
+    "tipo": ("Tipo_App", "Categoria_App"),
+}
+# Coluna de data usada pelo intervalo data_inicio/data_fim (a primeira presente na tabela)
+COLUNAS_DATA = ("Data_Ultimo_Acesso", "Último Acesso", "Dia", "Ultimo_Acesso_Log", "Último Acesso (log)",
+                "Data_Criacao_App")
+
+TAMANHO_CACHE = 1024
+TAMANHO_PAGINA = 50
+TAMANHO_PAGINA_MAXIMO = 1000
+# Intervalo mínimo entre verificações de execução nova (segundos): entre elas, uma consulta
+# repetida é só uma busca no cache
+INTERVALO_VERIFICACAO_S = 1.0
+
+PORTA_PADRAO = 8765
+
+
+def _modificado_em(caminho):
+    return caminho.stat().st_mtime_ns if caminho.exists() else None
+
+
+class ServicoConsultas:
+    """
+    Consultas filtradas, ordenadas e paginadas sobre as tabelas de TABELAS_CONSULTA.
+
+    Cada tabela é carregada uma única vez (da fonte mais nova: o snapshot Arrow, se
+    publicado, ou o arquivo da camada) e fica em memória. Os resultados ficam num cache
+    LRU de `tamanho_cache` consultas. A versão dos dados é o `publicado_em` do manifesto
+    dos snapshots mais as datas de modificação dos snapshots e dos arquivos das tabelas;
+    quando muda, tabelas e cache são descartados. A versão é conferida no máximo a cada
+    `intervalo_verificacao_s`.
+
+    Os resultados são dicionários prontos para JSON e são compartilhados pelo cache: não
+    devem ser alterados por quem consulta.
+    """
+
+    def __init__(self, diretorio_dados=None, formato=FORMATO_PADRAO, tamanho_cache=TAMANHO_CACHE,
+                 intervalo_verificacao_s=INTERVALO_VERIFICACAO_S):
+        self.diretorio_dados = diretorio_dados
+        self.formato = formato
+        self.tamanho_cache = tamanho_cache
+        self.intervalo_verificacao_s = intervalo_verificacao_s
+        self.acertos = 0
+        self.falhas = 0
+        self._tabelas = {}
+        self._cache = OrderedDict()
+        self._trava = threading.RLock()
+        self._versao = None
+        self._estado_manifesto = None
+        self._proxima_verificacao = 0.0
+
+    # Versão dos dados e invalidação
+
+    def _versao_publicada(self):
+        # O publicado_em do manifesto mais as datas de modificação dos snapshots e dos
+        # arquivos das tabelas: execuções que gravam as camadas sem publicar snapshots
+        # (--sem-snapshots, motor Spark, modo lote) também mudam a versão
+        caminho = caminho_snapshots(self.diretorio_dados) / ARQUIVO_MANIFESTO
+        publicado_em = None
+        if caminho.exists():
+            estado = caminho.stat()
+            marca = (estado.st_mtime_ns, estado.st_size)
+            # O manifesto só é relido quando o arquivo muda
+            if self._estado_manifesto is None or self._estado_manifesto[0] != marca:
+                self._estado_manifesto = (marca, ler_manifesto(self.diretorio_dados))
+            publicado_em = self._estado_manifesto[1].get("publicado_em")
+        else:
+            self._estado_manifesto = None
+        return publicado_em, tuple(
+            (_modificado_em(self._caminho_snapshot(nome)), _modificado_em(self._caminho_tabela(nome)))
+            for nome in TABELAS_CONSULTA
+        )
+
+    def verificar_atualizacao(self, forcar=False):
+        """
+        Descarta tabelas e cache se o pipeline publicou uma execução nova. Retorna a versão atual.
+        """
+        with self._trava:
+            agora = time.monotonic()
+            if not forcar and agora < self._proxima_verificacao:
+                return self._versao
+            self._proxima_verificacao = agora + self.intervalo_verificacao_s
+            versao = self._versao_publicada()
+            if versao != self._versao:
+                if self._versao is not None:
+                    print("🔄 Nova execução publicada: recarregando tabelas")
+                self._tabelas.clear()
+                self._cache.clear()
+                self._versao = versao
+            return self._versao
+
+    # Tabelas residentes
+
+    def _caminho_tabela(self, nome):
+        return caminho_tabela(caminho_camada(TABELAS_CONSULTA[nome], self.diretorio_dados), nome, self.formato)
+
+    def _caminho_snapshot(self, nome):
+        return caminho_snapshot(TABELAS_CONSULTA[nome], nome, self.diretorio_dados)
+
+    def _usar_snapshot(self, nome):
+        """
+        Se a tabela deve ser lida do snapshot: só quando ele está no manifesto e não é mais
+        antigo que o arquivo da camada (senão a camada foi regravada sem publicar snapshots).
+        """
+        manifesto = self._estado_manifesto[1] if self._estado_manifesto else ler_manifesto(self.diretorio_dados)
+        if f"{TABELAS_CONSULTA[nome]}/{nome}" not in manifesto.get("tabelas", {}):
+            return False
+        snapshot = _modificado_em(self._caminho_snapshot(nome))
+        tabela = _modificado_em(self._caminho_tabela(nome))
+        return snapshot is not None and (tabela is None or snapshot >= tabela)
+
+    def _carregar(self, nome):
+        camada = TABELAS_CONSULTA[nome]
+        if self._usar_snapshot(nome):
+            df = carregar_snapshot(nome, camada, diretorio_dados=self.diretorio_dados)
+        else:
+            df = ler_tabela(caminho_camada(camada, self.diretorio_dados), nome, self.formato, tipar=True)
+        # Datas convertidas uma vez, na carga, e não a cada consulta
+        for coluna in COLUNAS_DATA:
+            if coluna in df.columns and not pd.api.types.is_datetime64_any_dtype(df[coluna]):
+                df[coluna] = converter_datas(df[coluna], f"{nome}.{coluna}")
+        return df
+
+    def tabela(self, nome):
+        """
+        A tabela inteira, como está em memória (carregada na primeira consulta).
+        """
+        if nome not in TABELAS_CONSULTA:
+            raise KeyError(f"Tabela desconhecida: {nome}. Use uma de: {', '.join(TABELAS_CONSULTA)}")
+        with self._trava:
+            if nome not in self._tabelas:
+                self._tabelas[nome] = self._carregar(nome)
+            return self._tabelas[nome]
+
+    # Consultas
+
+    def consultar(self, nome, ambiente=None, proprietario=None, tipo=None, data_inicio=None, data_fim=None,
+                  ordenar_por=None, decrescente=True, pagina=1, tamanho_pagina=TAMANHO_PAGINA):
+        """
+        Registros da tabela que passam em todos os filtros informados:
+          - ambiente: nome ou ID do ambiente (igualdade);
+          - proprietario: nome, e-mail ou GUID do proprietário (contém, sem diferenciar maiúsculas);
+          - tipo: código do tipo do app (Tipo_App) ou categoria (Categoria_App);
+          - data_inicio/data_fim: intervalo fechado na coluna de data da tabela (COLUNAS_DATA).
+        ordenar_por aceita colunas separadas por vírgula (a primeira ordena, as seguintes
+        desempatam). Retorna {"tabela", "total", "pagina", "paginas", "tamanho_pagina", "registros"}.
+        """
+        pagina = max(1, int(pagina))
+        tamanho_pagina = min(max(1, int(tamanho_pagina)), TAMANHO_PAGINA_MAXIMO)
+        chave = (nome, ambiente, proprietario, tipo, str(data_inicio or ""), str(data_fim or ""),
+                 ordenar_por, bool(decrescente), pagina, tamanho_pagina)
+
+        versao = self.verificar_atualizacao()
+        with self._trava:
+            resultado = self._cache.get(chave)
+            if resultado is not None:
+                self._cache.move_to_end(chave)
+                self.acertos += 1
+                return resultado
+            self.falhas += 1
+
+        df = self.tabela(nome)
+        mascara = pd.Series(True, index=df.index)
+        filtros = {"ambiente": ambiente, "proprietario": proprietario, "tipo": tipo}
+        for filtro, valor in filtros.items():
+            if valor is not None:
+                mascara &= self._filtrar(df, nome, filtro, str(valor))
+        if data_inicio is not None or data_fim is not None:
+            coluna = next((coluna for coluna in COLUNAS_DATA if coluna in df.columns), None)
+            if coluna is None:
+                raise ValueError(f"Tabela {nome} não tem coluna de data para filtrar")
+            if data_inicio is not None:
+                mascara &= (df[coluna] >= pd.Timestamp(data_inicio)).fillna(False)
+            if data_fim is not None:
+                # Data sem hora inclui o dia inteiro
+                fim = pd.Timestamp(data_fim)
+                if fim == fim.normalize():
+                    fim = fim + pd.Timedelta(days=1) - pd.Timedelta(microseconds=1)
+                mascara &= (df[coluna] <= fim).fillna(False)
+        selecionados = df[mascara.to_numpy(dtype=bool)]
+
+        if ordenar_por:
+            colunas = [coluna.strip() for coluna in ordenar_por.split(",") if coluna.strip()]
+            desconhecidas = [coluna for coluna in colunas if coluna not in df.columns]
+            if desconhecidas:
+                raise ValueError(f"Tabela {nome} sem as colunas de ordenação: {', '.join(desconhecidas)}")
+            selecionados = selecionados.sort_values(colunas, ascending=not decrescente, kind="stable",
+                                                    na_position="last")
+
+        total = len(selecionados)
+        inicio = (pagina - 1) * tamanho_pagina
+        pagina_df = selecionados.iloc[inicio:inicio + tamanho_pagina]
+        resultado = {
+            "tabela": nome,
+            "total": total,
+            "pagina": pagina,
+            "paginas": -(-total // tamanho_pagina),
+            "tamanho_pagina": tamanho_pagina,
+            "registros": json.loads(pagina_df.to_json(orient="records", date_format="iso", force_ascii=False)),
+        }
+        with self._trava:
+            # Uma execução nova publicada durante o cálculo invalida o resultado: ele é
+            # devolvido, mas não entra no cache
+            if self._versao != versao:
+                return resultado
+            self._cache[chave] = resultado
+            while len(self._cache) > self.tamanho_cache:
+                self._cache.popitem(last=False)
+        return resultado
+
+    def _filtrar(self, df, nome, filtro, valor):
+        colunas = [coluna for coluna in COLUNAS_FILTRO[filtro] if coluna in df.columns]
+        if not colunas:
+            raise ValueError(f"Tabela {nome} não tem colunas para o filtro {filtro}")
+        mascara = pd.Series(False, index=df.index)
+        for coluna in colunas:
+            texto = df[coluna].astype("string")
+            if filtro == "proprietario":
+                mascara |= texto.str.contains(valor, case=False, regex=False).fillna(False)
+            else:
+                mascara |= (texto == valor).fillna(False)
+        return mascara
+
+    def tabelas(self):
+        """
+        Tabelas consultáveis, com camada e registros (das já carregadas).
+        """
+        self.verificar_atualizacao()
+        with self._trava:
+            return {
+                nome: {"camada": camada, "registros": len(self._tabelas[nome]) if nome in self._tabelas else None}
+                for nome, camada in TABELAS_CONSULTA.items()
+            }
+
+    def status(self):
+        self.verificar_atualizacao()
+        with self._trava:
+            return {
+                "versao": self._versao,
+                "tabelas_em_memoria": sorted(self._tabelas),
+                "cache": {"consultas": len(self._cache), "acertos": self.acertos, "falhas": self.falhas},
+            }
+
+    # Requisições (HTTP ou ClienteConsultas)
+
+    def responder(self, caminho, parametros=None):
+        """
+        Atende uma requisição GET: /status, /tabelas ou /tabelas/<nome>?<filtros da consulta>.
+        Retorna (status HTTP, corpo JSON-serializável).
+        """
+        parametros = dict(parametros or {})
+        partes = [parte for parte in caminho.strip("/").split("/") if parte]
+        try:
+            if partes == ["status"]:
+                return 200, self.status()
+            if partes == ["tabelas"]:
+                return 200, self.tabelas()
+            if len(partes) == 2 and partes[0] == "tabelas":
+                ordem = parametros.pop("ordem", "desc")
+                if ordem not in ("asc", "desc"):
+                    raise ValueError("ordem deve ser asc ou desc")
+                desconhecidos = set(parametros) - PARAMETROS_CONSULTA
+                if desconhecidos:
+                    raise ValueError(f"Parâmetros desconhecidos: {', '.join(sorted(desconhecidos))}")
+                return 200, self.consultar(partes[1], decrescente=ordem == "desc", **parametros)
+            return 404, {"erro": f"Caminho desconhecido: {caminho}"}
+        except KeyError as e:
+            return 404, {"erro": str(e.args[0])}
+        except FileNotFoundError as e:
+            return 404, {"erro": str(e)}
+        except ValueError as e:
+            return 400, {"erro": str(e)}
+
+
+# Parâmetros aceitos em /tabelas/<nome> (além de ordem=asc|desc)
+PARAMETROS_CONSULTA = {"ambiente", "proprietario", "tipo", "data_inicio", "data_fim", "ordenar_por",
+                       "pagina", "tamanho_pagina"}
+
+
+class ClienteConsultas:
+    """
+    Cliente no mesmo processo, com as mesmas rotas do servidor HTTP e sem rede:
+
+        cliente = ClienteConsultas(ServicoConsultas())
+        status, corpo = cliente.get("/tabelas/apps_com_metricas?ambiente=env2&ordenar_por=usuarios_unicos")
+    """
+
+    def __init__(self, servico):
+        self.servico = servico
+
+    def get(self, url):
+        partes = urlsplit(url)
+        parametros = {chave: valores[-1] for chave, valores in parse_qs(partes.query).items()}
+        return self.servico.responder(partes.path, parametros)
+
+
+def criar_servidor(servico, host="127.0.0.1", porta=PORTA_PADRAO):
+    """
+    Servidor HTTP (biblioteca padrão, uma thread por requisição) que responde JSON com
+    ServicoConsultas.responder. Use serve_forever() para atender e shutdown() para parar.
+    """
+    cliente = ClienteConsultas(servico)
+
+    class Manipulador(BaseHTTPRequestHandler):
+        def do_GET(self):
+            status, corpo = cliente.get(self.path)
+            conteudo = json.dumps(corpo, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(conteudo)))
+            self.end_headers()
+            self.wfile.write(conteudo)
+
+        def log_message(self, formato, *args):
+            pass
+
+    return ThreadingHTTPServer((host, porta), Manipulador)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serviço local de consultas sobre as tabelas Silver e Gold")
+    parser.add_argument("--host", default="127.0.0.1", help="Endereço do servidor (padrão: 127.0.0.1)")
+    parser.add_argument("--porta", type=int, default=PORTA_PADRAO, help=f"Porta do servidor (padrão: {PORTA_PADRAO})")
+    parser.add_argument("--formato", default=FORMATO_PADRAO, help="Formato das camadas, sem snapshots publicados")
+    args = parser.parse_args(argv)
+
+    servidor = criar_servidor(ServicoConsultas(formato=args.formato), args.host, args.porta)
+    print(f"🔎 Consultas em http://{args.host}:{args.porta}/tabelas (Ctrl+C para encerrar)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+
+
+if __name__ == "__main__":
+    main()
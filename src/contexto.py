@@ -0,0 +1,171 @@
+# src/contexto.py
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from armazenamento import ESQUEMAS, FORMATO_PADRAO, caminho_camada, caminho_tabela, ler_tabela, preparar_tipos, salvar_tabela
+from instrumentacao import etapa, etapa_atual
+from series_temporais import COLUNAS_USO_DIARIO
+
+# Colunas dos apps da Silver usadas pelas tabelas Gold
+COLUNAS_APPS_GOLD = [
+    'ID_App', 'Nome_App', 'Nome_Criador', 'Nome_Ambiente', 'total_proprietarios',
+    'usuarios_unicos', 'sessoes_totais', 'Data_Ultimo_Acesso',
+    'usuarios_30d', 'sessoes_30d', 'Ultimo_Acesso_Log', 'Razao_DAU_MAU'
+]
+
+# Colunas da tabela de limpeza da Silver: todos os apps (não só os de alta adoção) com o
+# status de atividade e o score de limpeza (notebook score_clean)
+COLUNAS_APPS_LIMPEZA = [
+    'ID_App', 'Nome_App', 'ID_Ambiente', 'Nome_Ambiente', 'Nome_Criador', 'Email_Proprietario_App',
+    'Tipo_App', 'Categoria_App', 'Data_Ultimo_Acesso', 'usuarios_unicos', 'sessoes_totais',
+    'Status_Atividade', 'Dias_Sem_Uso', 'Score_Limpeza'
+]
+
+# Contrato Silver → Gold: tabelas que a Silver publica e colunas que a Gold lê de cada uma
+CONTRATO_SILVER_GOLD = {
+    "apps_com_metricas": COLUNAS_APPS_GOLD,
+    "apps_alta_adocao": COLUNAS_APPS_GOLD,
+    "resumo_por_ambiente": ['ID_Ambiente', 'Nome_Ambiente', 'total_apps', 'total_usuarios_unicos', 'total_sessoes'],
+    "resumo_por_proprietario": ['ID_Proprietario', 'Nome_Proprietario', 'Email_Proprietario', 'Departamento',
+                                'ID_Ambiente', 'Nome_Ambiente', 'total_apps', 'usuarios_unicos',
+                                'sessoes_totais', 'complexidade_total'],
+    "metricas_uso_auditoria": ['admin_appinternalname', 'usuarios_unicos', 'sessoes_totais'],
+    "uso_diario": COLUNAS_USO_DIARIO,
+    "apps_limpeza": COLUNAS_APPS_LIMPEZA,
+}
+
+# Tabelas gravadas ao mesmo tempo, em segundo plano
+GRAVACOES_SIMULTANEAS = 4
+
+
+class ContratoViolado(ValueError):
+    """Uma camada não publicou as tabelas ou colunas que a camada seguinte espera."""
+
+
+class ContextoPipeline:
+    """
+    Tabelas de uma execução do pipeline, passadas em memória de uma camada para a seguinte.
+
+    Cada tabela publicada fica em memória já com os tipos do esquema (os mesmos de
+    ler_tabela com tipar=True), e a gravação em disco é um efeito colateral opcional, feito
+    em segundo plano num pool de threads. A camada seguinte lê a tabela da memória; sem
+    ela (ex.: etapa restaurada do cache ou executada sozinha), lê do disco.
+
+    camadas_materializadas: camadas gravadas em disco (padrão: todas). Tabelas publicadas
+    com persistir=True (estado de execuções incrementais) são gravadas sempre.
+    """
+
+    def __init__(self, diretorio_dados=None, formato=FORMATO_PADRAO, camadas_materializadas=None,
+                 trabalhadores=GRAVACOES_SIMULTANEAS):
+        self.diretorio_dados = diretorio_dados
+        self.formato = formato
+        self.camadas_materializadas = None if camadas_materializadas is None else set(camadas_materializadas)
+        self._tabelas = {}
+        self._gravacoes = {}
+        self._trava = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=trabalhadores, thread_name_prefix="gravar")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.fechar()
+
+    def materializa(self, camada):
+        return self.camadas_materializadas is None or camada in self.camadas_materializadas
+
+    def em_memoria(self, camada, nome):
+        return (camada, nome) in self._tabelas
+
+    def publicar(self, camada, nome, df, persistir=None, tabela=None):
+        """
+        Disponibiliza a tabela para as próximas camadas e agenda a gravação em disco.
+        `tabela` indica qual esquema aplicar (por padrão, o próprio nome).
+        Retorna o DataFrame tipado guardado em memória.
+        """
+        tabela = tabela or nome
+        tipado = preparar_tipos(df, tabela) if tabela in ESQUEMAS else df
+        with self._trava:
+            self._tabelas[(camada, nome)] = tipado
+        if persistir if persistir is not None else self.materializa(camada):
+            futuro = self._executor.submit(self._gravar, camada, nome, df, tabela, etapa_atual())
+            with self._trava:
+                self._gravacoes.setdefault(camada, {})[nome] = futuro
+        return tipado
+
+    def _gravar(self, camada, nome, df, tabela, etapa_pai):
+        with etapa(f"gravar:{nome}", linhas_entrada=len(df), pai=etapa_pai):
+            return salvar_tabela(df, caminho_camada(camada, self.diretorio_dados), nome, self.formato, tabela=tabela)
+
+    def obter(self, camada, nome, colunas=None):
+        """
+        Tabela publicada nesta execução ou, se não houver, lida do disco com os tipos do esquema.
+        Com `colunas`, retorna só essas colunas e falha (ContratoViolado) se alguma faltar.
+        """
+        df = self._tabelas.get((camada, nome))
+        if df is None:
+            df = ler_tabela(caminho_camada(camada, self.diretorio_dados), nome, self.formato,
+                            colunas=colunas, tipar=True)
+        if colunas is None:
+            return df
+        faltando = [coluna for coluna in colunas if coluna not in df.columns]
+        if faltando:
+            raise ContratoViolado(f"Tabela {camada}/{nome} sem as colunas esperadas: {', '.join(faltando)}")
+        return df[colunas]
+
+    def verificar_contrato(self, camada, contrato):
+        """
+        Confere se cada tabela do contrato ({nome: colunas}) foi publicada com as colunas
+        esperadas. Tabelas não publicadas nesta execução precisam existir em disco.
+        """
+        problemas = []
+        for nome, colunas in contrato.items():
+            df = self._tabelas.get((camada, nome))
+            if df is None:
+                if not caminho_tabela(caminho_camada(camada, self.diretorio_dados), nome, self.formato).exists():
+                    problemas.append(f"{nome} (não publicada)")
+                continue
+            faltando = [coluna for coluna in colunas if coluna not in df.columns]
+            if faltando:
+                problemas.append(f"{nome} (sem {', '.join(faltando)})")
+        if problemas:
+            raise ContratoViolado(f"Contrato da camada {camada} violado: {'; '.join(problemas)}")
+
+    def aguardar(self, camada=None):
+        """
+        Espera as gravações pendentes da camada (ou de todas) e retorna {nome: caminho}.
+        Uma gravação com erro é relançada depois de todas terminarem.
+        """
+        with self._trava:
+            camadas = [camada] if camada is not None else list(self._gravacoes)
+            pendentes = {nome: futuro for c in camadas for nome, futuro in self._gravacoes.pop(c, {}).items()}
+        caminhos, erros = {}, {}
+        for nome, futuro in pendentes.items():
+            try:
+                caminhos[nome] = futuro.result()
+            except Exception as e:
+                erros[nome] = e
+        for nome, erro in erros.items():
+            print(f"❌ Erro ao gravar {nome}: {erro}")
+        if erros:
+            raise next(iter(erros.values()))
+        return caminhos
+
+    def liberar(self, camada):
+        """
+        Descarta da memória as tabelas da camada (as gravações pendentes continuam).
+        """
+        with self._trava:
+            for chave in [chave for chave in self._tabelas if chave[0] == camada]:
+                del self._tabelas[chave]
+
+    def fechar(self):
+        """
+        Espera todas as gravações pendentes e libera o pool de threads.
+        """
+        try:
+            self.aguardar()
+        finally:
+            self._executor.shutdown(wait=True)
+            self._tabelas.clear()
@@ -0,0 +1,211 @@
+# src/dag.py
+
+import hashlib
+import inspect
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+from instrumentacao import etapa, etapa_atual
+
+# Casas decimais consideradas ao comparar números entre execuções
+CASAS_COMPARACAO = 9
+
+# Estado das tabelas já calculadas (assinatura das entradas de cada nó)
+ARQUIVO_ESTADO_DAG = "estado_tabelas.json"
+
+
+def hash_dataframe(df):
+    """
+    Hash do conteúdo de um DataFrame (valores, nomes e tipos das colunas).
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(json.dumps([(str(col), str(tipo)) for col, tipo in df.dtypes.items()]).encode("utf-8"))
+    if len(df) > 0:
+        h.update(pd.util.hash_pandas_object(df, index=False).to_numpy(dtype=np.uint64).tobytes())
+    return h.hexdigest()
+
+
+def como_numero(serie):
+    """
+    A coluna como números (inclusive números gravados como texto), ou None se não for numérica.
+    """
+    if pd.api.types.is_bool_dtype(serie):
+        return None
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie
+    texto = serie.astype("string")
+    numeros = pd.to_numeric(texto, errors="coerce")
+    return numeros if numeros.count() == texto.count() else None
+
+
+def forma_canonica(df):
+    """
+    Versão do DataFrame usada para comparar conteúdo entre execuções (partições exportadas,
+    snapshots): a mesma tabela lida da memória (tipos do pipeline) ou do disco (CSV relido,
+    ou Parquet com colunas fora do esquema gravadas como texto) deve dar o mesmo hash. Números, inclusive em
+    texto, viram float arredondado (o CSV não devolve o último bit); o resto vira texto.
+    """
+    colunas = {}
+    for coluna, serie in df.items():
+        numeros = como_numero(serie)
+        if numeros is None:
+            colunas[coluna] = serie.astype("string")
+        else:
+            colunas[coluna] = numeros.astype("float64").round(CASAS_COMPARACAO)
+    return pd.DataFrame(colunas, index=df.index)
+
+
+class No:
+    """
+    Um nó do grafo: uma tabela calculada a partir das entradas declaradas.
+
+    As entradas são nomes de fontes (DataFrames carregados) ou de outros nós. A função
+    recebe cada entrada como argumento nomeado e retorna um DataFrame. Nós com salvar=False
+    são intermediários: alimentam outros nós mas não são gravados.
+    """
+
+    def __init__(self, nome, funcao, entradas, salvar=True):
+        self.nome = nome
+        self.funcao = funcao
+        self.entradas = list(entradas)
+        self.salvar = salvar
+        # Mudar o código do nó também invalida a tabela
+        self.versao = hashlib.blake2b(inspect.getsource(funcao).encode("utf-8"), digest_size=16).hexdigest()
+
+    def assinatura(self, hashes_entradas, extra=""):
+        partes = [self.versao, extra] + [f"{nome}={hashes_entradas[nome]}" for nome in self.entradas]
+        return hashlib.blake2b("|".join(partes).encode("utf-8"), digest_size=16).hexdigest()
+
+
+class GrafoTabelas:
+    """
+    Registro de tabelas com dependências declaradas, executado como um DAG.
+
+    Cada nó roda assim que todas as suas entradas estão prontas, em um pool de threads,
+    então nós independentes são calculados e gravados ao mesmo tempo. Um nó cujas
+    entradas e código não mudaram desde a última execução não é recalculado.
+    """
+
+    def __init__(self):
+        self.nos = {}
+
+    def tabela(self, nome, entradas, salvar=True):
+        """
+        Decorador que registra a função como o nó `nome`.
+        """
+        def registrar(funcao):
+            if nome in self.nos:
+                raise ValueError(f"Tabela já registrada no grafo: {nome}")
+            self.nos[nome] = No(nome, funcao, entradas, salvar)
+            return funcao
+        return registrar
+
+    def ordem_topologica(self, fontes):
+        """
+        Nós em ordem de execução válida. Falha em entradas desconhecidas ou ciclos.
+        """
+        for no in self.nos.values():
+            desconhecidas = [e for e in no.entradas if e not in self.nos and e not in fontes]
+            if desconhecidas:
+                raise ValueError(f"Tabela {no.nome} depende de entradas desconhecidas: {desconhecidas}")
+
+        ordem, visitados, em_visita = [], set(), set()
+
+        def visitar(nome):
+            if nome in visitados or nome in fontes:
+                return
+            if nome in em_visita:
+                raise ValueError(f"Ciclo de dependências envolvendo a tabela {nome}")
+            em_visita.add(nome)
+            for entrada in self.nos[nome].entradas:
+                visitar(entrada)
+            em_visita.discard(nome)
+            visitados.add(nome)
+            ordem.append(nome)
+
+        for nome in self.nos:
+            visitar(nome)
+        return ordem
+
+    def executar(self, fontes, gravar, carregar, estado=None, trabalhadores=None, recalcular=False, extra=""):
+        """
+        Executa o grafo sobre as fontes (nome -> DataFrame).
+
+        gravar(nome, df) grava uma tabela e retorna o número de registros gravados;
+        carregar(nome) relê uma tabela gravada (usado quando um nó pulado alimenta um nó
+        que precisa ser recalculado). estado é o dicionário persistido da execução anterior
+        e é atualizado no lugar. extra entra na assinatura (ex.: o formato de saída).
+        Retorna {nome: registros} das tabelas gravadas.
+        """
+        estado = {} if estado is None else estado
+        ordem = self.ordem_topologica(fontes)
+        hashes = {nome: hash_dataframe(df) for nome, df in fontes.items()}
+        dados = dict(fontes)
+        resultados, falhas = {}, set()
+        # Os nós rodam em outras threads: as medições ficam sob a etapa que chamou executar
+        etapa_pai = etapa_atual()
+
+        def precisa_recalcular(no, assinatura):
+            anterior = estado.get(no.nome)
+            return recalcular or not no.salvar or anterior is None or anterior["assinatura"] != assinatura
+
+        def rodar(no, assinatura):
+            # Entradas de nós pulados são relidas só quando realmente necessárias
+            argumentos = {}
+            for entrada in no.entradas:
+                if entrada not in dados:
+                    dados[entrada] = carregar(entrada)
+                argumentos[entrada] = dados[entrada]
+            with etapa(no.nome, linhas_entrada=sum(len(df) for df in argumentos.values()), pai=etapa_pai) as medida:
+                df = no.funcao(**argumentos)
+                medida.linhas_saida = len(df)
+                if not no.salvar:
+                    return df, len(df)
+                with etapa("gravar", linhas_entrada=len(df)):
+                    return df, gravar(no.nome, df)
+
+        pendentes = list(ordem)
+        em_execucao = {}
+        with ThreadPoolExecutor(max_workers=trabalhadores or max(1, min(len(ordem), os.cpu_count() or 1))) as executor:
+            while pendentes or em_execucao:
+                # Dispara todos os nós cujas entradas já estão prontas
+                for nome in list(pendentes):
+                    no = self.nos[nome]
+                    if any(e in falhas for e in no.entradas):
+                        print(f"⚠️ {nome}: não calculada (entrada com erro)")
+                        falhas.add(nome)
+                        pendentes.remove(nome)
+                        continue
+                    if not all(e in hashes for e in no.entradas):
+                        continue
+                    pendentes.remove(nome)
+                    assinatura = no.assinatura(hashes, extra)
+                    if not precisa_recalcular(no, assinatura):
+                        print(f"⏭️ {nome}: entradas sem mudanças, tabela mantida")
+                        hashes[nome] = estado[nome]["hash"]
+                        resultados[nome] = estado[nome]["registros"]
+                        continue
+                    em_execucao[executor.submit(rodar, no, assinatura)] = (no, assinatura)
+
+                if not em_execucao:
+                    continue
+                prontos, _ = wait(em_execucao, return_when=FIRST_COMPLETED)
+                for futuro in prontos:
+                    no, assinatura = em_execucao.pop(futuro)
+                    try:
+                        df, registros = futuro.result()
+                    except Exception as e:
+                        print(f"❌ Erro ao gerar {no.nome}: {e}")
+                        falhas.add(no.nome)
+                        estado.pop(no.nome, None)
+                        continue
+                    dados[no.nome] = df
+                    hashes[no.nome] = hash_dataframe(df)
+                    if no.salvar:
+                        resultados[no.nome] = registros
+                        estado[no.nome] = {"assinatura": assinatura, "hash": hashes[no.nome], "registros": registros}
+        return {nome: resultados[nome] for nome in ordem if nome in resultados}
@@ -0,0 +1,198 @@
+# src/dimensoes.py
+
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from armazenamento import caminho_tabela, ler_tabela, salvar_tabela
+
+# Dimensões persistidas na camada Bronze (uma linha por chave; a posição é a chave substituta)
+TABELAS_DIMENSOES = ("dim_usuarios", "dim_ambientes")
+
+COLUNAS_DIM_USUARIOS = ['admin_recordguidasstring', 'admin_useremail', 'admin_userprincipalname',
+                        'admin_displayname', 'admin_department']
+COLUNAS_DIM_AMBIENTES = ['admin_environmentid', 'admin_displayname']
+
+
+def normalizar_chaves(serie, remover_prefixo_default=False):
+    """
+    Remove espaços nas pontas (e, opcionalmente, o prefixo "Default-") das chaves.
+
+    A normalização é feita só sobre os valores distintos e expandida pelos códigos, então
+    o custo depende do número de chaves diferentes, não do número de linhas. O resultado
+    é categórico: cada chave fica guardada uma única vez.
+    """
+    codigos, unicos = pd.factorize(serie)
+    unicos = pd.Series(unicos, dtype=object).str.strip()
+    if remover_prefixo_default:
+        unicos = unicos.str.replace(r'^Default-', '', regex=True)
+    # Chaves distintas podem coincidir depois da limpeza (ex.: " x" e "x")
+    codigos_limpos, limpos = pd.factorize(unicos)
+    if len(limpos) > 0:
+        codigos = np.where(codigos >= 0, codigos_limpos[np.maximum(codigos, 0)], -1)
+    return pd.Series(pd.Categorical.from_codes(codigos, categories=limpos), index=serie.index)
+
+
+class Dimensao:
+    """
+    Tabela de dimensão indexada pela sua chave natural (GUID já normalizado).
+
+    A linha i da tabela é a chave substituta i; buscar um atributo para uma coluna de fatos
+    é uma indexação de array (tabela[coluna][posicoes]), sem merge.
+    """
+
+    def __init__(self, tabela, coluna_chave):
+        self.tabela = tabela.reset_index(drop=True)
+        self.coluna_chave = coluna_chave
+        self.indice = pd.Index(self.tabela[coluna_chave].astype(object))
+
+    def __len__(self):
+        return len(self.tabela)
+
+    def posicoes(self, chaves):
+        """
+        Chave substituta (posição na dimensão) de cada chave; -1 quando não encontrada.
+        Só os valores distintos são procurados no índice.
+        """
+        codigos, unicos = pd.factorize(pd.Series(chaves))
+        if len(unicos) == 0:
+            return np.full(len(codigos), -1, dtype=np.int64)
+        posicoes_unicos = self.indice.get_indexer(np.asarray(unicos, dtype=object))
+        return np.where(codigos >= 0, posicoes_unicos[np.maximum(codigos, 0)], -1)
+
+    def atributo(self, posicoes, coluna):
+        """
+        Valores do atributo para as posições (nulo onde a posição é -1).
+        """
+        valores = self.tabela[coluna].to_numpy(dtype=object)
+        if len(valores) == 0:
+            return np.full(len(posicoes), None, dtype=object)
+        return np.where(posicoes >= 0, valores[np.maximum(posicoes, 0)], None)
+
+
+def _remover_espacos_colunas(df):
+    df = df.copy()
+    df.columns = df.columns.str.strip()
+    return df
+
+
+def _deduplicar(df, coluna_chave):
+    # Uma linha por chave (a primeira ocorrência), para a busca nunca multiplicar apps
+    df = df[df[coluna_chave].notna()]
+    df = df.drop_duplicates(coluna_chave, keep='first').reset_index(drop=True)
+    df.insert(0, 'chave', np.arange(len(df), dtype=np.int32))
+    return df
+
+
+def construir_dim_usuarios(df_usuarios):
+    """
+    Dimensão de usuários: GUID normalizado, UPN (com o e-mail como alternativa) e atributos.
+    """
+    df = _remover_espacos_colunas(df_usuarios)
+    colunas = [col for col in COLUNAS_DIM_USUARIOS if col in df.columns]
+    df = df[colunas].copy()
+    df['admin_recordguidasstring'] = normalizar_chaves(df['admin_recordguidasstring'])
+    df['admin_appownerupn'] = df['admin_userprincipalname'].fillna(df['admin_useremail'])
+    return _deduplicar(df, 'admin_recordguidasstring')
+
+
+def construir_dim_ambientes(df_ambientes):
+    """
+    Dimensão de ambientes: ID normalizado (sem espaços) e nome amigável.
+    """
+    df = _remover_espacos_colunas(df_ambientes)[COLUNAS_DIM_AMBIENTES].copy()
+    df['admin_environmentid'] = normalizar_chaves(df['admin_environmentid'])
+    return _deduplicar(df, 'admin_environmentid')
+
+
+def assinatura_fontes(*caminhos):
+    """
+    Identifica o conteúdo dos arquivos de origem (caminho absoluto, tamanho e data de
+    modificação), como chave do CacheDimensoes.
+    """
+    assinatura = []
+    for caminho in caminhos:
+        caminho = Path(caminho).resolve()
+        estado = caminho.stat()
+        assinatura.append((str(caminho), estado.st_size, estado.st_mtime_ns))
+    return tuple(assinatura)
+
+
+class CacheDimensoes:
+    """
+    Dimensões já construídas, compartilhadas entre execuções do pipeline no mesmo processo
+    (ex.: tenants do modo lote que usam o mesmo cadastro de usuários e ambientes).
+
+    A chave identifica as fontes (veja assinatura_fontes). Execuções simultâneas com a
+    mesma chave esperam a primeira construir as dimensões em vez de construí-las de novo.
+    As Dimensao guardadas são só lidas, então podem ser usadas por várias threads.
+    """
+
+    def __init__(self):
+        self._dimensoes = {}
+        self._travas = {}
+        self._trava = threading.Lock()
+        self.acertos = 0
+
+    def __len__(self):
+        return len(self._dimensoes)
+
+    def obter(self, chave, construir):
+        """
+        (dim_usuarios, dim_ambientes) da chave, chamando construir() só na primeira vez.
+        """
+        with self._trava:
+            trava = self._travas.setdefault(chave, threading.Lock())
+        with trava:
+            if chave in self._dimensoes:
+                with self._trava:
+                    self.acertos += 1
+                return self._dimensoes[chave]
+            dimensoes = construir()
+            self._dimensoes[chave] = dimensoes
+            return dimensoes
+
+
+def _construir_dimensoes(bronze_path, formato):
+    return (
+        Dimensao(construir_dim_usuarios(ler_tabela(bronze_path, "usuarios", formato, colunas=COLUNAS_DIM_USUARIOS)),
+                 'admin_recordguidasstring'),
+        Dimensao(construir_dim_ambientes(ler_tabela(bronze_path, "ambientes", formato, colunas=COLUNAS_DIM_AMBIENTES)),
+                 'admin_environmentid'),
+    )
+
+
+def construir_e_salvar_dimensoes(bronze_path, formato, cache=None, chave=None):
+    """
+    Constrói as dimensões a partir das tabelas Bronze de usuários e ambientes e as grava
+    na própria Bronze, para que a Silver não precise normalizar as chaves a cada execução.
+    Com `cache` (CacheDimensoes), dimensões já construídas para a mesma `chave` são
+    reaproveitadas e só gravadas.
+    """
+    if cache is None:
+        dim_usuarios, dim_ambientes = _construir_dimensoes(bronze_path, formato)
+    else:
+        dim_usuarios, dim_ambientes = cache.obter(chave, lambda: _construir_dimensoes(bronze_path, formato))
+    dims = {
+        "dim_usuarios": dim_usuarios.tabela,
+        "dim_ambientes": dim_ambientes.tabela,
+    }
+    for nome, df in dims.items():
+        salvar_tabela(df, bronze_path, nome, formato)
+    return {nome: len(df) for nome, df in dims.items()}
+
+
+def carregar_dimensoes(bronze_path, formato):
+    """
+    Dimensões de usuários e ambientes. Usa as gravadas pela Bronze; se ainda não existirem
+    (Bronze anterior a elas), constrói a partir das tabelas originais.
+    """
+    if all(caminho_tabela(bronze_path, nome, formato).exists() for nome in TABELAS_DIMENSOES):
+        return (
+            Dimensao(ler_tabela(bronze_path, "dim_usuarios", formato), 'admin_recordguidasstring'),
+            Dimensao(ler_tabela(bronze_path, "dim_ambientes", formato), 'admin_environmentid'),
+        )
+    print("Dimensões não encontradas na Bronze; construindo a partir de usuários e ambientes...")
+    return _construir_dimensoes(bronze_path, formato)
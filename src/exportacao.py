@@ -0,0 +1,293 @@
+# src/exportacao.py
+
+import hashlib
+import json
+import os
+import shutil
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+
+from armazenamento import DIRETORIO_DADOS
+from dag import como_numero, forma_canonica, hash_dataframe
+from snapshots import para_tabela_arrow
+
+# Exportação das tabelas finais para o Power BI: Parquet particionado por ambiente (só as
+# partições que mudaram são regravadas) e um relatório Excel para as áreas de negócio
+DIRETORIO_EXPORTACAO = "exportacao"
+ARQUIVO_MANIFESTO = "manifesto.json"
+
+# Coluna de ambiente usada como partição (a primeira presente na tabela)
+COLUNAS_PARTICAO = ("Nome_Ambiente", "Ambiente")
+
+# Linhas por row group: o mesmo tamanho dos segmentos do VertiPaq (1 milhão de linhas),
+# para o Power BI importar cada row group num segmento e o DirectQuery pular row groups
+# inteiros pelas estatísticas
+LINHAS_POR_ROW_GROUP = 1_000_000
+
+# Nome da partição de valores nulos (convenção do Hive, lida pelo Spark e pelo pyarrow)
+PARTICAO_NULA = "__HIVE_DEFAULT_PARTITION__"
+
+# Abas do relatório Excel: {aba: (camada, tabela)}
+RELATORIO_EXCEL = {
+    "KPIs": ("gold", "metricas_executivas_kpis"),
+    "Funil de Governança": ("gold", "dimensao_macro_governanca"),
+    "Apps Alta Adoção": ("gold", "apps_alta_adocao_final"),
+    "Apps Alta Adoção 30d": ("gold", "apps_alta_adocao_30d"),
+    "Ranking de Apps": ("gold", "ranking_usuarios_unicos"),
+    "Top Proprietários": ("gold", "top_proprietarios"),
+    "Proprietários por Ambiente": ("gold", "top_proprietarios_por_ambiente"),
+    "Proprietários por Depto": ("gold", "top_proprietarios_por_departamento"),
+    "Análise por Ambiente": ("gold", "analise_por_ambiente"),
+    "Tendência de Uso": ("gold", "tendencia_uso_diario"),
+}
+ARQUIVO_EXCEL = "relatorio_governanca.xlsx"
+
+
+def caminho_exportacao(diretorio_dados=None):
+    return Path(diretorio_dados or DIRETORIO_DADOS) / DIRETORIO_EXPORTACAO
+
+
+def ler_manifesto(diretorio_dados=None):
+    """
+    Manifesto da última exportação ({} se ainda não houve nenhuma).
+    """
+    caminho = caminho_exportacao(diretorio_dados) / ARQUIVO_MANIFESTO
+    if not caminho.exists():
+        return {}
+    with open(caminho, encoding="utf-8") as arquivo:
+        return json.load(arquivo)
+
+
+def _gravar_manifesto(manifesto, diretorio_dados=None):
+    caminho = caminho_exportacao(diretorio_dados) / ARQUIVO_MANIFESTO
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    temporario = caminho.with_suffix(".tmp")
+    with open(temporario, "w", encoding="utf-8") as arquivo:
+        json.dump(manifesto, arquivo, indent=2, ensure_ascii=False)
+    os.replace(temporario, caminho)
+
+
+def coluna_particao(df):
+    """
+    Coluna de ambiente da tabela, ou None para tabelas sem ambiente (gravadas num só arquivo).
+    """
+    return next((coluna for coluna in COLUNAS_PARTICAO if coluna in df.columns), None)
+
+
+def nome_particao(valor):
+    """Nome de diretório/arquivo de um valor de partição (escapado como no Hive)."""
+    if pd.isna(valor):
+        return PARTICAO_NULA
+    return quote(str(valor), safe=" ")
+
+
+def _gravar_parquet(tabela, caminho, linhas_por_row_group):
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    temporario = caminho.with_suffix(".tmp")
+    pq.write_table(tabela, temporario, row_group_size=linhas_por_row_group, write_statistics=True)
+    os.replace(temporario, caminho)
+
+
+def _particoes(df, coluna):
+    """
+    {nome da partição: posições (iloc) das linhas}, na ordem de primeira aparição.
+    """
+    if coluna is None:
+        return {None: np.arange(len(df))}
+    codigos, valores = pd.factorize(df[coluna], use_na_sentinel=False)
+    ordem = np.argsort(codigos, kind="stable")
+    inicios = np.flatnonzero(np.diff(codigos[ordem], prepend=-1))
+    return {
+        nome_particao(valores[codigos[linhas[0]]]): linhas
+        for linhas in np.split(ordem, inicios[1:]) if len(linhas)
+    }
+
+
+def _assinatura(hashes_linhas, colunas):
+    """
+    Hash de uma partição a partir dos hashes das suas linhas, sem depender da ordem: a
+    mesma partição gerada numa ordem diferente (ex.: execução incremental) não é regravada.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(json.dumps([str(coluna) for coluna in colunas]).encode("utf-8"))
+    h.update(np.sort(hashes_linhas).tobytes())
+    return h.hexdigest()
+
+
+def exportar_tabela(df, camada, nome, diretorio_dados=None, hive=False,
+                    linhas_por_row_group=LINHAS_POR_ROW_GROUP, anterior=None):
+    """
+    Grava a tabela em Parquet particionado pela coluna de ambiente, em
+    exportacao/<camada>/<nome>/:
+      - padrão: um arquivo por ambiente (<ambiente>.parquet), com a coluna de ambiente
+        mantida em cada arquivo (pronto para o conector "Pasta" do Power BI);
+      - hive=True: <coluna>=<ambiente>/<nome>.parquet, sem a coluna nos arquivos (o valor
+        vem do diretório, como esperam Spark, Fabric e pyarrow.dataset).
+    Tabelas sem coluna de ambiente viram um só arquivo, <nome>.parquet.
+
+    `anterior` é o registro da tabela no manifesto da exportação anterior: partições com o
+    mesmo hash não são regravadas, e as que deixaram de existir são removidas.
+    Retorna (registro do manifesto, {partição: registros} das partições gravadas).
+    """
+    coluna = coluna_particao(df)
+    opcoes = {"coluna_particao": coluna, "hive": hive, "linhas_por_row_group": linhas_por_row_group}
+    diretorio = caminho_exportacao(diretorio_dados) / camada / nome
+    anteriores = {}
+    if anterior is not None and all(anterior.get(chave) == valor for chave, valor in opcoes.items()):
+        anteriores = anterior.get("particoes", {})
+    elif diretorio.exists():
+        # Layout diferente do anterior: nenhum arquivo antigo é reaproveitado
+        shutil.rmtree(diretorio)
+
+    hashes_linhas = pd.util.hash_pandas_object(forma_canonica(df), index=False).to_numpy(dtype=np.uint64)
+    tabela_arrow = None
+    particoes, gravadas = {}, {}
+    for particao, linhas in _particoes(df, coluna).items():
+        if particao is None:
+            arquivo = Path(f"{nome}.parquet")
+        elif hive:
+            arquivo = Path(f"{quote(coluna, safe=' ')}={particao}") / f"{nome}.parquet"
+        else:
+            arquivo = Path(f"{particao}.parquet")
+        chave = particao or nome
+        assinatura = _assinatura(hashes_linhas[linhas], df.columns)
+        registro = anteriores.get(chave)
+        if registro is None or registro["hash"] != assinatura or not (diretorio / arquivo).exists():
+            # Conversão única da tabela inteira: todas as partições com o mesmo esquema
+            if tabela_arrow is None:
+                tabela_arrow = para_tabela_arrow(df, nome)
+            parte = tabela_arrow.take(linhas)
+            if hive and coluna is not None:
+                parte = parte.drop_columns([coluna])
+            _gravar_parquet(parte, diretorio / arquivo, linhas_por_row_group)
+            gravadas[chave] = len(linhas)
+        particoes[chave] = {"arquivo": arquivo.as_posix(), "registros": len(linhas), "hash": assinatura}
+
+    for chave, registro in anteriores.items():
+        if chave not in particoes:
+            obsoleto = diretorio / registro["arquivo"]
+            obsoleto.unlink(missing_ok=True)
+            if obsoleto.parent != diretorio and not any(obsoleto.parent.iterdir()):
+                obsoleto.parent.rmdir()
+
+    return {**opcoes, "particoes": particoes}, gravadas
+
+
+def _valores_excel(df):
+    """
+    Linhas do DataFrame como tuplas de valores que o openpyxl grava: números em texto viram
+    números, nulos viram células vazias e datas com fuso horário perdem o fuso (o Excel
+    não guarda fuso).
+    """
+    df = df.copy()
+    for coluna, serie in df.items():
+        if isinstance(serie.dtype, pd.DatetimeTZDtype):
+            df[coluna] = serie.dt.tz_localize(None)
+        elif (numeros := como_numero(serie)) is not None:
+            df[coluna] = numeros
+    df = df.astype(object)
+    return df.where(df.notna(), None).itertuples(index=False, name=None)
+
+
+def exportar_excel(abas, caminho):
+    """
+    Grava {aba: DataFrame} num arquivo .xlsx com o openpyxl em modo write-only: as linhas
+    vão direto para o arquivo, sem montar a planilha em memória. Cabeçalho em negrito e
+    congelado.
+    """
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    livro = Workbook(write_only=True)
+    negrito = Font(bold=True)
+    for aba, df in abas.items():
+        planilha = livro.create_sheet(title=aba[:31])
+        planilha.freeze_panes = "A2"
+        cabecalho = []
+        for coluna in df.columns:
+            celula = WriteOnlyCell(planilha, value=str(coluna))
+            celula.font = negrito
+            cabecalho.append(celula)
+        planilha.append(cabecalho)
+        for linha in _valores_excel(df):
+            planilha.append(linha)
+    temporario = caminho.with_name(f"~{caminho.name}")
+    livro.save(temporario)
+    os.replace(temporario, caminho)
+    return caminho
+
+
+def exportar(tabelas, diretorio_dados=None, hive=False, linhas_por_row_group=LINHAS_POR_ROW_GROUP,
+             excel=True, remover_ausentes=False):
+    """
+    Exporta {(camada, nome): DataFrame} em Parquet particionado (veja exportar_tabela) e,
+    com excel=True, as abas de RELATORIO_EXCEL presentes em `tabelas` no relatório Excel,
+    regravado só se alguma aba mudou.
+    Tabelas exportadas antes e ausentes de `tabelas` são mantidas, ou apagadas com
+    remover_ausentes=True.
+    Retorna {"camada/nome": registros gravados} (o relatório Excel entra como ARQUIVO_EXCEL).
+    """
+    manifesto = ler_manifesto(diretorio_dados)
+    anteriores = manifesto.get("tabelas", {})
+    registros_manifesto, gravadas = {}, {}
+    for (camada, nome), df in tabelas.items():
+        chave = f"{camada}/{nome}"
+        registro, particoes = exportar_tabela(
+            df, camada, nome, diretorio_dados, hive=hive,
+            linhas_por_row_group=linhas_por_row_group, anterior=anteriores.get(chave)
+        )
+        registros_manifesto[chave] = registro
+        if particoes:
+            gravadas[chave] = sum(particoes.values())
+            print(f"  📦 {chave}: {len(particoes)} de {len(registro['particoes'])} partições gravadas")
+
+    for chave in anteriores.keys() - registros_manifesto.keys():
+        if not remover_ausentes:
+            registros_manifesto[chave] = anteriores[chave]
+            continue
+        diretorio = caminho_exportacao(diretorio_dados) / chave
+        if diretorio.exists():
+            shutil.rmtree(diretorio)
+
+    registro_excel = manifesto.get("excel")
+    abas = {aba: tabelas[origem] for aba, origem in RELATORIO_EXCEL.items() if origem in tabelas}
+    if excel and abas:
+        caminho = caminho_exportacao(diretorio_dados) / ARQUIVO_EXCEL
+        assinaturas = [hash_dataframe(forma_canonica(df)) for df in abas.values()]
+        assinatura = hash_dataframe(pd.DataFrame({"aba": list(abas), "hash": assinaturas}))
+        if registro_excel is None or registro_excel["hash"] != assinatura or not caminho.exists():
+            exportar_excel(abas, caminho)
+            gravadas[ARQUIVO_EXCEL] = sum(len(df) for df in abas.values())
+            print(f"  📗 {ARQUIVO_EXCEL}: {len(abas)} abas gravadas")
+        registro_excel = {"arquivo": ARQUIVO_EXCEL, "abas": list(abas), "hash": assinatura}
+
+    # Partições removidas mudam o manifesto mesmo sem nenhum arquivo gravado
+    if gravadas or registros_manifesto != anteriores or registro_excel != manifesto.get("excel"):
+        _gravar_manifesto({
+            "exportado_em": datetime.now().isoformat(timespec="microseconds"),
+            "tabelas": registros_manifesto,
+            "excel": registro_excel,
+        }, diretorio_dados)
+    return gravadas
+
+
+def exportar_do_contexto(contexto, tabelas_por_camada, diretorio_dados=None, **opcoes):
+    """
+    Exporta as tabelas {camada: [nomes]} a partir do ContextoPipeline: as publicadas na
+    execução vêm da memória, as demais do disco. Tabelas inexistentes (ex.: tabelas Gold
+    vazias, que não são gravadas) têm a exportação anterior apagada.
+    """
+    tabelas = {}
+    for camada, nomes in tabelas_por_camada.items():
+        for nome in nomes:
+            try:
+                tabelas[(camada, nome)] = contexto.obter(camada, nome)
+            except FileNotFoundError:
+                continue
+    return exportar(tabelas, diretorio_dados, remover_ausentes=True, **opcoes)
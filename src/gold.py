@@ -1,79 +1,126 @@
 # src/gold.py
 
+import json
+import os
+
 import pandas as pd
 import numpy as np
-from pathlib import Path
 
-def processar_camada_gold():
+from armazenamento import FORMATO_PADRAO, caminho_camada, caminho_tabela, ler_tabela
+from contexto import CONTRATO_SILVER_GOLD, ContextoPipeline
+from dag import ARQUIVO_ESTADO_DAG, GrafoTabelas
+from instrumentacao import etapa
+from ranking import selecionar_top_k, selecionar_top_k_por_grupo
+
+# Fontes do grafo Gold e a tabela da Silver de cada uma (colunas em CONTRATO_SILVER_GOLD)
+FONTES_SILVER = {
+    "apps": "apps_com_metricas",
+    "ambientes": "resumo_por_ambiente",
+    "resumo_proprietarios": "resumo_por_proprietario",
+    "alta_adocao": "apps_alta_adocao",
+    "metricas_uso": "metricas_uso_auditoria",
+    "uso_diario": "uso_diario",
+}
+
+# Tamanho e critérios dos rankings (sobrescritos por execução em processar_camada_gold). Os
+# critérios são colunas separadas por vírgula: a primeira ordena e as seguintes desempatam.
+# Proprietários: usuarios_unicos, sessoes_totais, total_apps, complexidade_total.
+PARAMETROS_RANKING = {
+    "top_apps": 50,
+    "top_proprietarios": 30,
+    "top_por_grupo": 10,   # Posições por ambiente e por departamento
+    "criterios_apps": "usuarios_unicos,sessoes_totais",
+    "criterios_proprietarios": "usuarios_unicos,sessoes_totais,total_apps,complexidade_total",
+}
+
+# Nomes amigáveis das colunas dos rankings de proprietários
+COLUNAS_RANKING_PROPRIETARIOS = {
+    'Nome_Proprietario': 'Proprietário',
+    'total_apps': 'Total de Apps',
+    'usuarios_unicos': 'Total de Usuários',
+    'sessoes_totais': 'Total de Sessões',
+    'complexidade_total': 'Complexidade Total',
+    'Email_Proprietario': 'E-mail',
+    'Departamento': 'Departamento',
+}
+
+# Grafo das tabelas Gold. Fontes: apps, ambientes, resumo_proprietarios, alta_adocao, metricas_uso e
+# uso_diario (tabelas da Silver) e parametros_ranking (uma linha com PARAMETROS_RANKING).
+# Uma nova tabela Gold é só mais uma função registrada com @TABELAS_GOLD.tabela(nome, entradas).
+TABELAS_GOLD = GrafoTabelas()
+
+
+def resolver_parametros_ranking(parametros=None):
     """
-    Gera tabelas analíticas finais baseadas no contexto do notebook de auditoria.
+    Parâmetros padrão dos rankings combinados com os informados.
     """
-    print("🏆 Iniciando processamento da Camada Gold...")
+    return {**PARAMETROS_RANKING, **(parametros or {})}
 
-    # Caminhos
-    silver_path = Path("./data/silver")
-    gold_path = Path("./data/gold")
-    gold_path.mkdir(parents=True, exist_ok=True)
 
-    try:
-        # Carregar dados da Silver
-        print("📖 Carregando dados da camada Silver...")
-        df_apps_completo = pd.read_csv(silver_path / "apps_com_metricas.csv")
-        df_ambiente = pd.read_csv(silver_path / "resumo_por_ambiente.csv")
-        df_alta_adocao = pd.read_csv(silver_path / "apps_alta_adocao.csv")
-        df_metricas_uso = pd.read_csv(silver_path / "metricas_uso_auditoria.csv")
-        
-        print(f"✅ Apps com métricas completas: {len(df_apps_completo)} registros")
-        print(f"✅ Apps de alta adoção: {len(df_alta_adocao)} registros")
-        print(f"✅ Métricas de uso: {len(df_metricas_uso)} registros")
+def criterios_ranking(texto):
+    return [criterio.strip() for criterio in str(texto).split(",") if criterio.strip()]
+
+
+def _ranking(parametros_ranking, tamanho, criterios, df):
+    """
+    Tamanho (k) e colunas de ordenação de um ranking, lidos da fonte parametros_ranking.
+    """
+    linha = parametros_ranking.iloc[0]
+    colunas = criterios_ranking(linha[criterios])
+    desconhecidas = [coluna for coluna in colunas if coluna not in df.columns]
+    if not colunas or desconhecidas:
+        raise ValueError(f"Critérios de ranking inválidos em {criterios}: {desconhecidas or colunas}")
+    return int(linha[tamanho]), colunas
+
+
+def total_apps(apps, ambientes):
+    """
+    Total de apps no ambiente: a soma do resumo por ambiente, que conta todos os apps
+    (a tabela de apps da Silver só tem os de alta adoção).
+    """
+    if 'total_apps' in ambientes.columns and len(ambientes) > 0:
+        return int(ambientes['total_apps'].sum())
+    return len(apps)
 
-    except Exception as e:
-        print(f"❌ Erro ao carregar dados: {e}")
-        return
 
-    # 1. TABELA PRINCIPAL: APPS DE ALTA ADOÇÃO (como no notebook)
+# 1. TABELA PRINCIPAL: APPS DE ALTA ADOÇÃO (como no notebook)
+@TABELAS_GOLD.tabela("apps_alta_adocao_final", entradas=["alta_adocao"])
+def tabela_apps_alta_adocao(alta_adocao):
     print("🏆 Gerando tabela de Apps de Alta Adoção...")
-    
-    if len(df_alta_adocao) > 0:
-        colunas_alta_adocao = [
-            'Nome_App', 'Nome_Ambiente',
-            'Nome_Criador', 'total_proprietarios',
-            'usuarios_unicos', 'sessoes_totais', 'Data_Ultimo_Acesso'
-        ]
-        
-        # Verificar quais colunas existem
-        colunas_existentes = [col for col in colunas_alta_adocao if col in df_alta_adocao.columns]
-        
-        tabela_apps_alta_adocao = df_alta_adocao[colunas_existentes].copy()
-        
-        # Renomear colunas (como no notebook)
-        mapeamento_colunas = {
-            'Nome_App': 'Nome do App',
-            'Nome_Ambiente': 'Ambiente',
-            'Nome_Criador': 'Proprietário Principal',
-            'total_proprietarios': 'Total de Proprietários/Editores',
-            'usuarios_unicos': 'Usuários Únicos',
-            'sessoes_totais': 'Total de Sessões',
-            'Data_Ultimo_Acesso': 'Último Acesso'
-        }
-        
-        # Filter mapping to only existing columns
-        mapeamento_filtrado = {k: v for k, v in mapeamento_colunas.items() if k in tabela_apps_alta_adocao.columns}
-        if len(tabela_apps_alta_adocao) > 0 and mapeamento_filtrado:
-            new_columns = [mapeamento_filtrado.get(col, col) for col in tabela_apps_alta_adocao.columns]
-            tabela_apps_alta_adocao.columns = new_columns
-    else:
+    if len(alta_adocao) == 0:
         print("⚠️ Nenhum app de alta adoção encontrado")
-        tabela_apps_alta_adocao = pd.DataFrame()
+        return pd.DataFrame()
+
+    colunas_alta_adocao = [
+        'Nome_App', 'Nome_Ambiente',
+        'Nome_Criador', 'total_proprietarios',
+        'usuarios_unicos', 'sessoes_totais', 'Data_Ultimo_Acesso'
+    ]
+
+    # Verificar quais colunas existem
+    colunas_existentes = [col for col in colunas_alta_adocao if col in alta_adocao.columns]
+    tabela = alta_adocao[colunas_existentes].copy()
 
-    # 2. TABELA DE DIMENSÃO MACRO (como no notebook)
+    # Renomear colunas (como no notebook)
+    mapeamento_colunas = {
+        'Nome_App': 'Nome do App',
+        'Nome_Ambiente': 'Ambiente',
+        'Nome_Criador': 'Proprietário Principal',
+        'total_proprietarios': 'Total de Proprietários/Editores',
+        'usuarios_unicos': 'Usuários Únicos',
+        'sessoes_totais': 'Total de Sessões',
+        'Data_Ultimo_Acesso': 'Último Acesso'
+    }
+    return tabela.rename(columns=mapeamento_colunas)
+
+
+# 2. TABELA DE DIMENSÃO MACRO (como no notebook)
+@TABELAS_GOLD.tabela("dimensao_macro_governanca", entradas=["apps", "metricas_uso", "alta_adocao", "ambientes"])
+def tabela_dimensao_macro(apps, metricas_uso, alta_adocao, ambientes):
     print("📊 Gerando tabela de Dimensão Macro...")
-    
-    total_apps_ambiente = len(df_apps_completo)
-    apps_com_uso = len(df_metricas_uso)
-    apps_prioritarios = len(df_alta_adocao)
-    
-    tabela_dimensao_macro = pd.DataFrame({
+    total_apps_ambiente = total_apps(apps, ambientes)
+
+    tabela = pd.DataFrame({
         'Etapa do Funil de Governança': [
             '1. Total de Apps no Ambiente',
             '2. Apps com Registro de Uso (Universo Relevante)',
@@ -81,64 +128,105 @@ def processar_camada_gold():
         ],
         'Quantidade de Aplicativos': [
             total_apps_ambiente,
-            apps_com_uso,
-            apps_prioritarios
+            len(metricas_uso),
+            len(alta_adocao)
         ]
     })
-    
+
     # Adicionar percentual
-    tabela_dimensao_macro['% em Relação ao Total'] = (
-        tabela_dimensao_macro['Quantidade de Aplicativos'] / total_apps_ambiente * 100
+    tabela['% em Relação ao Total'] = (
+        tabela['Quantidade de Aplicativos'] / total_apps_ambiente * 100
     ).round(1).astype(str) + '%'
+    return tabela
+
 
-    # 3. RANKING DE APPS POR USUÁRIOS ÚNICOS
+# 3. RANKING DE APPS POR USUÁRIOS ÚNICOS
+@TABELAS_GOLD.tabela("ranking_usuarios_unicos", entradas=["apps", "parametros_ranking"])
+def tabela_ranking_usuarios(apps, parametros_ranking):
     print("👥 Gerando ranking por Usuários Únicos...")
-    
-    if 'usuarios_unicos' in df_apps_completo.columns:
-        ranking_usuarios = df_apps_completo.nlargest(50, 'usuarios_unicos')[
-            ['Nome_App', 'Nome_Criador', 'usuarios_unicos', 
-             'sessoes_totais', 'Nome_Ambiente']
-        ].copy()
-        
-        ranking_usuarios.columns = [
-            'Nome do App', 'Proprietário', 'Usuários Únicos', 
-            'Total de Sessões', 'Ambiente'
-        ]
-    else:
-        ranking_usuarios = pd.DataFrame()
+    if 'usuarios_unicos' not in apps.columns:
+        return pd.DataFrame()
+
+    # Seleção parcial dos k primeiros (sem ordenar todos os apps)
+    k, criterios = _ranking(parametros_ranking, "top_apps", "criterios_apps", apps)
+    ranking = selecionar_top_k(apps, criterios, k)[
+        ['Nome_App', 'Nome_Criador', 'usuarios_unicos',
+         'sessoes_totais', 'Nome_Ambiente']
+    ].copy()
+    ranking.columns = [
+        'Nome do App', 'Proprietário', 'Usuários Únicos',
+        'Total de Sessões', 'Ambiente'
+    ]
+    return ranking
+
 
-    # 4. ANÁLISE POR AMBIENTE
+# 4. ANÁLISE POR AMBIENTE
+@TABELAS_GOLD.tabela("analise_por_ambiente", entradas=["ambientes"])
+def tabela_analise_ambiente(ambientes):
     print("🌍 Gerando análise por Ambiente...")
-    
-    analise_ambiente = df_ambiente.copy()
-    if len(analise_ambiente) > 0:
-        analise_ambiente = analise_ambiente.sort_values('total_usuarios_unicos', ascending=False)
+    analise = ambientes.copy()
+    if len(analise) > 0:
+        analise = analise.sort_values('total_usuarios_unicos', ascending=False)
+    return analise
 
-    # 5. TOP PROPRIETÁRIOS (baseado no número de apps e usuários)
+
+# 5. TOP PROPRIETÁRIOS (baseado no número de apps e usuários)
+# Totais por proprietário (GUID), somando os ambientes do resumo da Silver; não é gravada
+@TABELAS_GOLD.tabela("proprietarios", entradas=["resumo_proprietarios"], salvar=False)
+def tabela_proprietarios(resumo_proprietarios):
+    # Apps sem GUID de proprietário não formam um "dono": ficam fora dos rankings
+    return resumo_proprietarios.groupby('ID_Proprietario', observed=True, sort=False).agg(
+        Nome_Proprietario=('Nome_Proprietario', 'first'),
+        Email_Proprietario=('Email_Proprietario', 'first'),
+        Departamento=('Departamento', 'first'),
+        total_apps=('total_apps', 'sum'),
+        usuarios_unicos=('usuarios_unicos', 'sum'),
+        sessoes_totais=('sessoes_totais', 'sum'),
+        complexidade_total=('complexidade_total', 'sum')
+    ).reset_index()
+
+
+@TABELAS_GOLD.tabela("top_proprietarios", entradas=["proprietarios", "parametros_ranking"])
+def tabela_top_proprietarios(proprietarios, parametros_ranking):
     print("👑 Gerando ranking de Proprietários...")
-    
-    if 'Nome_Criador' in df_apps_completo.columns:
-        top_proprietarios = df_apps_completo.groupby('Nome_Criador').agg({
-            'ID_App': 'count',
-            'usuarios_unicos': 'sum',
-            'sessoes_totais': 'sum'
-        }).reset_index()
-        
-        top_proprietarios.columns = [
-            'Proprietário', 'Total de Apps', 'Total de Usuários', 'Total de Sessões'
-        ]
-        top_proprietarios = top_proprietarios.sort_values('Total de Usuários', ascending=False).head(30)
-    else:
-        top_proprietarios = pd.DataFrame()
+    k, criterios = _ranking(parametros_ranking, "top_proprietarios", "criterios_proprietarios", proprietarios)
+    top = selecionar_top_k(proprietarios, criterios, k)
+    return top[list(COLUNAS_RANKING_PROPRIETARIOS)].rename(columns=COLUNAS_RANKING_PROPRIETARIOS)
+
 
-    # 6. MÉTRICAS EXECUTIVAS (KPIs principais)
+@TABELAS_GOLD.tabela("top_proprietarios_por_ambiente", entradas=["resumo_proprietarios", "parametros_ranking"])
+def tabela_top_proprietarios_ambiente(resumo_proprietarios, parametros_ranking):
+    print("🌍 Gerando ranking de Proprietários por Ambiente...")
+    k, criterios = _ranking(parametros_ranking, "top_por_grupo", "criterios_proprietarios", resumo_proprietarios)
+    resumo_proprietarios = resumo_proprietarios[resumo_proprietarios['ID_Proprietario'].notna()]
+    top = selecionar_top_k_por_grupo(resumo_proprietarios, 'ID_Ambiente', criterios, k, coluna_posicao='Posição')
+    colunas = {'Nome_Ambiente': 'Ambiente', 'Posição': 'Posição', **COLUNAS_RANKING_PROPRIETARIOS}
+    return top[list(colunas)].rename(columns=colunas)
+
+
+@TABELAS_GOLD.tabela("top_proprietarios_por_departamento", entradas=["proprietarios", "parametros_ranking"])
+def tabela_top_proprietarios_departamento(proprietarios, parametros_ranking):
+    print("🏢 Gerando ranking de Proprietários por Departamento...")
+    k, criterios = _ranking(parametros_ranking, "top_por_grupo", "criterios_proprietarios", proprietarios)
+    proprietarios = proprietarios.assign(
+        Departamento=proprietarios['Departamento'].astype(object).fillna('Não informado')
+    )
+    top = selecionar_top_k_por_grupo(proprietarios, 'Departamento', criterios, k, coluna_posicao='Posição')
+    colunas = {'Posição': 'Posição', **COLUNAS_RANKING_PROPRIETARIOS}
+    return top[list(colunas)].rename(columns=colunas)
+
+
+# 6. MÉTRICAS EXECUTIVAS (KPIs principais)
+@TABELAS_GOLD.tabela("metricas_executivas_kpis", entradas=["apps", "metricas_uso", "alta_adocao", "ambientes"])
+def tabela_metricas_executivas(apps, metricas_uso, alta_adocao, ambientes):
     print("📈 Calculando métricas executivas...")
-    
-    total_usuarios_unicos = df_apps_completo['usuarios_unicos'].sum() if 'usuarios_unicos' in df_apps_completo.columns else 0
-    total_sessoes = df_apps_completo['sessoes_totais'].sum() if 'sessoes_totais' in df_apps_completo.columns else 0
-    apps_com_uso_real = len(df_apps_completo[df_apps_completo['usuarios_unicos'] > 0]) if 'usuarios_unicos' in df_apps_completo.columns else 0
-    
-    metricas_executivas = pd.DataFrame({
+    total_apps_ambiente = total_apps(apps, ambientes)
+    apps_com_uso = len(metricas_uso)
+
+    total_usuarios_unicos = apps['usuarios_unicos'].sum() if 'usuarios_unicos' in apps.columns else 0
+    total_sessoes = apps['sessoes_totais'].sum() if 'sessoes_totais' in apps.columns else 0
+
+    return pd.DataFrame({
         'KPI': [
             'Total de Apps no Ambiente',
             'Apps com Registro de Uso',
@@ -151,40 +239,153 @@ def processar_camada_gold():
         'Valor': [
             total_apps_ambiente,
             apps_com_uso,
-            apps_prioritarios,
+            len(alta_adocao),
             total_usuarios_unicos,
             total_sessoes,
             round((apps_com_uso / total_apps_ambiente * 100), 1) if total_apps_ambiente > 0 else 0,
-            len(df_ambiente[df_ambiente['total_apps'] > 0]) if 'total_apps' in df_ambiente.columns else 0
+            len(ambientes[ambientes['total_apps'] > 0]) if 'total_apps' in ambientes.columns else 0
         ]
     })
 
-    # 7. SALVAR TODAS AS TABELAS
-    print("💾 Salvando tabelas da camada Gold...")
-    
-    tabelas = {
-        'apps_alta_adocao_final': tabela_apps_alta_adocao,
-        'dimensao_macro_governanca': tabela_dimensao_macro,
-        'ranking_usuarios_unicos': ranking_usuarios,
-        'analise_por_ambiente': analise_ambiente,
-        'top_proprietarios': top_proprietarios,
-        'metricas_executivas_kpis': metricas_executivas
+
+# 7. ALTA ADOÇÃO RECENTE (últimos 30 dias, das janelas móveis da Silver)
+@TABELAS_GOLD.tabela("apps_alta_adocao_30d", entradas=["apps"])
+def tabela_alta_adocao_30d(apps):
+    print("🔥 Gerando tabela de Alta Adoção nos últimos 30 dias...")
+    if 'usuarios_30d' not in apps.columns:
+        return pd.DataFrame()
+
+    # Mesma regra da alta adoção, com os usuários da janela de 30 dias no lugar do total
+    recentes = apps[apps['usuarios_30d'] > apps['total_proprietarios']]
+    tabela = recentes[[
+        'Nome_App', 'Nome_Ambiente', 'Nome_Criador', 'total_proprietarios',
+        'usuarios_30d', 'sessoes_30d', 'Razao_DAU_MAU', 'Ultimo_Acesso_Log'
+    ]].sort_values('usuarios_30d', ascending=False)
+    return tabela.rename(columns={
+        'Nome_App': 'Nome do App',
+        'Nome_Ambiente': 'Ambiente',
+        'Nome_Criador': 'Proprietário Principal',
+        'total_proprietarios': 'Total de Proprietários/Editores',
+        'usuarios_30d': 'Usuários (30 dias)',
+        'sessoes_30d': 'Sessões (30 dias)',
+        'Razao_DAU_MAU': 'DAU/MAU',
+        'Ultimo_Acesso_Log': 'Último Acesso (log)'
+    })
+
+
+# 8. TENDÊNCIA DIÁRIA DE USO (lida dos baldes diários, sem reler o log de auditoria)
+@TABELAS_GOLD.tabela("tendencia_uso_diario", entradas=["uso_diario"])
+def tabela_tendencia_diaria(uso_diario):
+    print("📅 Gerando tendência diária de uso...")
+    if len(uso_diario) == 0:
+        return pd.DataFrame()
+
+    tendencia = uso_diario.groupby('Dia', observed=True).agg(
+        usuarios_ativos=('User UPN', 'nunique'),
+        apps_ativos=('App ID', 'nunique'),
+        sessoes=('sessoes', 'sum')
+    ).reset_index()
+    tendencia.columns = ['Dia', 'Usuários Ativos', 'Apps Ativos', 'Total de Sessões']
+    return tendencia.sort_values('Dia')
+
+
+def _ler_estado_tabelas(gold_path):
+    caminho = gold_path / ARQUIVO_ESTADO_DAG
+    if not caminho.exists():
+        return {}
+    with open(caminho, encoding="utf-8") as arquivo:
+        return json.load(arquivo)
+
+
+def _gravar_estado_tabelas(gold_path, estado):
+    caminho = gold_path / ARQUIVO_ESTADO_DAG
+    temporario = caminho.with_suffix(".tmp")
+    with open(temporario, "w", encoding="utf-8") as arquivo:
+        json.dump(estado, arquivo, indent=2)
+    os.replace(temporario, caminho)
+
+
+def processar_camada_gold(formato=FORMATO_PADRAO, diretorio_dados=None, trabalhadores=None, recalcular=False,
+                          contexto=None, parametros_ranking=None):
+    """
+    Gera tabelas analíticas finais baseadas no contexto do notebook de auditoria.
+
+    As tabelas são os nós de TABELAS_GOLD: as independentes são calculadas e gravadas em
+    paralelo (até `trabalhadores` threads) e só as que tiveram entradas alteradas desde a
+    última execução são recalculadas (recalcular=True refaz todas).
+    As tabelas da Silver vêm do `contexto` (ContextoPipeline) quando publicadas na mesma
+    execução, sem reler os arquivos; senão são lidas do disco. As colunas de
+    CONTRATO_SILVER_GOLD são conferidas nos dois casos.
+    parametros_ranking sobrescreve PARAMETROS_RANKING (tamanho e critérios dos rankings);
+    mudá-los recalcula só as tabelas de ranking.
+    """
+    print("🏆 Iniciando processamento da Camada Gold...")
+
+    contexto_proprio = contexto is None
+    if contexto_proprio:
+        contexto = ContextoPipeline(diretorio_dados, formato)
+    try:
+        return _processar_camada_gold(contexto, formato, diretorio_dados, trabalhadores, recalcular,
+                                      resolver_parametros_ranking(parametros_ranking))
+    finally:
+        if contexto_proprio:
+            contexto.fechar()
+
+
+def _processar_camada_gold(contexto, formato, diretorio_dados, trabalhadores, recalcular, parametros_ranking):
+    gold_path = caminho_camada("gold", diretorio_dados)
+
+    try:
+        # Carregar dados da Silver (apenas as colunas usadas, com os tipos do esquema)
+        print("📖 Carregando dados da camada Silver...")
+        with etapa("carregar_silver") as medida:
+            fontes = {
+                fonte: contexto.obter("silver", tabela, CONTRATO_SILVER_GOLD[tabela])
+                for fonte, tabela in FONTES_SILVER.items()
+            }
+            medida.linhas_saida = sum(len(df) for df in fontes.values())
+        # Parâmetros como fonte do grafo: entram na assinatura só dos nós de ranking
+        fontes["parametros_ranking"] = pd.DataFrame([parametros_ranking])
+        em_memoria = [tabela for tabela in FONTES_SILVER.values() if contexto.em_memoria("silver", tabela)]
+        print(f"✅ Tabelas recebidas em memória: {len(em_memoria)} de {len(FONTES_SILVER)}")
+
+        print(f"✅ Apps com métricas completas: {len(fontes['apps'])} registros")
+        print(f"✅ Apps de alta adoção: {len(fontes['alta_adocao'])} registros")
+        print(f"✅ Métricas de uso: {len(fontes['metricas_uso'])} registros")
+        print(f"✅ Baldes diários de uso: {len(fontes['uso_diario'])} registros")
+
+    except Exception as e:
+        print(f"❌ Erro ao carregar dados: {e}")
+        return
+
+    def gravar(nome, df):
+        if len(df) > 0:
+            contexto.publicar("gold", nome, df)
+            print(f"✅ {nome}: {len(df)} registros")
+        else:
+            print(f"⚠️ {nome}: tabela vazia, não salva")
+        return len(df)
+
+    def carregar(nome):
+        caminho = caminho_tabela(gold_path, nome, formato)
+        return ler_tabela(gold_path, nome, formato, tipar=True) if caminho.exists() else pd.DataFrame()
+
+    # Tabelas apagadas em disco precisam ser geradas de novo, mesmo com entradas iguais
+    estado = {
+        nome: registro for nome, registro in _ler_estado_tabelas(gold_path).items()
+        if registro["registros"] == 0 or caminho_tabela(gold_path, nome, formato).exists()
     }
-    
-    results = {}
-    for nome, df in tabelas.items():
-        try:
-            if len(df) > 0:
-                df.to_csv(gold_path / f"{nome}.csv", index=False, encoding='utf-8')
-                print(f"✅ {nome}: {len(df)} registros salvos")
-                results[nome] = len(df)
-            else:
-                print(f"⚠️ {nome}: tabela vazia, não salva")
-                results[nome] = 0
-        except Exception as e:
-            print(f"❌ Erro ao salvar {nome}: {e}")
+
+    print("💾 Gerando e salvando tabelas da camada Gold...")
+    results = TABELAS_GOLD.executar(
+        fontes, gravar, carregar,
+        estado=estado, trabalhadores=trabalhadores, recalcular=recalcular, extra=formato
+    )
+    # O estado só é gravado depois das tabelas: uma tabela registrada existe em disco
+    contexto.aguardar("gold")
+    _gravar_estado_tabelas(gold_path, estado)
 
     print("\n🎉 Camada Gold processada com sucesso!")
     print(f"📁 Dados salvos em: {gold_path}")
-    
-    return results
\ No newline at end of file
+
+    return results
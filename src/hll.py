@@ -0,0 +1,235 @@
+# src/hll.py
+
+import math
+import numpy as np
+import pandas as pd
+
+# Erro relativo padrão da contagem aproximada de usuários distintos (2%)
+ERRO_PADRAO = 0.02
+
+# Faixa de precisão aceita: 2^4 a 2^16 registradores por app
+PRECISAO_MIN = 4
+PRECISAO_MAX = 16
+
+
+def precisao_para_erro(erro=ERRO_PADRAO):
+    """
+    Menor precisão p cujo erro padrão (1.04 / sqrt(2^p)) fica dentro do erro pedido.
+    """
+    if erro <= 0:
+        raise ValueError("O erro relativo do HyperLogLog deve ser maior que zero")
+    registradores = (1.04 / erro) ** 2
+    return int(min(PRECISAO_MAX, max(PRECISAO_MIN, math.ceil(math.log2(registradores)))))
+
+
+def erro_da_precisao(precisao):
+    """
+    Erro relativo padrão de um esboço com 2^precisao registradores.
+    """
+    return 1.04 / math.sqrt(2 ** precisao)
+
+
+def hash_valores(valores):
+    """
+    Hash de 64 bits, estável entre execuções, para cada valor (ex.: 'User UPN').
+    """
+    return pd.util.hash_pandas_object(pd.Series(valores), index=False).to_numpy(dtype=np.uint64)
+
+
+def _comprimento_bits(x):
+    # Número de bits significativos de cada uint64, sem passar por float (exato)
+    x = x.copy()
+    n = np.zeros(x.shape, dtype=np.uint8)
+    for deslocamento in (32, 16, 8, 4, 2, 1):
+        maior = x >= (np.uint64(1) << np.uint64(deslocamento))
+        n[maior] += deslocamento
+        x[maior] >>= np.uint64(deslocamento)
+    n += (x > 0).astype(np.uint8)
+    return n
+
+
+def _alpha(m):
+    if m == 16:
+        return 0.673
+    if m == 32:
+        return 0.697
+    if m == 64:
+        return 0.709
+    return 0.7213 / (1 + 1.079 / m)
+
+
+def limite_esparso(precisao):
+    """
+    Valores distintos até os quais uma chave fica no modo esparso: os pares (chave, hash),
+    16 bytes cada, ocupam no máximo o mesmo que os 2^precisao registradores do modo denso.
+    """
+    return 2 ** precisao // 16
+
+
+def _pares_unicos(codigos, hashes):
+    # Pares (código da chave, hash) distintos, ordenados por chave e hash
+    ordem = np.lexsort((hashes, codigos))
+    codigos, hashes = codigos[ordem], hashes[ordem]
+    novo = np.ones(len(codigos), dtype=bool)
+    novo[1:] = (codigos[1:] != codigos[:-1]) | (hashes[1:] != hashes[:-1])
+    return codigos[novo], hashes[novo]
+
+
+def _inserir(registros, linhas, hashes, precisao):
+    # Atualiza os registradores das linhas informadas com os hashes (máximo por registrador)
+    p = np.uint64(precisao)
+    indice = (hashes >> (np.uint64(64) - p)).astype(np.int64)
+    resto = hashes << p
+    # Posição do primeiro bit 1 nos 64 - p bits restantes
+    rank = (np.uint8(64) - _comprimento_bits(resto) + np.uint8(1)).astype(np.uint8)
+    rank = np.minimum(rank, np.uint8(64 - precisao + 1))
+    np.maximum.at(registros, (linhas, indice), rank)
+
+
+class EsbocosHLL:
+    """
+    Conjunto de esboços HyperLogLog, um por chave (ex.: um por app).
+
+    Cada chave começa no modo esparso: os hashes distintos dos seus valores, guardados
+    como pares (código da chave, hash), com contagem exata. Quando passa de
+    limite_esparso(precisao) valores distintos, a chave vira densa: uma linha de 2^precisao
+    registradores uint8 numa matriz só das chaves densas. Assim apps com poucos usuários
+    (a maioria) não ocupam 2^precisao bytes cada, e inserir, mesclar e estimar continuam
+    vetorizados para todas as chaves de uma vez.
+    """
+
+    def __init__(self, chaves, codigos, hashes, densas, registros, precisao):
+        self.chaves = np.asarray(chaves, dtype=object)
+        # Modo esparso: pares distintos (posição da chave em `chaves`, hash do valor)
+        self.codigos = np.asarray(codigos, dtype=np.int64)
+        self.hashes = np.asarray(hashes, dtype=np.uint64)
+        # Modo denso: posições das chaves densas e os seus registradores, na mesma ordem
+        self.densas = np.asarray(densas, dtype=np.int64)
+        self.registros = registros
+        self.precisao = precisao
+
+    @property
+    def erro_relativo(self):
+        return erro_da_precisao(self.precisao)
+
+    @classmethod
+    def vazio(cls, precisao):
+        return cls._compor(np.array([], dtype=object), np.array([], dtype=np.int64),
+                           np.array([], dtype=np.uint64), precisao)
+
+    @classmethod
+    def _compor(cls, chaves, codigos, hashes, precisao, densas=None, registros=None):
+        """
+        Monta os esboços a partir dos pares (código, hash), que podem ter repetições, e de
+        linhas densas já existentes (`densas` pode repetir chaves: os registradores são
+        combinados). Chaves que passam do limite do modo esparso viram densas.
+        """
+        n = len(chaves)
+        m = 2 ** precisao
+        densas = np.array([], dtype=np.int64) if densas is None else densas
+        codigos, hashes = _pares_unicos(codigos, hashes)
+
+        e_densa = np.bincount(codigos, minlength=n) > limite_esparso(precisao)
+        e_densa[densas] = True
+        todas_densas = np.flatnonzero(e_densa)
+        posicao = np.full(n, -1, dtype=np.int64)
+        posicao[todas_densas] = np.arange(len(todas_densas))
+
+        novos_registros = np.zeros((len(todas_densas), m), dtype=np.uint8)
+        if len(densas):
+            np.maximum.at(novos_registros, posicao[densas], registros)
+        na_densa = e_densa[codigos]
+        _inserir(novos_registros, posicao[codigos[na_densa]], hashes[na_densa], precisao)
+        return cls(chaves, codigos[~na_densa], hashes[~na_densa], todas_densas, novos_registros, precisao)
+
+    @classmethod
+    def de_eventos(cls, chaves, valores, precisao):
+        """
+        Constrói um esboço por chave a partir de pares (chave, valor), ex.: (App ID, User UPN).
+        """
+        pares = pd.DataFrame({'chave': chaves, 'valor': valores}).dropna()
+        codigos, unicos = pd.factorize(pares['chave'])
+        hashes = hash_valores(pares['valor']) if len(pares) else np.array([], dtype=np.uint64)
+        return cls._compor(np.asarray(unicos, dtype=object), codigos.astype(np.int64), hashes, precisao)
+
+    def mesclar(self, outro):
+        """
+        União de dois conjuntos de esboços (máximo registrador a registrador).
+        """
+        if outro.precisao != self.precisao:
+            raise ValueError(
+                f"Não é possível mesclar esboços com precisões diferentes ({self.precisao} e {outro.precisao})"
+            )
+        chaves = pd.Index(self.chaves).union(pd.Index(outro.chaves), sort=False)
+        posicoes = [chaves.get_indexer(esboco.chaves) for esboco in (self, outro)]
+        return EsbocosHLL._compor(
+            chaves.to_numpy(dtype=object),
+            np.concatenate([posicoes[0][self.codigos], posicoes[1][outro.codigos]]),
+            np.concatenate([self.hashes, outro.hashes]),
+            self.precisao,
+            densas=np.concatenate([posicoes[0][self.densas], posicoes[1][outro.densas]]),
+            registros=np.concatenate([self.registros, outro.registros]),
+        )
+
+    def estimar(self):
+        """
+        Estimativa de valores distintos por chave, como pd.Series indexada pela chave
+        (exata para as chaves no modo esparso).
+        """
+        estimativa = np.bincount(self.codigos, minlength=len(self.chaves)).astype(np.float64)
+        if len(self.densas):
+            m = self.registros.shape[1]
+            soma = np.power(2.0, -self.registros.astype(np.float64)).sum(axis=1)
+            densa = _alpha(m) * m * m / soma
+
+            # Correção para cardinalidades pequenas (contagem linear)
+            zeros = (self.registros == 0).sum(axis=1)
+            pequena = (densa <= 2.5 * m) & (zeros > 0)
+            densa[pequena] = m * np.log(m / zeros[pequena])
+            estimativa[self.densas] = densa
+        return pd.Series(estimativa, index=pd.Index(self.chaves, name='chave'))
+
+    def margem(self, estimativa=None):
+        """
+        Margem de erro (um erro padrão) da estimativa de cada chave, como pd.Series indexada
+        pela chave: zero no modo esparso, em que a contagem é exata.
+        """
+        estimativa = self.estimar() if estimativa is None else estimativa
+        margem = np.zeros(len(self.chaves), dtype=np.float64)
+        margem[self.densas] = estimativa.to_numpy()[self.densas] * self.erro_relativo
+        return pd.Series(margem, index=pd.Index(self.chaves, name='chave'))
+
+    def salvar(self, caminho):
+        """
+        Serializa os esboços em um arquivo .npz (compactado).
+        """
+        np.savez_compressed(
+            caminho,
+            chaves=self.chaves.astype(str),
+            codigos=self.codigos,
+            hashes=self.hashes,
+            densas=self.densas,
+            registros=self.registros,
+            precisao=np.array(self.precisao)
+        )
+
+    @classmethod
+    def carregar(cls, caminho):
+        with np.load(caminho, allow_pickle=False) as dados:
+            chaves = dados['chaves'].astype(object)
+            precisao = int(dados['precisao'])
+            if 'densas' not in dados:
+                # Formato anterior: todas as chaves densas
+                return cls(chaves, [], [], np.arange(len(chaves)), dados['registros'], precisao)
+            return cls(chaves, dados['codigos'], dados['hashes'], dados['densas'], dados['registros'], precisao)
+
+
+def mesclar_arquivos(caminhos):
+    """
+    Mescla esboços salvos em vários arquivos (ex.: dias ou ambientes diferentes).
+    """
+    resultado = None
+    for caminho in caminhos:
+        esboco = EsbocosHLL.carregar(caminho)
+        resultado = esboco if resultado is None else resultado.mesclar(esboco)
+    return resultado
@@ -0,0 +1,237 @@
+# src/incremental.py
+
+import json
+import os
+import pandas as pd
+from datetime import datetime
+
+from armazenamento import FORMATO_PADRAO, caminho_camada, caminho_tabela, converter_datas, ler_tabela, salvar_tabela
+from hll import EsbocosHLL, precisao_para_erro
+
+# Arquivo que registra a marca d'água e a versão vigente do estado
+ARQUIVO_CONTROLE = "controle.json"
+
+# Identificador do evento no export do Dataverse (chave primária da tabela de auditoria)
+COLUNA_ID_EVENTO = 'Audit Log'
+
+COLUNAS_AUDITORIA_INCREMENTAL = [COLUNA_ID_EVENTO, 'App ID', 'User UPN', 'Creation Time']
+
+
+def _ler_controle(estado_path):
+    caminho = estado_path / ARQUIVO_CONTROLE
+    if not caminho.exists():
+        return None
+    with open(caminho, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _gravar_controle(estado_path, controle):
+    # Grava em arquivo temporário e troca de uma vez: o controle só aponta para
+    # a nova versão do estado depois que todos os arquivos dela foram escritos.
+    caminho = estado_path / ARQUIVO_CONTROLE
+    temporario = estado_path / f"{ARQUIVO_CONTROLE}.tmp"
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(controle, f, ensure_ascii=False, indent=2)
+    os.replace(temporario, caminho)
+
+
+def _caminho_esbocos(estado_path, versao):
+    return estado_path / f"usuarios_{versao}.npz"
+
+
+def _remover_versao(estado_path, versao, formato):
+    caminhos = [caminho_tabela(estado_path, f"sessoes_{versao}", formato),
+                caminho_tabela(estado_path, f"usuarios_{versao}", formato),
+                _caminho_esbocos(estado_path, versao)]
+    for caminho in caminhos:
+        if caminho.exists():
+            caminho.unlink()
+
+
+def _modo_distintos(precisao):
+    return "exato" if precisao is None else f"hll-p{precisao}"
+
+
+def _estado_vazio(precisao=None):
+    vazio_sessoes = pd.DataFrame({'App ID': pd.Series(dtype=str), 'sessoes_totais': pd.Series(dtype='int64')})
+    if precisao is not None:
+        return None, vazio_sessoes, EsbocosHLL.vazio(precisao)
+    vazio_usuarios = pd.DataFrame({'App ID': pd.Series(dtype=str), 'User UPN': pd.Series(dtype=str)})
+    return None, vazio_sessoes, vazio_usuarios
+
+
+def carregar_estado(estado_path, formato=FORMATO_PADRAO, precisao=None):
+    """
+    Carrega o estado vigente: (marca d'água, sessões por app, usuários distintos por app).
+    Os usuários distintos são os pares app/usuário (modo exato) ou os esboços HyperLogLog
+    com a precisão informada (modo aproximado).
+    Sem estado anterior (ou gravado em outro formato/modo), retorna marca d'água None e estado vazio.
+    """
+    controle = _ler_controle(estado_path)
+    if (controle is None or controle.get("formato") != formato
+            or controle.get("distintos", "exato") != _modo_distintos(precisao)):
+        return _estado_vazio(precisao)
+
+    versao = controle["versao"]
+    df_sessoes = ler_tabela(estado_path, f"sessoes_{versao}", formato, tipar=True, tabela="estado_sessoes")
+    if precisao is not None:
+        usuarios = EsbocosHLL.carregar(_caminho_esbocos(estado_path, versao))
+    else:
+        usuarios = ler_tabela(estado_path, f"usuarios_{versao}", formato, tipar=True, tabela="estado_usuarios")
+    marca_dagua = None
+    if controle.get("marca_dagua"):
+        # Horários com fuso são comparados em UTC, sem fuso (como converter_datas)
+        marca_dagua = pd.Timestamp(controle["marca_dagua"])
+        if marca_dagua.tzinfo is not None:
+            marca_dagua = marca_dagua.tz_convert(None)
+    return marca_dagua, df_sessoes, usuarios
+
+
+def chaves_eventos(df):
+    """
+    Identificador de cada evento de auditoria: o Id do evento ou, em exports sem essa
+    coluna, o próprio conteúdo (app, usuário e horário).
+    """
+    if COLUNA_ID_EVENTO in df.columns:
+        return df[COLUNA_ID_EVENTO].astype(str)
+    return df['App ID'].astype(str) + '|' + df['User UPN'].astype(str) + '|' + df['Creation Time'].astype(str)
+
+
+def ler_auditoria_nova(bronze_path, marca_dagua, formato=FORMATO_PADRAO, eventos_na_marca=None):
+    """
+    Lê apenas os eventos de auditoria que ainda não foram incorporados.
+    Em Parquet o filtro é aplicado na leitura (predicate pushdown).
+
+    Com `eventos_na_marca` (chaves dos eventos já incorporados com horário igual à marca
+    d'água, veja chaves_eventos) o filtro é "a partir da marca": eventos que chegam
+    atrasados com o mesmo 'Creation Time' da marca são lidos, e só os já incorporados
+    são descartados. Sem ele, só eventos estritamente posteriores à marca.
+    """
+    inclui_marca = eventos_na_marca is not None
+    filtros = None
+    if marca_dagua is not None and formato == "parquet":
+        filtros = [('Creation Time', '>=' if inclui_marca else '>', marca_dagua)]
+
+    df = ler_tabela(bronze_path, "auditoria", formato, colunas=COLUNAS_AUDITORIA_INCREMENTAL, filtros=filtros)
+    df['Creation Time'] = converter_datas(df['Creation Time'], 'Creation Time')
+
+    if marca_dagua is not None:
+        # Sem marca d'água válida não há como saber se o evento é novo: ele é descartado
+        sem_data = df['Creation Time'].isna().sum()
+        if sem_data:
+            print(f"⚠️ {sem_data} eventos sem 'Creation Time' válido ignorados no modo incremental")
+        if inclui_marca:
+            df = df[df['Creation Time'] >= marca_dagua]
+            repetidos = (df['Creation Time'] == marca_dagua) & chaves_eventos(df).isin(set(eventos_na_marca))
+            df = df[~repetidos]
+        else:
+            df = df[df['Creation Time'] > marca_dagua]
+    return df
+
+
+def atualizar_metricas_incrementais(bronze_path, estado_path=None, formato=FORMATO_PADRAO,
+                                    reconstruir=False, diretorio_dados=None, erro_hll=None,
+                                    retornar_eventos=False):
+    """
+    Atualiza as métricas de uso por app incorporando apenas os eventos de auditoria
+    ainda não incorporados: a partir da marca d'água ('Creation Time') da última
+    execução, sem os eventos da marca que o estado já contém.
+
+    O estado guarda as sessões por app e os pares distintos (App ID, User UPN), que
+    podem ser unidos a cada execução para manter `usuarios_unicos` exato. Com erro_hll
+    informado, guarda esboços HyperLogLog por app no lugar dos pares (veja hll.py).
+    Retorna um DataFrame com admin_appinternalname, usuarios_unicos e sessoes_totais (e,
+    com erro_hll, margem_usuarios: a margem de erro de cada estimativa, veja EsbocosHLL.margem).
+    Com retornar_eventos=True retorna (métricas, eventos novos lidos, marca d'água anterior),
+    para que outros estados incrementais (ex.: series_temporais.atualizar_uso_diario)
+    incorporem os mesmos eventos sem ler a auditoria de novo.
+    """
+    precisao = None if erro_hll is None else precisao_para_erro(erro_hll)
+    estado_path = estado_path or caminho_camada("silver/estado_metricas", diretorio_dados)
+    estado_path.mkdir(parents=True, exist_ok=True)
+
+    controle_anterior = _ler_controle(estado_path)
+    if reconstruir:
+        print("Reconstruindo o estado incremental a partir de todo o log de auditoria...")
+        marca_dagua, df_sessoes, usuarios = _estado_vazio(precisao)
+    else:
+        marca_dagua, df_sessoes, usuarios = carregar_estado(estado_path, formato, precisao)
+    print(f"Marca d'água atual: {marca_dagua if marca_dagua is not None else 'nenhuma (carga completa)'}")
+
+    # Eventos já incorporados no horário da marca d'água (estados gravados antes deste
+    # registro não o têm: aí a leitura continua estritamente posterior à marca)
+    eventos_na_marca = []
+    if marca_dagua is not None:
+        eventos_na_marca = controle_anterior.get("eventos_na_marca")
+    marca_anterior = marca_dagua
+
+    df_novos = ler_auditoria_nova(bronze_path, marca_dagua, formato, eventos_na_marca)
+    print(f"Eventos de auditoria novos: {len(df_novos)}")
+
+    if len(df_novos) > 0:
+        # Sessões são somadas ao estado anterior
+        novas_sessoes = df_novos.groupby('App ID', observed=True).size().rename('sessoes_totais').reset_index()
+        df_sessoes = (
+            pd.concat([df_sessoes, novas_sessoes], ignore_index=True)
+            .groupby('App ID', as_index=False, observed=True)['sessoes_totais'].sum()
+        )
+
+        # Usuários distintos: união dos pares app/usuário ou dos esboços
+        if precisao is not None:
+            usuarios = usuarios.mesclar(EsbocosHLL.de_eventos(df_novos['App ID'], df_novos['User UPN'], precisao))
+        else:
+            novos_pares = df_novos[['App ID', 'User UPN']].dropna().drop_duplicates()
+            usuarios = (
+                pd.concat([usuarios, novos_pares], ignore_index=True)
+                .drop_duplicates()
+            )
+
+        nova_marca = df_novos['Creation Time'].max()
+        if pd.notna(nova_marca) and (marca_dagua is None or nova_marca > marca_dagua):
+            marca_dagua = nova_marca
+            eventos_na_marca = []
+        if marca_dagua is not None:
+            na_marca = chaves_eventos(df_novos[df_novos['Creation Time'] == marca_dagua])
+            eventos_na_marca = sorted(set(eventos_na_marca or []).union(na_marca))
+
+        versao = datetime.now().strftime("%Y%m%d%H%M%S%f")
+        salvar_tabela(df_sessoes, estado_path, f"sessoes_{versao}", formato, tabela="estado_sessoes")
+        if precisao is not None:
+            usuarios.salvar(_caminho_esbocos(estado_path, versao))
+        else:
+            salvar_tabela(usuarios, estado_path, f"usuarios_{versao}", formato, tabela="estado_usuarios")
+        _gravar_controle(estado_path, {
+            "versao": versao,
+            "formato": formato,
+            "distintos": _modo_distintos(precisao),
+            "marca_dagua": marca_dagua.isoformat() if marca_dagua is not None else None,
+            "eventos_na_marca": eventos_na_marca,
+            "atualizado_em": datetime.now().isoformat(timespec="seconds"),
+        })
+        if controle_anterior is not None:
+            _remover_versao(estado_path, controle_anterior["versao"], controle_anterior.get("formato", formato))
+        print(f"Estado incremental atualizado. Nova marca d'água: {marca_dagua}")
+
+    if precisao is not None:
+        estimativa = usuarios.estimar()
+        contagem_usuarios = pd.concat([
+            estimativa.round().rename('usuarios_unicos'),
+            usuarios.margem(estimativa).rename('margem_usuarios'),
+        ], axis=1).rename_axis('App ID')
+    else:
+        contagem_usuarios = usuarios.groupby('App ID', observed=True).size().rename('usuarios_unicos')
+
+    df_metricas = pd.merge(
+        contagem_usuarios.reset_index(),
+        df_sessoes,
+        on='App ID',
+        how='outer'
+    )
+    df_metricas['usuarios_unicos'] = df_metricas['usuarios_unicos'].fillna(0).astype(int)
+    df_metricas['sessoes_totais'] = df_metricas['sessoes_totais'].fillna(0).astype(int)
+    if 'margem_usuarios' in df_metricas.columns:
+        df_metricas['margem_usuarios'] = df_metricas['margem_usuarios'].fillna(0)
+    df_metricas = df_metricas.rename(columns={'App ID': 'admin_appinternalname'})
+    if retornar_eventos:
+        return df_metricas, df_novos, marca_anterior
+    return df_metricas
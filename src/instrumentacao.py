@@ -0,0 +1,290 @@
+# src/instrumentacao.py
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+
+from armazenamento import caminho_camada
+
+try:
+    import resource  # Indisponível no Windows: o pico de memória fica sem medição
+except ImportError:
+    resource = None
+
+# Relatórios de execução ficam em ./data/relatorios_execucao
+CAMADA_RELATORIOS = "relatorios_execucao"
+
+# Uma etapa é considerada regressão se ficou mais lenta que isso (fração) em relação à execução anterior...
+LIMIAR_REGRESSAO = 0.25
+# ...e se a diferença absoluta passa deste valor (segundos), para ignorar ruído em etapas rápidas
+MINIMO_REGRESSAO_S = 0.5
+# Só são comparadas execuções cujo volume de dados (registros lidos) difere no máximo isso (fração)
+TOLERANCIA_VOLUME = 0.1
+
+# Relatórios guardados: a cada gravação, os mais antigos (e os seus traces) são apagados
+MAX_RELATORIOS = 50
+
+
+def _pico_memoria_mb():
+    """
+    Pico de memória residente do processo até agora, em MB (None se não disponível).
+    """
+    if resource is None:
+        return None
+    # ru_maxrss vem em KB no Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Etapa:
+    """
+    Uma medição: tempo de parede, tempo de CPU, aumento do pico de memória e linhas.
+    O código medido pode preencher linhas_entrada / linhas_saida durante a execução.
+    """
+
+    def __init__(self, nome, pai=None, linhas_entrada=None):
+        self.nome = nome
+        self.pai = pai
+        self.linhas_entrada = linhas_entrada
+        self.linhas_saida = None
+        self.thread = threading.get_ident()
+        self.inicio = None
+        self.duracao_s = None
+        self.cpu_s = None
+        self.memoria_pico_delta_mb = None
+        self.erro = None
+
+    def como_dict(self):
+        return {
+            "nome": self.nome,
+            "pai": self.pai,
+            "inicio": self.inicio,
+            "duracao_s": self.duracao_s,
+            "cpu_s": self.cpu_s,
+            "memoria_pico_delta_mb": self.memoria_pico_delta_mb,
+            "linhas_entrada": self.linhas_entrada,
+            "linhas_saida": self.linhas_saida,
+            "thread": self.thread,
+            "erro": self.erro,
+        }
+
+
+class Rastreador:
+    """
+    Coleta as etapas medidas em uma execução do pipeline.
+
+    As etapas podem ser aninhadas: cada thread mantém a sua pilha, e o nome completo
+    de uma etapa inclui o da etapa que a contém (ex.: "silver/metricas_uso").
+    """
+
+    def __init__(self):
+        self._trava = threading.Lock()
+        self._local = threading.local()
+        self.etapas = []
+        self.inicio = time.time()
+
+    def _pilha(self):
+        if not hasattr(self._local, "pilha"):
+            self._local.pilha = []
+        return self._local.pilha
+
+    def atual(self):
+        """
+        Nome completo da etapa aberta na thread atual (None fora de qualquer etapa).
+        """
+        pilha = self._pilha()
+        return pilha[-1].nome if pilha else None
+
+    @contextmanager
+    def etapa(self, nome, linhas_entrada=None, pai=None):
+        # pai explícito: etapas disparadas em outras threads continuam aninhadas na original
+        pilha = self._pilha()
+        pai = pai or self.atual()
+        medida = Etapa(f"{pai}/{nome}" if pai else nome, pai, linhas_entrada)
+        pilha.append(medida)
+
+        memoria_antes = _pico_memoria_mb()
+        # CPU do processo inteiro: em etapas concorrentes inclui o trabalho das outras threads
+        cpu_antes = time.process_time()
+        medida.inicio = time.time() - self.inicio
+        relogio = time.perf_counter()
+        try:
+            yield medida
+        except Exception as e:
+            medida.erro = str(e)
+            raise
+        finally:
+            medida.duracao_s = time.perf_counter() - relogio
+            medida.cpu_s = time.process_time() - cpu_antes
+            memoria_depois = _pico_memoria_mb()
+            if memoria_antes is not None:
+                medida.memoria_pico_delta_mb = memoria_depois - memoria_antes
+            pilha.pop()
+            with self._trava:
+                self.etapas.append(medida)
+
+    def relatorio(self, **metadados):
+        """
+        Relatório da execução em um dicionário serializável em JSON.
+        """
+        with self._trava:
+            etapas = sorted((e.como_dict() for e in self.etapas), key=lambda e: e["inicio"])
+        return {
+            "inicio": datetime.fromtimestamp(self.inicio).isoformat(timespec="seconds"),
+            "duracao_total_s": time.time() - self.inicio,
+            "pico_memoria_mb": _pico_memoria_mb(),
+            "metadados": metadados,
+            "etapas": etapas,
+        }
+
+
+# Rastreador da execução atual (substituído a cada execução por iniciar_execucao)
+_rastreador = Rastreador()
+
+
+def iniciar_execucao():
+    """
+    Começa uma nova coleta de medições, descartando as da execução anterior.
+    """
+    global _rastreador
+    _rastreador = Rastreador()
+    return _rastreador
+
+
+def rastreador_atual():
+    return _rastreador
+
+
+def etapa(nome, linhas_entrada=None, pai=None):
+    """
+    Mede um trecho do pipeline:
+
+        with etapa("metricas_uso", linhas_entrada=len(df)) as medida:
+            ...
+            medida.linhas_saida = len(resultado)
+    """
+    return _rastreador.etapa(nome, linhas_entrada, pai)
+
+
+def etapa_atual():
+    return _rastreador.atual()
+
+
+def instrumentar(nome=None):
+    """
+    Decorador que mede cada chamada da função como uma etapa.
+    """
+    def decorar(funcao):
+        @wraps(funcao)
+        def medida(*args, **kwargs):
+            with etapa(nome or funcao.__name__):
+                return funcao(*args, **kwargs)
+        return medida
+    return decorar
+
+
+def trace_chrome(relatorio):
+    """
+    Converte o relatório para o formato Trace Event (chrome://tracing, Perfetto).
+    """
+    eventos = []
+    for e in relatorio["etapas"]:
+        eventos.append({
+            "name": e["nome"].rsplit("/", 1)[-1],
+            "cat": e["nome"].split("/", 1)[0],
+            "ph": "X",
+            "ts": int(e["inicio"] * 1_000_000),
+            "dur": int(e["duracao_s"] * 1_000_000),
+            "pid": os.getpid(),
+            "tid": e["thread"],
+            "args": {
+                chave: e[chave] for chave in ("cpu_s", "memoria_pico_delta_mb", "linhas_entrada", "linhas_saida", "erro")
+                if e[chave] is not None
+            },
+        })
+    return {"traceEvents": eventos, "displayTimeUnit": "ms"}
+
+
+def perfil_execucao(opcoes, etapas_do_cache=(), registros=None):
+    """
+    O que precisa ser igual para duas execuções serem comparadas: as opções que mudam o
+    trabalho feito, as etapas puladas pelo cache e o volume de dados (registros lidos).
+    Vai nos metadados do relatório, em "perfil".
+    """
+    return {"opcoes": opcoes, "etapas_do_cache": sorted(etapas_do_cache), "registros": registros}
+
+
+def perfis_comparaveis(perfil, outro, tolerancia=TOLERANCIA_VOLUME):
+    """
+    True se as execuções dos dois perfis fizeram o mesmo trabalho sobre volumes parecidos.
+    """
+    if perfil is None or outro is None:
+        return False
+    if perfil["opcoes"] != outro.get("opcoes") or perfil["etapas_do_cache"] != outro.get("etapas_do_cache"):
+        return False
+    registros, outros = perfil["registros"], outro.get("registros")
+    if not registros or not outros:
+        return registros == outros
+    return abs(registros - outros) <= tolerancia * max(registros, outros)
+
+
+def salvar_relatorio(relatorio, diretorio_dados=None, trace=False, manter=MAX_RELATORIOS):
+    """
+    Grava o relatório (e opcionalmente o trace do Chrome) em data/relatorios_execucao,
+    mantendo só os `manter` relatórios mais recentes. Retorna o caminho do relatório.
+    """
+    diretorio = caminho_camada(CAMADA_RELATORIOS, diretorio_dados)
+    carimbo = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    caminho = diretorio / f"execucao_{carimbo}.json"
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        json.dump(relatorio, arquivo, indent=2, ensure_ascii=False)
+    if trace:
+        with open(diretorio / f"trace_{carimbo}.json", "w", encoding="utf-8") as arquivo:
+            json.dump(trace_chrome(relatorio), arquivo)
+
+    if manter:
+        for antigo in sorted(diretorio.glob("execucao_*.json"))[:-manter]:
+            antigo.unlink(missing_ok=True)
+            (diretorio / antigo.name.replace("execucao_", "trace_", 1)).unlink(missing_ok=True)
+    return caminho
+
+
+def carregar_relatorio_anterior(diretorio_dados=None, perfil=None):
+    """
+    Relatório mais recente já gravado, ou None. Com `perfil` (perfil_execucao), o mais
+    recente de uma execução comparável a ele (perfis_comparaveis).
+    """
+    diretorio = caminho_camada(CAMADA_RELATORIOS, diretorio_dados)
+    for caminho in sorted(diretorio.glob("execucao_*.json"), reverse=True):
+        with open(caminho, encoding="utf-8") as arquivo:
+            relatorio = json.load(arquivo)
+        if perfil is None or perfis_comparaveis(perfil, relatorio.get("metadados", {}).get("perfil")):
+            return relatorio
+    return None
+
+
+def comparar_relatorios(atual, anterior, limiar=LIMIAR_REGRESSAO, minimo_s=MINIMO_REGRESSAO_S):
+    """
+    Etapas que ficaram mais lentas que a execução anterior além do limiar (a anterior deve
+    ser comparável, veja carregar_relatorio_anterior).
+    Retorna uma lista de (nome, duração anterior, duração atual).
+    """
+    def duracoes(relatorio):
+        # Etapas repetidas (ex.: uma por fonte) são somadas pelo nome
+        totais = {}
+        for e in relatorio["etapas"]:
+            totais[e["nome"]] = totais.get(e["nome"], 0.0) + e["duracao_s"]
+        return totais
+
+    antes, agora = duracoes(anterior), duracoes(atual)
+    regressoes = []
+    for nome, duracao in agora.items():
+        base = antes.get(nome)
+        if base is None:
+            continue
+        if duracao - base > minimo_s and duracao > base * (1 + limiar):
+            regressoes.append((nome, base, duracao))
+    return regressoes
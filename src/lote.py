@@ -0,0 +1,302 @@
+# src/lote.py
+
+import argparse
+import json
+import re
+from functools import partial
+from pathlib import Path
+
+import pandas as pd
+
+from armazenamento import DIRETORIO_DADOS, FORMATOS, FORMATO_PADRAO, caminho_camada, salvar_tabela
+from bronze import FONTES_DE_DADOS, processar_camada_bronze
+from contexto import ContextoPipeline
+from dimensoes import CacheDimensoes, assinatura_fontes, carregar_dimensoes
+from gold import COLUNAS_RANKING_PROPRIETARIOS, criterios_ranking, processar_camada_gold, resolver_parametros_ranking
+from instrumentacao import etapa, iniciar_execucao, salvar_relatorio
+from paralelo import executar_em_threads
+from ranking import selecionar_top_k
+from regras import PARAMETROS_PADRAO
+from silver import processar_camada_silver
+
+# Modo lote: vários tenants (ou unidades de negócio) processados numa única execução, a
+# partir de um manifesto JSON:
+#
+#   {
+#     "parametros_ranking": {"top_proprietarios": 30},          (opcional, vale para todos)
+#     "tenants": [
+#       {
+#         "nome": "eletrobras",
+#         "fontes": {"apps": "...", "ambientes": "...", "auditoria": "...", "usuarios": "..."},
+#         "parametros_regras": {"ambiente_promocao": "eletrobras", "limiar_produtividade_pessoal": 10},
+#         "parametros_ranking": {"top_apps": 20}                 (opcional)
+#       }
+#     ]
+#   }
+#
+# Caminhos relativos são resolvidos a partir do diretório do manifesto. Cada tenant tem as
+# suas camadas em data/lote/tenants/<nome>/ e o consolidado de todos fica em
+# data/lote/consolidado/gold/.
+DIRETORIO_LOTE = "lote"
+DIRETORIO_TENANTS = "tenants"
+DIRETORIO_CONSOLIDADO = "consolidado"
+
+# Tenants processados ao mesmo tempo (threads no mesmo processo, que compartilham o
+# CacheDimensoes e os módulos já importados)
+TENANTS_SIMULTANEOS = 2
+
+# Nomes de tenant viram nomes de diretório
+PADRAO_NOME_TENANT = re.compile(r"^[\w.-]+$")
+
+
+def caminho_lote(diretorio_dados=None):
+    return Path(diretorio_dados or DIRETORIO_DADOS) / DIRETORIO_LOTE
+
+
+def carregar_manifesto(caminho):
+    """
+    Lê e valida o manifesto de tenants. Retorna (tenants, parâmetros de ranking gerais),
+    com os caminhos das fontes resolvidos e os parâmetros de ranking de cada tenant já
+    combinados com os gerais.
+    """
+    caminho = Path(caminho)
+    with open(caminho, encoding="utf-8") as arquivo:
+        manifesto = json.load(arquivo)
+
+    tenants = manifesto.get("tenants") or []
+    if not tenants:
+        raise ValueError(f"Manifesto {caminho} sem tenants")
+    ranking_geral = manifesto.get("parametros_ranking", {})
+    nomes = set()
+    resolvidos = []
+    for tenant in tenants:
+        nome = str(tenant.get("nome", ""))
+        if not PADRAO_NOME_TENANT.match(nome):
+            raise ValueError(f"Nome de tenant inválido: {nome!r} (use letras, números, '.', '-' e '_')")
+        if nome in nomes:
+            raise ValueError(f"Tenant repetido no manifesto: {nome}")
+        nomes.add(nome)
+
+        fontes = tenant.get("fontes", {})
+        faltando = [fonte for fonte in FONTES_DE_DADOS if fonte not in fontes]
+        if faltando:
+            raise ValueError(f"Tenant {nome} sem as fontes: {', '.join(faltando)}")
+        parametros_regras = tenant.get("parametros_regras", {})
+        desconhecidos = [parametro for parametro in parametros_regras if parametro not in PARAMETROS_PADRAO]
+        if desconhecidos:
+            raise ValueError(f"Tenant {nome} com parâmetros de regras desconhecidos: {', '.join(desconhecidos)}")
+
+        resolvidos.append({
+            "nome": nome,
+            "fontes": {fonte: str(caminho.parent / fontes[fonte]) for fonte in FONTES_DE_DADOS},
+            "parametros_regras": parametros_regras,
+            "parametros_ranking": {**ranking_geral, **tenant.get("parametros_ranking", {})},
+        })
+    return resolvidos, ranking_geral
+
+
+def processar_tenant(tenant, formato=FORMATO_PADRAO, diretorio_dados=None, cache_dimensoes=None,
+                     recalcular=False, data_referencia=None):
+    """
+    Bronze → Silver → Gold de um tenant, em data/lote/tenants/<nome>/.
+
+    As dimensões vêm do cache_dimensoes (CacheDimensoes) compartilhado entre os tenants:
+    tenants com os mesmos arquivos de usuários e ambientes as constroem uma única vez.
+    Retorna os registros por camada e as tabelas usadas no consolidado.
+    """
+    nome = tenant["nome"]
+    diretorio = caminho_lote(diretorio_dados) / DIRETORIO_TENANTS / nome
+    print(f"\n🏢 Tenant {nome}: processando em {diretorio}")
+
+    with ContextoPipeline(diretorio, formato) as contexto:
+        with etapa("bronze") as medida:
+            bronze = processar_camada_bronze(
+                formato=formato, diretorio_dados=diretorio, fontes_de_dados=tenant["fontes"],
+                cache_dimensoes=cache_dimensoes
+            )
+            medida.linhas_saida = sum(bronze.values())
+        if set(bronze) != set(FONTES_DE_DADOS):
+            raise RuntimeError(f"Falha na camada Bronze do tenant {nome}")
+
+        bronze_path = caminho_camada("bronze", diretorio)
+        dimensoes = None
+        if cache_dimensoes is not None:
+            chave = assinatura_fontes(tenant["fontes"]["usuarios"], tenant["fontes"]["ambientes"])
+            dimensoes = cache_dimensoes.obter(chave, lambda: carregar_dimensoes(bronze_path, formato))
+
+        with etapa("silver") as medida:
+            silver = processar_camada_silver(
+                formato=formato, diretorio_dados=diretorio, parametros_regras=tenant["parametros_regras"],
+                data_referencia=data_referencia, contexto=contexto, dimensoes=dimensoes
+            )
+            medida.linhas_saida = sum(silver.values()) if silver else 0
+        if not silver:
+            raise RuntimeError(f"Falha na camada Silver do tenant {nome}")
+
+        with etapa("gold") as medida:
+            gold = processar_camada_gold(
+                formato=formato, diretorio_dados=diretorio, recalcular=recalcular,
+                contexto=contexto, parametros_ranking=tenant["parametros_ranking"]
+            )
+            medida.linhas_saida = sum(gold.values()) if gold else 0
+        if gold is None:
+            raise RuntimeError(f"Falha na camada Gold do tenant {nome}")
+
+        tabelas = {
+            tabela: contexto.obter("silver", tabela)
+            for tabela in ("resumo_por_ambiente", "resumo_por_proprietario", "apps_alta_adocao")
+        }
+        tabelas["metricas_executivas_kpis"] = contexto.obter("gold", "metricas_executivas_kpis")
+
+    return {"registros": {"bronze": bronze, "silver": silver, "gold": gold}, "tabelas": tabelas}
+
+
+def _com_tenant(tabelas_por_tenant, tabela):
+    partes = [
+        tabelas[tabela].assign(Tenant=nome)[["Tenant", *tabelas[tabela].columns]]
+        for nome, tabelas in tabelas_por_tenant.items()
+    ]
+    return pd.concat(partes, ignore_index=True) if partes else pd.DataFrame()
+
+
+def consolidar(tabelas_por_tenant, parametros_ranking=None):
+    """
+    Tabelas Gold de todos os tenants, a partir das tabelas de cada um ({tenant: {tabela: df}}):
+    resumo por tenant, análise por ambiente e KPIs com a coluna Tenant, e o ranking de
+    proprietários entre todos os tenants (um proprietário é um GUID dentro de um tenant).
+    """
+    parametros_ranking = resolver_parametros_ranking(parametros_ranking)
+    ambientes = _com_tenant(tabelas_por_tenant, "resumo_por_ambiente")
+    proprietarios = _com_tenant(tabelas_por_tenant, "resumo_por_proprietario")
+
+    resumo_tenants = pd.DataFrame([
+        {
+            'Tenant': nome,
+            'Ambientes': len(tabelas["resumo_por_ambiente"]),
+            'Total de Apps': tabelas["resumo_por_ambiente"]['total_apps'].sum(),
+            'Apps de Alta Adoção': len(tabelas["apps_alta_adocao"]),
+            'Proprietários': tabelas["resumo_por_proprietario"]['ID_Proprietario'].nunique(),
+            'Usuários Únicos': tabelas["resumo_por_ambiente"]['total_usuarios_unicos'].sum(),
+            'Total de Sessões': tabelas["resumo_por_ambiente"]['total_sessoes'].sum(),
+        }
+        for nome, tabelas in tabelas_por_tenant.items()
+    ])
+
+    proprietarios = proprietarios[proprietarios['ID_Proprietario'].notna()]
+    proprietarios = proprietarios.groupby(['Tenant', 'ID_Proprietario'], observed=True, sort=False).agg(
+        Nome_Proprietario=('Nome_Proprietario', 'first'),
+        Email_Proprietario=('Email_Proprietario', 'first'),
+        Departamento=('Departamento', 'first'),
+        total_apps=('total_apps', 'sum'),
+        usuarios_unicos=('usuarios_unicos', 'sum'),
+        sessoes_totais=('sessoes_totais', 'sum'),
+        complexidade_total=('complexidade_total', 'sum')
+    ).reset_index()
+    top = selecionar_top_k(proprietarios, criterios_ranking(parametros_ranking["criterios_proprietarios"]),
+                           parametros_ranking["top_proprietarios"])
+    colunas = {'Tenant': 'Tenant', **COLUNAS_RANKING_PROPRIETARIOS}
+
+    return {
+        "resumo_tenants": resumo_tenants,
+        "analise_por_ambiente": ambientes.sort_values('total_usuarios_unicos', ascending=False),
+        "top_proprietarios": top[list(colunas)].rename(columns=colunas),
+        "metricas_executivas_kpis": _com_tenant(tabelas_por_tenant, "metricas_executivas_kpis"),
+    }
+
+
+def processar_lote(tenants, formato=FORMATO_PADRAO, diretorio_dados=None, simultaneos=TENANTS_SIMULTANEOS,
+                   recalcular=False, parametros_ranking=None, data_referencia=None):
+    """
+    Processa os tenants ao mesmo tempo, em até `simultaneos` threads, e grava o consolidado
+    em data/lote/consolidado/gold. Um tenant com erro não interrompe os outros nem entra
+    no consolidado.
+    Retorna (registros por tenant, erros por tenant).
+    """
+    cache_dimensoes = CacheDimensoes()
+    tarefas = {
+        tenant["nome"]: partial(processar_tenant, tenant, formato, diretorio_dados, cache_dimensoes,
+                                recalcular, data_referencia)
+        for tenant in tenants
+    }
+    resultados, erros, duracoes = executar_em_threads(tarefas, simultaneos, prefixo="tenant:")
+    print(f"\n🧊 Dimensões construídas: {len(cache_dimensoes)}, reaproveitadas do cache: {cache_dimensoes.acertos}")
+
+    if resultados:
+        with etapa("consolidar") as medida:
+            tabelas = consolidar({nome: resultados[nome]["tabelas"] for nome in tarefas if nome in resultados},
+                                 parametros_ranking)
+            consolidado_path = caminho_camada(f"{DIRETORIO_LOTE}/{DIRETORIO_CONSOLIDADO}/gold", diretorio_dados)
+            for nome, df in tabelas.items():
+                salvar_tabela(df, consolidado_path, nome, formato)
+            medida.linhas_saida = sum(len(df) for df in tabelas.values())
+        print(f"🌐 Consolidado de {len(resultados)} tenants salvo em: {consolidado_path}")
+
+    print("\n📊 RESUMO DO LOTE:")
+    for nome in tarefas:
+        if nome in erros:
+            print(f"  ❌ {nome}: {erros[nome]} ({duracoes[nome]:.1f}s)")
+        else:
+            registros = resultados[nome]["registros"]
+            print(f"  ✅ {nome}: Bronze {sum(registros['bronze'].values())}, Silver {sum(registros['silver'].values())} "
+                  f"registros, Gold {len(registros['gold'])} tabelas ({duracoes[nome]:.1f}s)")
+    return {nome: resultado["registros"] for nome, resultado in resultados.items()}, erros
+
+
+def parse_args(argv=None):
+    """
+    Lê as opções de linha de comando do modo lote.
+    """
+    parser = argparse.ArgumentParser(description="Pipeline de governança CoE para vários tenants (modo lote)")
+    parser.add_argument("manifesto", help="Manifesto JSON com os tenants, suas fontes e parâmetros")
+    parser.add_argument(
+        "--simultaneos",
+        type=int,
+        default=TENANTS_SIMULTANEOS,
+        help=f"Tenants processados ao mesmo tempo (padrão: {TENANTS_SIMULTANEOS})"
+    )
+    parser.add_argument(
+        "--formato",
+        choices=FORMATOS,
+        default=FORMATO_PADRAO,
+        help="Formato de armazenamento das camadas de cada tenant"
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Recalcula todas as tabelas Gold, mesmo com entradas iguais"
+    )
+    parser.add_argument(
+        "--trace",
+        action="store_true",
+        help="Grava também um trace da execução no formato do Chrome (chrome://tracing, Perfetto)"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    print("🚀 Inicializando pipeline em lote...")
+    rastreador = iniciar_execucao()
+    resultados, erros = {}, {}
+    try:
+        tenants, parametros_ranking = carregar_manifesto(args.manifesto)
+        print(f"📋 {len(tenants)} tenants no manifesto, até {args.simultaneos} ao mesmo tempo")
+        # Mesma data de referência (Dias_Sem_Uso) para todos os tenants
+        resultados, erros = processar_lote(
+            tenants, formato=args.formato, simultaneos=args.simultaneos, recalcular=args.force,
+            parametros_ranking=parametros_ranking, data_referencia=pd.Timestamp.now()
+        )
+    except Exception as e:
+        print(f"❌ Erro crítico no lote: {e}")
+    finally:
+        relatorio = rastreador.relatorio(
+            motor="pandas",
+            opcoes=vars(args),
+            resultados={"tenants": resultados, "erros": {nome: str(erro) for nome, erro in erros.items()}}
+        )
+        caminho = salvar_relatorio(relatorio, diretorio_dados=caminho_lote(), trace=args.trace)
+        print(f"\n⏱️ Relatório de execução: {caminho} ({relatorio['duracao_total_s']:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,326 @@
-from bronze import processar_camada_bronze
-from silver import processar_camada_silver
-from gold import processar_camada_gold
+import argparse
+from datetime import date
 
-def main():
+from armazenamento import FORMATOS, FORMATO_PADRAO, caminho_camada, caminho_tabela
+from bronze import FONTES_DE_DADOS, ORCAMENTO_MEMORIA_MB
+from cache import CacheEtapas, MAX_ENTRADAS_POR_ETAPA
+from contexto import CONTRATO_SILVER_GOLD, ContextoPipeline
+from exportacao import LINHAS_POR_ROW_GROUP, caminho_exportacao, exportar_do_contexto
+from gold import TABELAS_GOLD
+from hll import ERRO_PADRAO
+from instrumentacao import (
+    LIMIAR_REGRESSAO, carregar_relatorio_anterior, comparar_relatorios, etapa, iniciar_execucao, perfil_execucao,
+    salvar_relatorio
+)
+from motores import MOTORES, MOTOR_PADRAO, obter_motor
+from snapshots import caminho_snapshots, publicar_do_contexto
+
+# Módulos cujo código define cada etapa (parte da impressão digital do cache)
+MODULOS_ETAPAS = {
+    "bronze": ["bronze", "dimensoes", "paralelo", "armazenamento"],
+    "silver": ["silver", "contexto", "dimensoes", "regras", "series_temporais", "incremental", "hll", "paralelo",
+               "armazenamento"],
+    "gold": ["gold", "contexto", "armazenamento"],
+}
+
+# Tabelas da Silver lidas pela Gold
+TABELAS_SILVER_GOLD = list(CONTRATO_SILVER_GOLD)
+
+# Tabelas publicadas como snapshots Arrow para notebooks e dashboards
+TABELAS_SNAPSHOTS = {
+    "silver": TABELAS_SILVER_GOLD,
+    "gold": [nome for nome, no in TABELAS_GOLD.nos.items() if no.salvar],
+}
+
+# Tabelas exportadas para o Power BI (Parquet por ambiente; as Gold também no relatório Excel)
+TABELAS_EXPORTACAO = {
+    "silver": ["apps_com_metricas", "resumo_por_ambiente", "resumo_por_proprietario", "uso_diario", "apps_limpeza"],
+    "gold": TABELAS_SNAPSHOTS["gold"],
+}
+
+# Opções que mudam o trabalho feito pelas etapas: só execuções com os mesmos valores têm
+# os tempos comparados na detecção de regressões
+OPCOES_COMPARAVEIS = (
+    "motor", "spark_master", "formato", "streaming", "orcamento_memoria_mb", "incremental", "reconstruir_estado",
+    "usuarios_aproximados", "erro_hll", "paralelo", "trabalhadores", "silver_em_memoria", "sem_snapshots",
+    "sem_exportacao", "exportacao_hive", "linhas_por_row_group",
+)
+
+def parse_args(argv=None):
+    """
+    Lê as opções de linha de comando do pipeline.
+    """
+    parser = argparse.ArgumentParser(description="Pipeline de governança CoE (Bronze → Silver → Gold)")
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help="Lê as fontes da camada Bronze em blocos, com memória limitada"
+    )
+    parser.add_argument(
+        "--orcamento-memoria-mb",
+        type=int,
+        default=ORCAMENTO_MEMORIA_MB,
+        help=f"Memória aproximada por bloco no modo streaming (padrão: {ORCAMENTO_MEMORIA_MB} MB)"
+    )
+    parser.add_argument(
+        "--formato",
+        choices=FORMATOS,
+        default=FORMATO_PADRAO,
+        help="Formato de armazenamento das camadas Bronze/Silver/Gold"
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Atualiza as métricas de uso só com os eventos de auditoria novos (marca d'água)"
+    )
+    parser.add_argument(
+        "--reconstruir-estado",
+        action="store_true",
+        help="No modo incremental, descarta o estado salvo e relê todo o log de auditoria"
+    )
+    parser.add_argument(
+        "--usuarios-aproximados",
+        action="store_true",
+        help="Estima usuarios_unicos com HyperLogLog em vez da contagem exata"
+    )
+    parser.add_argument(
+        "--erro-hll",
+        type=float,
+        default=ERRO_PADRAO,
+        help=f"Erro relativo aceito na contagem aproximada (padrão: {ERRO_PADRAO})"
+    )
+    parser.add_argument(
+        "--paralelo",
+        action="store_true",
+        help="Processa a camada Silver em partições num pool de processos"
+    )
+    parser.add_argument(
+        "--trabalhadores",
+        type=int,
+        default=None,
+        help="Número de processos do modo paralelo (padrão: número de CPUs)"
+    )
+    parser.add_argument(
+        "--motor",
+        choices=sorted(MOTORES),
+        default=MOTOR_PADRAO,
+        help="Motor de execução: pandas (padrão) ou spark (tabelas Delta)"
+    )
+    parser.add_argument(
+        "--spark-master",
+        default=None,
+        help="Master do Spark (padrão: local[*])"
+    )
+    parser.add_argument(
+        "--silver-em-memoria",
+        action="store_true",
+        help="Não grava as tabelas da Silver (a Gold as recebe em memória); desativa o cache de silver e gold"
+    )
+    parser.add_argument(
+        "--sem-snapshots",
+        action="store_true",
+        help="Não publica os snapshots Arrow (memory map) das tabelas Silver e Gold"
+    )
+    parser.add_argument(
+        "--sem-exportacao",
+        action="store_true",
+        help="Não exporta o Parquet particionado por ambiente nem o relatório Excel para o Power BI"
+    )
+    parser.add_argument(
+        "--exportacao-hive",
+        action="store_true",
+        help="Exporta as partições no estilo Hive (<coluna>=<ambiente>/), sem a coluna de ambiente nos arquivos"
+    )
+    parser.add_argument(
+        "--linhas-por-row-group",
+        type=int,
+        default=LINHAS_POR_ROW_GROUP,
+        help=f"Linhas por row group nos Parquet exportados (padrão: {LINHAS_POR_ROW_GROUP})"
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Executa todas as etapas mesmo que as entradas não tenham mudado (ignora o cache)"
+    )
+    parser.add_argument(
+        "--cache-max-entradas",
+        type=int,
+        default=MAX_ENTRADAS_POR_ETAPA,
+        help=f"Execuções guardadas no cache por etapa (padrão: {MAX_ENTRADAS_POR_ETAPA})"
+    )
+    parser.add_argument(
+        "--trace",
+        action="store_true",
+        help="Grava também um trace da execução no formato do Chrome (chrome://tracing, Perfetto)"
+    )
+    parser.add_argument(
+        "--limiar-regressao",
+        type=float,
+        default=LIMIAR_REGRESSAO,
+        help=f"Avisa quando uma etapa fica mais lenta que a execução anterior nessa fração (padrão: {LIMIAR_REGRESSAO})"
+    )
+    return parser.parse_args(argv)
+
+def executar_etapa(cache, etapa, funcao, entradas, config, contexto=None):
+    """
+    Executa uma etapa do pipeline pelo cache (quando o motor usa cache) ou diretamente.
+    """
+    if cache is None:
+        return funcao()
+
+    def executar_e_gravar():
+        resultado = funcao()
+        # O cache guarda os arquivos gravados pela etapa: as gravações em segundo plano
+        # do contexto precisam terminar antes
+        if contexto is not None:
+            contexto.aguardar(etapa)
+        return resultado
+
+    return cache.executar(etapa, executar_e_gravar, entradas, MODULOS_ETAPAS[etapa], config, caminho_camada(etapa))
+
+def emitir_relatorio(rastreador, args, resultados, cache=None):
     """
-    Função principal que orquestra a execução do pipeline usando apenas Pandas.
+    Grava o relatório da execução e avisa sobre etapas mais lentas que na última execução
+    comparável: mesmas opções de OPCOES_COMPARAVEIS, mesmas etapas puladas pelo cache e
+    volume de dados parecido.
     """
+    perfil = perfil_execucao(
+        {opcao: getattr(args, opcao) for opcao in OPCOES_COMPARAVEIS},
+        etapas_do_cache=cache.reaproveitadas if cache is not None else (),
+        registros=sum((resultados.get("bronze") or {}).values()) or None
+    )
+    anterior = carregar_relatorio_anterior(perfil=perfil)
+    relatorio = rastreador.relatorio(
+        motor=args.motor,
+        opcoes=vars(args),
+        perfil=perfil,
+        resultados=resultados
+    )
+    caminho = salvar_relatorio(relatorio, trace=args.trace)
+    print(f"\n⏱️ Relatório de execução: {caminho} ({relatorio['duracao_total_s']:.1f}s)")
+
+    if anterior is None:
+        print("Nenhuma execução anterior comparável (mesmas opções, cache e volume) para detectar regressões")
+        return
+    for nome, antes, agora in comparar_relatorios(relatorio, anterior, limiar=args.limiar_regressao):
+        print(f"⚠️ Regressão em {nome}: {antes:.2f}s → {agora:.2f}s (+{(agora / antes - 1):.0%})")
+
+def main(argv=None):
+    """
+    Função principal que orquestra a execução do pipeline (pandas por padrão, ou Spark/Delta).
+    """
+    args = parse_args(argv)
     print("🚀 Inicializando pipeline com nomes amigáveis para Power BI...")
     
+    rastreador = iniciar_execucao()
+    resultados = {}
+    motor = None
+    cache = None
+    contexto = None
     try:
+        config_motor = {"master": args.spark_master} if args.motor == "spark" else {}
+        motor = obter_motor(args.motor, **config_motor)
+        print(f"Motor de execução: {motor.nome}")
+        cache = CacheEtapas(max_entradas=args.cache_max_entradas, forcar=args.force) if motor.usa_cache else None
+        # Sem as tabelas da Silver em disco não há o que o cache guardar ou comparar
+        cache_silver_gold = None if args.silver_em_memoria else cache
+        # Tabelas passadas em memória entre Silver e Gold; gravação em disco em segundo plano
+        contexto = ContextoPipeline(
+            formato=args.formato,
+            camadas_materializadas=["gold"] if args.silver_em_memoria else None
+        )
+
         # Camada Bronze
         print("\n" + "="*60)
-        bronze_results = processar_camada_bronze()
-        
+        with etapa("bronze") as medida:
+            bronze_results = executar_etapa(
+                cache, "bronze",
+                lambda: motor.bronze(
+                    modo_streaming=args.streaming,
+                    orcamento_memoria_mb=args.orcamento_memoria_mb,
+                    formato=args.formato
+                ),
+                entradas=list(FONTES_DE_DADOS.values()),
+                config={"formato": args.formato}
+            )
+            medida.linhas_saida = sum(bronze_results.values()) if bronze_results else 0
+            resultados["bronze"] = bronze_results
+
         if not bronze_results:
             print("❌ Falha na camada Bronze. Interrompendo pipeline.")
             return
         
         # Camada Silver (ATUALIZADA COM NOMES AMIGÁVEIS)
         print("\n" + "="*60)
-        silver_results = processar_camada_silver()
-        
+        bronze_path = caminho_camada("bronze")
+        with etapa("silver") as medida:
+            silver_results = executar_etapa(
+                cache_silver_gold, "silver",
+                lambda: motor.silver(
+                    formato=args.formato,
+                    incremental=args.incremental,
+                    reconstruir_estado=args.reconstruir_estado,
+                    usuarios_aproximados=args.usuarios_aproximados,
+                    erro_hll=args.erro_hll,
+                    paralelo=args.paralelo,
+                    trabalhadores=args.trabalhadores,
+                    contexto=contexto
+                ),
+                entradas=[caminho_tabela(bronze_path, nome, args.formato) for nome in FONTES_DE_DADOS],
+                config={
+                    "formato": args.formato,
+                    "incremental": args.incremental,
+                    "reconstruir_estado": args.reconstruir_estado,
+                    "usuarios_aproximados": args.usuarios_aproximados,
+                    "erro_hll": args.erro_hll if args.usuarios_aproximados else None,
+                    # Dias_Sem_Uso depende da data da execução: o resultado muda a cada dia
+                    "data_referencia": date.today().isoformat()
+                },
+                contexto=contexto
+            )
+            medida.linhas_saida = sum(silver_results.values()) if silver_results else 0
+            resultados["silver"] = silver_results
+
         if not silver_results:
             print("❌ Falha na camada Silver. Interrompendo pipeline.")
             return
             
         # Camada Gold
         print("\n" + "="*60)
-        gold_results = processar_camada_gold()
-        
+        silver_path = caminho_camada("silver")
+        with etapa("gold") as medida:
+            gold_results = executar_etapa(
+                cache_silver_gold, "gold",
+                lambda: motor.gold(formato=args.formato, recalcular=args.force, contexto=contexto),
+                entradas=[caminho_tabela(silver_path, nome, args.formato) for nome in TABELAS_SILVER_GOLD],
+                config={"formato": args.formato},
+                contexto=contexto
+            )
+            medida.linhas_saida = sum(gold_results.values()) if gold_results else 0
+            resultados["gold"] = gold_results
+
+        # Snapshots Arrow para abrir as tabelas sem reler os CSVs (snapshots.py)
+        if motor.publica_snapshots and not args.sem_snapshots:
+            with etapa("snapshots") as medida:
+                gravadas = publicar_do_contexto(contexto, TABELAS_SNAPSHOTS)
+                medida.linhas_saida = sum(gravadas.values())
+            print(f"\n📸 Snapshots Arrow: {len(gravadas)} tabelas atualizadas em {caminho_snapshots()}")
+
+        # Exportação para o Power BI: só as partições que mudaram são regravadas (exportacao.py)
+        if motor.exporta and not args.sem_exportacao:
+            print("\n📤 Exportando tabelas para o Power BI...")
+            with etapa("exportacao") as medida:
+                gravadas = exportar_do_contexto(
+                    contexto, TABELAS_EXPORTACAO,
+                    hive=args.exportacao_hive,
+                    linhas_por_row_group=args.linhas_por_row_group
+                )
+                medida.linhas_saida = sum(gravadas.values())
+            print(f"📤 Exportação: {len(gravadas)} arquivos/tabelas atualizados em {caminho_exportacao()}")
+
+        # Gravações ainda em segundo plano (ex.: baldes diários com --silver-em-memoria)
+        contexto.aguardar()
+
         # Resumo final
         print("\n" + "="*60)
         print("🎉 PIPELINE COMPLETO COM SUCESSO!")
@@ -44,11 +336,20 @@ def main():
         print("  ./data/bronze/ - Dados brutos processados")
         print("  ./data/silver/ - ⭐ APPS_COM_METRICAS.CSV (PRINCIPAL PARA POWER BI)")
         print("  ./data/gold/ - Tabelas analíticas pré-calculadas")
+        print("  ./data/snapshots/ - Snapshots Arrow (snapshots.carregar_snapshot) para notebooks")
+        print("  ./data/exportacao/ - Parquet por ambiente e relatorio_governanca.xlsx")
+        print("  python consultas.py - API local de consultas sobre as tabelas Silver e Gold")
         
         print("\n💡 DICA: Use apps_com_metricas.csv no Power BI com campos renomeados!")
         
     except Exception as e:
         print(f"❌ Erro crítico no pipeline: {e}")
+    finally:
+        if contexto is not None:
+            contexto.fechar()
+        if motor is not None:
+            motor.finalizar()
+        emitir_relatorio(rastreador, args, resultados, cache)
 
 if __name__ == "__main__":
     main()
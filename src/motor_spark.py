@@ -0,0 +1,472 @@
+# src/motor_spark.py
+
+from armazenamento import caminho_camada
+from contexto import COLUNAS_APPS_LIMPEZA
+from bronze import FONTES_DE_DADOS
+from gold import COLUNAS_RANKING_PROPRIETARIOS, criterios_ranking, resolver_parametros_ranking
+from silver import CAMPOS_ESSENCIAIS, COLUNAS_APPS, MAPEAMENTO_NOMES
+from regras import PONTUACAO_LIMPEZA, REGRAS_CLASSIFICACAO, padrao_palavras, resolver_parametros, resolver_valor
+from series_temporais import JANELA_MAU, JANELAS_DIAS, colunas_janelas
+
+# Master padrão: modo local, usando todos os núcleos (suficiente para testes)
+MASTER_PADRAO = "local[*]"
+
+# Tabelas Delta ficam em ./data/delta/<camada>/<tabela>
+CAMADA_DELTA = "delta"
+
+
+def criar_sessao_spark(master=MASTER_PADRAO, nome_app="CoEGovernanca"):
+    """
+    Cria (ou reaproveita) uma SparkSession com as extensões do Delta Lake habilitadas.
+    """
+    from pyspark.sql import SparkSession
+    from delta import configure_spark_with_delta_pip
+
+    builder = SparkSession.builder.appName(nome_app).master(master) \
+        .config("spark.sql.extensions", "io.delta.sql.DeltaSparkSessionExtension") \
+        .config("spark.sql.catalog.spark_catalog", "org.apache.spark.sql.delta.catalog.DeltaCatalog")
+    return configure_spark_with_delta_pip(builder).getOrCreate()
+
+
+def caminho_delta(camada, tabela, diretorio_dados=None):
+    return str(caminho_camada(f"{CAMADA_DELTA}/{camada}", diretorio_dados) / tabela)
+
+
+def ler_delta(spark, camada, tabela, diretorio_dados=None):
+    return spark.read.format("delta").load(caminho_delta(camada, tabela, diretorio_dados))
+
+
+def salvar_delta(df, camada, tabela, diretorio_dados=None):
+    """
+    Sobrescreve uma tabela Delta inteira (usado nas camadas Bronze e Gold).
+    """
+    df.write.format("delta").mode("overwrite").option("overwriteSchema", "true") \
+        .save(caminho_delta(camada, tabela, diretorio_dados))
+
+
+def mesclar_delta(spark, df, camada, tabela, chave, diretorio_dados=None):
+    """
+    Upsert (MERGE) de df na tabela Delta pela chave: atualiza linhas existentes, insere as
+    novas e remove as que não vieram mais na origem. Cria a tabela se ainda não existir.
+    """
+    from delta.tables import DeltaTable
+
+    caminho = caminho_delta(camada, tabela, diretorio_dados)
+    if not DeltaTable.isDeltaTable(spark, caminho):
+        df.write.format("delta").mode("overwrite").save(caminho)
+        return
+
+    DeltaTable.forPath(spark, caminho).alias("destino") \
+        .merge(df.alias("origem"), f"destino.`{chave}` = origem.`{chave}`") \
+        .whenMatchedUpdateAll() \
+        .whenNotMatchedInsertAll() \
+        .whenNotMatchedBySourceDelete() \
+        .execute()
+
+
+def _numero(coluna, tipo="int"):
+    from pyspark.sql import functions as F
+
+    # try_cast: valores inválidos viram nulo (como pd.to_numeric(errors='coerce')), depois 0
+    return F.coalesce(F.expr(f"try_cast(try_cast(`{coluna}` as double) as {tipo})"), F.lit(0).cast(tipo))
+
+
+def condicao_spark(condicao, parametros):
+    """
+    Traduz uma condição de regras.py para uma expressão Spark (nulo conta como falso,
+    como no fillna(False) da versão pandas).
+    """
+    from functools import reduce
+    from pyspark.sql import functions as F
+
+    operador = condicao[0]
+    if operador in ("e", "ou"):
+        expressoes = [condicao_spark(sub, parametros) for sub in condicao[1]]
+        return reduce((lambda a, b: a & b) if operador == "e" else (lambda a, b: a | b), expressoes)
+
+    coluna, operador, valor = condicao
+    col = F.col(coluna)
+    valor = resolver_valor(valor, parametros)
+    if operador == "nulo":
+        expressao = col.isNull()
+    elif operador == "contem":
+        expressao = F.lower(col.cast("string")).rlike(padrao_palavras(valor))
+    elif operador == "==":
+        expressao = col == valor
+    elif operador == "!=":
+        expressao = col != valor
+    elif operador == "<":
+        expressao = col < valor
+    elif operador == "<=":
+        expressao = col <= valor
+    elif operador == ">":
+        expressao = col > valor
+    elif operador == ">=":
+        expressao = col >= valor
+    else:
+        raise ValueError(f"Operador de regra desconhecido: {operador}")
+    return F.coalesce(expressao, F.lit(False))
+
+
+def aplicar_regras_spark(df, parametros=None, data_referencia=None):
+    """
+    Mesmas regras e score de limpeza de regras.aplicar_regras, como colunas Spark.
+    """
+    from pyspark.sql import functions as F
+
+    parametros = resolver_parametros(parametros)
+    referencia = F.current_timestamp() if data_referencia is None \
+        else F.lit(str(data_referencia)).cast("timestamp")
+    df = df.withColumn(
+        'Dias_Sem_Uso',
+        F.floor((F.unix_timestamp(referencia) - F.unix_timestamp('Data_Ultimo_Acesso')) / 86400).cast("int")
+    )
+
+    for regra in REGRAS_CLASSIFICACAO:
+        expressao = None
+        for condicao, valor in regra["casos"]:
+            teste = condicao_spark(condicao, parametros)
+            expressao = F.when(teste, F.lit(valor)) if expressao is None else expressao.when(teste, F.lit(valor))
+        df = df.withColumn(regra["coluna"], expressao.otherwise(F.lit(regra["padrao"])))
+
+    pontos = F.lit(0)
+    for condicao, valor in PONTUACAO_LIMPEZA:
+        pontos = pontos + F.when(condicao_spark(condicao, parametros), F.lit(valor)).otherwise(F.lit(0))
+    return df.withColumn('Score_Limpeza', F.greatest(pontos, F.lit(0)))
+
+
+def uso_diario_spark(df_auditoria):
+    """
+    Baldes (app, dia, usuário) de series_temporais.agregar_uso_diario, como DataFrame Spark.
+    """
+    from pyspark.sql import functions as F
+
+    instante = F.expr("try_cast(`Creation Time` as timestamp)")
+    return df_auditoria.withColumn('_instante', instante) \
+        .filter(F.col('App ID').isNotNull() & F.col('_instante').isNotNull()) \
+        .groupBy('App ID', F.to_date('_instante').alias('Dia'), 'User UPN') \
+        .agg(F.count(F.lit(1)).alias('sessoes'), F.max('_instante').alias('Ultimo_Evento'))
+
+
+def janelas_uso_spark(df_uso, data_referencia=None):
+    """
+    Métricas em janelas móveis de series_temporais.calcular_janelas_uso, como DataFrame Spark.
+    """
+    from pyspark.sql import functions as F
+
+    if data_referencia is None:
+        # Padrão: o dia mais recente do log
+        referencia = F.lit(df_uso.agg(F.max('Dia')).first()[0])
+    else:
+        referencia = F.to_date(F.lit(str(data_referencia)))
+    idade = F.datediff(referencia, F.col('Dia'))
+
+    agregacoes = []
+    for dias in JANELAS_DIAS:
+        na_janela = (idade >= 0) & (idade < dias)
+        agregacoes += [
+            F.countDistinct(F.when(na_janela, F.col('User UPN'))).alias(f'usuarios_{dias}d'),
+            F.coalesce(F.sum(F.when(na_janela, F.col('sessoes'))), F.lit(0)).alias(f'sessoes_{dias}d'),
+        ]
+    no_mes = (idade >= 0) & (idade < JANELA_MAU) & F.col('User UPN').isNotNull()
+    agregacoes += [
+        F.max('Ultimo_Evento').alias('Ultimo_Acesso_Log'),
+        (F.sum(F.when(no_mes, 1).otherwise(0)) / JANELA_MAU).alias('_dau'),
+        F.countDistinct(F.when(no_mes, F.col('User UPN'))).alias('_mau'),
+    ]
+    return df_uso.groupBy('App ID').agg(*agregacoes) \
+        .withColumnRenamed('App ID', 'ID_App') \
+        .withColumn(f'DAU_Medio_{JANELA_MAU}d', F.round('_dau', 2)) \
+        .withColumn('Razao_DAU_MAU', F.round(F.when(F.col('_mau') > 0, F.col('_dau') / F.col('_mau')).otherwise(0.0), 4)) \
+        .drop('_dau', '_mau')
+
+
+def processar_camada_bronze_spark(spark, diretorio_dados=None, fontes_de_dados=None):
+    """
+    Lê os CSVs de origem como DataFrames Spark (todas as colunas como texto) e grava tabelas Delta.
+    """
+    print("Iniciando processamento da Camada Bronze (Spark/Delta)...")
+    dados_processados = {}
+    for nome, caminho in (fontes_de_dados or FONTES_DE_DADOS).items():
+        print(f"Lendo {nome} de {caminho}...")
+        try:
+            df = spark.read.option("header", True).option("multiLine", True) \
+                .option("escape", '"').option("encoding", "utf-8").csv(caminho)
+            salvar_delta(df, "bronze", nome, diretorio_dados)
+            dados_processados[nome] = df.count()
+            print(f"{nome}: {dados_processados[nome]} registros, {len(df.columns)} colunas")
+        except Exception as e:
+            print(f"Erro ao processar {nome}: {e}")
+    return dados_processados
+
+
+def transformar_silver_spark(df_apps, df_ambientes, df_auditoria, df_usuarios,
+                             parametros_regras=None, data_referencia=None):
+    """
+    Mesmas regras de silver.transformar_apps, expressas como DataFrames Spark.
+    Retorna (apps transformados, métricas de uso por app, baldes diários de uso).
+    """
+    from pyspark.sql import functions as F
+
+    def texto(coluna):
+        return F.coalesce(F.col(coluna), F.lit(''))
+
+    # Apenas as colunas usadas pelas regras (o CSV de apps tem ~140)
+    df_apps = df_apps.select(*[F.col(f"`{col}`") for col in COLUNAS_APPS if col in df_apps.columns])
+
+    # Filtros iniciais: apps não deletados e não SharePointFormApp
+    df_apps = df_apps.filter(~F.lower(texto('admin_appdeleted')).isin('true', '1', 'yes')) \
+        .filter(texto('admin_powerappstype') != '597910003')
+
+    # Métricas de uso a partir do log de auditoria
+    df_metricas = df_auditoria.filter(F.col('App ID').isNotNull()).groupBy('App ID').agg(
+        F.countDistinct('User UPN').alias('usuarios_unicos'),
+        F.count(F.lit(1)).alias('sessoes_totais')
+    ).withColumnRenamed('App ID', 'admin_appinternalname')
+
+    df = df_apps.withColumnRenamed('admin_appid', 'admin_appinternalname') \
+        .join(df_metricas, on='admin_appinternalname', how='left')
+
+    # Chaves de ambiente: sem espaços e sem o prefixo "Default-"
+    for coluna in df_ambientes.columns:
+        df_ambientes = df_ambientes.withColumnRenamed(coluna, coluna.strip())
+    df_ambientes = df_ambientes.select(
+        F.trim('admin_environmentid').alias('admin_environmentid'),
+        F.col('admin_displayname').alias('admin_displayname_ambiente')
+    )
+    df = df.withColumn(
+        'admin_appenvironmentid',
+        F.regexp_replace(F.trim('admin_appenvironmentid'), r'^Default-', '')
+    ).withColumnRenamed('admin_displayname', 'admin_displayname_app')
+
+    # E-mail do proprietário (UPN com fallback para o e-mail), nome e departamento
+    df_usuarios = df_usuarios.select(
+        F.col('admin_recordguidasstring').alias('_guid_proprietario'),
+        'admin_useremail', 'admin_userprincipalname',
+        F.col('admin_displayname').alias('_nome_proprietario'),
+        F.col('admin_department').alias('_departamento_proprietario')
+    )
+    df = df.join(df_usuarios, df['`admin_appowner.admin_recordguidasstring`'] == df_usuarios['_guid_proprietario'], 'left') \
+        .withColumn('admin_appownerupn', F.coalesce('admin_userprincipalname', 'admin_useremail'))
+
+    # Nome do ambiente, com o ID como fallback
+    df = df.join(df_ambientes, df['admin_appenvironmentid'] == df_ambientes['admin_environmentid'], 'left') \
+        .withColumn('admin_displayname_ambiente', F.coalesce('admin_displayname_ambiente', 'admin_appenvironmentid'))
+
+    for origem, destino in MAPEAMENTO_NOMES.items():
+        if origem in df.columns:
+            df = df.withColumnRenamed(origem, destino)
+
+    df = df.withColumn('usuarios_unicos', _numero('usuarios_unicos')) \
+        .withColumn('sessoes_totais', _numero('sessoes_totais')) \
+        .withColumn('Usuarios_Compartilhados', _numero('Usuarios_Compartilhados')) \
+        .withColumn('Total_Editores', _numero('Total_Editores')) \
+        .withColumn('Compartilhado_Grupos', _numero('Compartilhado_Grupos')) \
+        .withColumn('Score_Complexidade', _numero('Score_Complexidade', 'double')) \
+        .withColumn('Compartilhado_Tenant', F.lower(texto('Compartilhado_Tenant')) == 'true')
+
+    for coluna in ['Data_Criacao_App', 'Data_Modificacao_App', 'Data_Ultimo_Acesso']:
+        df = df.withColumn(coluna, F.expr(f"try_cast(`{coluna}` as timestamp)"))
+
+    # Regras de classificação e score de limpeza (a mesma tabela de regras do pandas)
+    df = aplicar_regras_spark(df, parametros_regras, data_referencia)
+
+    df = df.withColumn('total_proprietarios', 1 + F.col('Total_Editores'))
+
+    # Uso em janelas móveis (7/30/90 dias) a partir dos baldes diários do log
+    df_uso = uso_diario_spark(df_auditoria).cache()
+    df = df.join(janelas_uso_spark(df_uso, data_referencia), on='ID_App', how='left') \
+        .fillna(0, subset=[col for col in colunas_janelas() if col != 'Ultimo_Acesso_Log'])
+    return df, df_metricas, df_uso
+
+
+def processar_camada_silver_spark(spark, diretorio_dados=None, parametros_regras=None, data_referencia=None):
+    """
+    Camada Silver no Spark: aplica as regras de negócio e faz MERGE nas tabelas Delta.
+    """
+    from pyspark.sql import functions as F
+
+    print("Iniciando processamento da Camada Silver (Spark/Delta)...")
+    try:
+        df_apps_completo, df_metricas, df_uso = transformar_silver_spark(
+            ler_delta(spark, "bronze", "apps", diretorio_dados),
+            ler_delta(spark, "bronze", "ambientes", diretorio_dados),
+            ler_delta(spark, "bronze", "auditoria", diretorio_dados),
+            ler_delta(spark, "bronze", "usuarios", diretorio_dados),
+            parametros_regras,
+            data_referencia
+        )
+        df_apps_completo = df_apps_completo.cache()
+
+        # Filtro de alta adoção (sem formulários) e colunas essenciais para o Power BI
+        regra_filtro = (F.col('usuarios_unicos') > F.col('total_proprietarios')) & \
+            ~F.coalesce(F.col('Tipo_App'), F.lit('')).isin('597910002', '597910003')
+        colunas_finais = [col for col in CAMPOS_ESSENCIAIS if col in df_apps_completo.columns]
+        df_power_bi = df_apps_completo.filter(regra_filtro).select(*colunas_finais)
+
+        # Todos os apps com o score de limpeza, como silver.selecionar_apps_limpeza
+        df_limpeza = df_apps_completo.select(
+            *[col for col in COLUNAS_APPS_LIMPEZA if col in df_apps_completo.columns]
+        ).orderBy(F.desc('Score_Limpeza'), 'ID_App')
+
+        df_resumo_ambiente = df_apps_completo.groupBy('ID_Ambiente', 'Nome_Ambiente').agg(
+            F.count('ID_App').alias('total_apps'),
+            F.sum('usuarios_unicos').alias('total_usuarios_unicos'),
+            F.sum('sessoes_totais').alias('total_sessoes')
+        )
+
+        # Apps de alta adoção por proprietário (GUID) e ambiente, como silver.resumir_por_proprietario
+        df_resumo_proprietarios = df_apps_completo.filter(regra_filtro).groupBy(
+            F.col('`admin_appowner.admin_recordguidasstring`').alias('ID_Proprietario'), 'ID_Ambiente'
+        ).agg(
+            F.first(F.coalesce('_nome_proprietario', 'Nome_Criador')).alias('Nome_Proprietario'),
+            F.first('Email_Proprietario_App').alias('Email_Proprietario'),
+            F.first('_departamento_proprietario').alias('Departamento'),
+            F.first('Nome_Ambiente').alias('Nome_Ambiente'),
+            F.count('ID_App').alias('total_apps'),
+            F.sum('usuarios_unicos').alias('usuarios_unicos'),
+            F.sum('sessoes_totais').alias('sessoes_totais'),
+            F.sum('Score_Complexidade').alias('complexidade_total')
+        )
+
+        mesclar_delta(spark, df_power_bi, "silver", "apps_com_metricas", "ID_App", diretorio_dados)
+        mesclar_delta(spark, df_power_bi, "silver", "apps_alta_adocao", "ID_App", diretorio_dados)
+        mesclar_delta(spark, df_metricas, "silver", "metricas_uso_auditoria", "admin_appinternalname", diretorio_dados)
+        salvar_delta(df_resumo_ambiente, "silver", "resumo_por_ambiente", diretorio_dados)
+        salvar_delta(df_resumo_proprietarios, "silver", "resumo_por_proprietario", diretorio_dados)
+        salvar_delta(df_uso, "silver", "uso_diario", diretorio_dados)
+        salvar_delta(df_limpeza, "silver", "apps_limpeza", diretorio_dados)
+
+        total = df_power_bi.count()
+        print(f"Tabela para Power BI (Delta) com {total} registros")
+        return {"apps_com_metricas": total}
+    except Exception as e:
+        print(f"Ocorreu um erro inesperado na camada Silver (Spark): {e}")
+        return {}
+
+
+def processar_camada_gold_spark(spark, diretorio_dados=None, parametros_ranking=None):
+    """
+    Camada Gold no Spark: as mesmas tabelas analíticas de gold.py, gravadas como Delta.
+    """
+    from pyspark.sql import Window
+    from pyspark.sql import functions as F
+
+    parametros_ranking = resolver_parametros_ranking(parametros_ranking)
+    criterios_apps = [F.desc(c) for c in criterios_ranking(parametros_ranking["criterios_apps"])]
+    criterios_proprietarios = [F.desc(c) for c in criterios_ranking(parametros_ranking["criterios_proprietarios"])]
+
+    print("🏆 Iniciando processamento da Camada Gold (Spark/Delta)...")
+    try:
+        df_apps_completo = ler_delta(spark, "silver", "apps_com_metricas", diretorio_dados)
+        df_ambiente = ler_delta(spark, "silver", "resumo_por_ambiente", diretorio_dados)
+        df_resumo_proprietarios = ler_delta(spark, "silver", "resumo_por_proprietario", diretorio_dados)
+        df_alta_adocao = ler_delta(spark, "silver", "apps_alta_adocao", diretorio_dados)
+        df_metricas_uso = ler_delta(spark, "silver", "metricas_uso_auditoria", diretorio_dados)
+        df_uso = ler_delta(spark, "silver", "uso_diario", diretorio_dados)
+    except Exception as e:
+        print(f"❌ Erro ao carregar dados: {e}")
+        return
+
+    # Todos os apps estão no resumo por ambiente; apps_com_metricas só tem os de alta adoção
+    total_apps_ambiente = df_ambiente.agg(F.sum('total_apps')).first()[0] or df_apps_completo.count()
+    apps_com_uso = df_metricas_uso.count()
+    apps_prioritarios = df_alta_adocao.count()
+
+    # Apps sem GUID de proprietário ficam fora dos rankings de proprietários
+    df_resumo_proprietarios = df_resumo_proprietarios.filter(F.col('ID_Proprietario').isNotNull())
+    df_proprietarios = df_resumo_proprietarios.groupBy('ID_Proprietario').agg(
+        F.first('Nome_Proprietario').alias('Nome_Proprietario'),
+        F.first('Email_Proprietario').alias('Email_Proprietario'),
+        F.first('Departamento').alias('Departamento'),
+        *[F.sum(c).alias(c) for c in ('total_apps', 'usuarios_unicos', 'sessoes_totais', 'complexidade_total')]
+    )
+    colunas_proprietarios = [F.col(origem).alias(destino) for origem, destino in COLUNAS_RANKING_PROPRIETARIOS.items()]
+
+    def top_por_grupo(df, grupo):
+        janela = Window.partitionBy(grupo).orderBy(*criterios_proprietarios)
+        return df.withColumn('Posição', F.row_number().over(janela)) \
+            .filter(F.col('Posição') <= parametros_ranking["top_por_grupo"])
+
+    tabelas = {
+        'apps_alta_adocao_final': df_alta_adocao.select(
+            F.col('Nome_App').alias('Nome do App'),
+            F.col('Nome_Ambiente').alias('Ambiente'),
+            F.col('Nome_Criador').alias('Proprietário Principal'),
+            F.col('total_proprietarios').alias('Total de Proprietários/Editores'),
+            F.col('usuarios_unicos').alias('Usuários Únicos'),
+            F.col('sessoes_totais').alias('Total de Sessões'),
+            F.col('Data_Ultimo_Acesso').alias('Último Acesso')
+        ),
+        'ranking_usuarios_unicos': df_apps_completo.orderBy(*criterios_apps).limit(parametros_ranking["top_apps"]).select(
+            F.col('Nome_App').alias('Nome do App'),
+            F.col('Nome_Criador').alias('Proprietário'),
+            F.col('usuarios_unicos').alias('Usuários Únicos'),
+            F.col('sessoes_totais').alias('Total de Sessões'),
+            F.col('Nome_Ambiente').alias('Ambiente')
+        ),
+        'analise_por_ambiente': df_ambiente.orderBy(F.desc('total_usuarios_unicos')),
+        'top_proprietarios': df_proprietarios.orderBy(*criterios_proprietarios)
+        .limit(parametros_ranking["top_proprietarios"]).select(*colunas_proprietarios),
+        'top_proprietarios_por_ambiente': top_por_grupo(df_resumo_proprietarios, 'ID_Ambiente').select(
+            F.col('Nome_Ambiente').alias('Ambiente'), 'Posição', *colunas_proprietarios
+        ),
+        'top_proprietarios_por_departamento': top_por_grupo(
+            df_proprietarios.fillna('Não informado', subset=['Departamento']), 'Departamento'
+        ).select('Posição', *colunas_proprietarios),
+        'apps_alta_adocao_30d': df_apps_completo.filter(F.col('usuarios_30d') > F.col('total_proprietarios'))
+        .orderBy(F.desc('usuarios_30d')).select(
+            F.col('Nome_App').alias('Nome do App'),
+            F.col('Nome_Ambiente').alias('Ambiente'),
+            F.col('Nome_Criador').alias('Proprietário Principal'),
+            F.col('total_proprietarios').alias('Total de Proprietários/Editores'),
+            F.col('usuarios_30d').alias('Usuários (30 dias)'),
+            F.col('sessoes_30d').alias('Sessões (30 dias)'),
+            F.col('Razao_DAU_MAU').alias('DAU/MAU'),
+            F.col('Ultimo_Acesso_Log').alias('Último Acesso (log)')
+        ),
+        'tendencia_uso_diario': df_uso.groupBy('Dia').agg(
+            F.countDistinct('User UPN').alias('Usuários Ativos'),
+            F.countDistinct('App ID').alias('Apps Ativos'),
+            F.sum('sessoes').alias('Total de Sessões')
+        ).orderBy('Dia'),
+    }
+
+    # Tabelas pequenas de resumo: montadas no driver
+    totais = df_apps_completo.agg(
+        F.coalesce(F.sum('usuarios_unicos'), F.lit(0)).alias('usuarios'),
+        F.coalesce(F.sum('sessoes_totais'), F.lit(0)).alias('sessoes')
+    ).first()
+    ambientes_ativos = df_ambiente.filter(F.col('total_apps') > 0).count()
+
+    etapas = [
+        ('1. Total de Apps no Ambiente', total_apps_ambiente),
+        ('2. Apps com Registro de Uso (Universo Relevante)', apps_com_uso),
+        ('3. Apps de Alto Impacto para Cadastro (Universo Prioritário)', apps_prioritarios),
+    ]
+    tabelas['dimensao_macro_governanca'] = spark.createDataFrame(
+        [(etapa, qtd, f"{round(qtd / total_apps_ambiente * 100, 1) if total_apps_ambiente else 0.0}%")
+         for etapa, qtd in etapas],
+        ['Etapa do Funil de Governança', 'Quantidade de Aplicativos', '% em Relação ao Total']
+    )
+    tabelas['metricas_executivas_kpis'] = spark.createDataFrame([
+        ('Total de Apps no Ambiente', float(total_apps_ambiente)),
+        ('Apps com Registro de Uso', float(apps_com_uso)),
+        ('Apps de Alto Impacto (Prioritários)', float(apps_prioritarios)),
+        ('Total de Usuários Únicos', float(totais['usuarios'])),
+        ('Total de Sessões Registradas', float(totais['sessoes'])),
+        ('Taxa de Adoção (%)', round(apps_com_uso / total_apps_ambiente * 100, 1) if total_apps_ambiente else 0.0),
+        ('Número de Ambientes Ativos', float(ambientes_ativos)),
+    ], ['KPI', 'Valor'])
+
+    results = {}
+    for nome, df in tabelas.items():
+        try:
+            salvar_delta(df, "gold", nome, diretorio_dados)
+            results[nome] = df.count()
+            print(f"✅ {nome}: {results[nome]} registros salvos")
+        except Exception as e:
+            print(f"❌ Erro ao salvar {nome}: {e}")
+
+    print("\n🎉 Camada Gold (Spark/Delta) processada com sucesso!")
+    return results
@@ -0,0 +1,74 @@
+# src/motores.py
+
+from bronze import processar_camada_bronze
+from silver import processar_camada_silver
+from gold import processar_camada_gold
+
+MOTOR_PADRAO = "pandas"
+
+
+class MotorPandas:
+    """
+    Motor padrão: executa as camadas com pandas em um único processo (ou pool local).
+    """
+    nome = "pandas"
+    usa_cache = True   # Etapas puladas quando entradas, código e configuração não mudaram (cache.py)
+    publica_snapshots = True  # Snapshots Arrow das tabelas Silver e Gold (snapshots.py)
+    exporta = True  # Parquet particionado e relatório Excel para o Power BI (exportacao.py)
+
+    def bronze(self, **opcoes):
+        return processar_camada_bronze(**opcoes)
+
+    def silver(self, **opcoes):
+        return processar_camada_silver(**opcoes)
+
+    def gold(self, **opcoes):
+        return processar_camada_gold(**opcoes)
+
+    def finalizar(self):
+        pass
+
+
+class MotorSpark:
+    """
+    Motor Spark: as mesmas transformações como DataFrames Spark, gravando tabelas Delta.
+    As opções específicas do pandas (streaming, formato, paralelo...) não se aplicam.
+    """
+    nome = "spark"
+    usa_cache = False  # As tabelas Delta já são versionadas e atualizadas por MERGE
+    publica_snapshots = False  # As tabelas Delta já são lidas direto pelo Spark
+    exporta = False  # O Power BI lê as tabelas Delta pelo conector Delta Lake
+
+    def __init__(self, master=None):
+        # Importação tardia: pyspark só é necessário quando este motor é escolhido
+        import motor_spark
+        self._modulo = motor_spark
+        self.spark = motor_spark.criar_sessao_spark(master or motor_spark.MASTER_PADRAO)
+
+    def bronze(self, diretorio_dados=None, fontes_de_dados=None, **_):
+        return self._modulo.processar_camada_bronze_spark(self.spark, diretorio_dados, fontes_de_dados)
+
+    def silver(self, diretorio_dados=None, parametros_regras=None, data_referencia=None, **_):
+        return self._modulo.processar_camada_silver_spark(self.spark, diretorio_dados,
+                                                          parametros_regras, data_referencia)
+
+    def gold(self, diretorio_dados=None, parametros_ranking=None, **_):
+        return self._modulo.processar_camada_gold_spark(self.spark, diretorio_dados, parametros_ranking)
+
+    def finalizar(self):
+        self.spark.stop()
+
+
+MOTORES = {
+    MotorPandas.nome: MotorPandas,
+    MotorSpark.nome: MotorSpark,
+}
+
+
+def obter_motor(nome=MOTOR_PADRAO, **config):
+    """
+    Instancia o motor de execução pelo nome ("pandas" ou "spark").
+    """
+    if nome not in MOTORES:
+        raise ValueError(f"Motor desconhecido: {nome}. Use um de {sorted(MOTORES)}")
+    return MOTORES[nome](**config)
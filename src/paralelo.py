@@ -0,0 +1,95 @@
+# src/paralelo.py
+
+import os
+import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from instrumentacao import etapa, etapa_atual
+
+# Dados compartilhados por todas as tarefas de um processo trabalhador (ex.: dimensões pequenas).
+# São enviados uma única vez por processo, no inicializador, e não a cada tarefa.
+_compartilhado = {}
+
+
+def numero_trabalhadores(trabalhadores=None):
+    """
+    Quantidade de processos a usar: o valor informado ou o número de CPUs da máquina.
+    """
+    return max(1, trabalhadores or os.cpu_count() or 1)
+
+
+def indice_particao(chaves, n_particoes):
+    """
+    Partição (0..n_particoes-1) de cada chave, por hash estável do valor.
+    A mesma chave cai sempre na mesma partição, independente da tabela de origem.
+    """
+    hashes = pd.util.hash_pandas_object(pd.Series(chaves), index=False).to_numpy(dtype=np.uint64)
+    return (hashes % np.uint64(n_particoes)).astype(np.int64)
+
+
+def particionar(df, coluna, n_particoes):
+    """
+    Divide o DataFrame em n_particoes pelo hash da coluna informada.
+    """
+    indices = indice_particao(df[coluna], n_particoes)
+    return [df[indices == i] for i in range(n_particoes)]
+
+
+def _inicializar_trabalhador(compartilhado):
+    _compartilhado.clear()
+    _compartilhado.update(compartilhado)
+
+
+def dados_compartilhados():
+    """
+    Dados compartilhados disponíveis dentro do processo trabalhador.
+    """
+    return _compartilhado
+
+
+def executar_em_processos(funcao, tarefas, trabalhadores=None, compartilhado=None):
+    """
+    Executa `funcao` sobre cada tarefa em um pool de processos e devolve os resultados
+    na mesma ordem das tarefas. `funcao` precisa ser definida no nível de um módulo.
+    """
+    with ProcessPoolExecutor(
+        max_workers=numero_trabalhadores(trabalhadores),
+        initializer=_inicializar_trabalhador,
+        initargs=(compartilhado or {},)
+    ) as executor:
+        return list(executor.map(funcao, tarefas))
+
+
+def executar_em_threads(tarefas, trabalhadores=None, prefixo=""):
+    """
+    Executa tarefas independentes de E/S ({nome: função sem argumentos}) em um pool de threads.
+
+    Serve para ler e gravar fontes diferentes ao mesmo tempo: o leitor CSV do pyarrow e a
+    escrita Parquet liberam o GIL. Cada tarefa é medida como a etapa `prefixo + nome`, sob a
+    etapa que chamou esta função. Uma tarefa que falha não interrompe as outras.
+    Retorna (resultados, erros, durações em segundos), dicionários por nome.
+    """
+    etapa_pai = etapa_atual()
+
+    def rodar(nome, funcao):
+        inicio = time.perf_counter()
+        try:
+            with etapa(f"{prefixo}{nome}", pai=etapa_pai):
+                return funcao(), None, time.perf_counter() - inicio
+        except Exception as e:
+            return None, e, time.perf_counter() - inicio
+
+    resultados, erros, duracoes = {}, {}, {}
+    if not tarefas:
+        return resultados, erros, duracoes
+    with ThreadPoolExecutor(max_workers=min(len(tarefas), numero_trabalhadores(trabalhadores))) as executor:
+        futuros = {nome: executor.submit(rodar, nome, funcao) for nome, funcao in tarefas.items()}
+        for nome, futuro in futuros.items():
+            resultado, erro, duracoes[nome] = futuro.result()
+            if erro is None:
+                resultados[nome] = resultado
+            else:
+                erros[nome] = erro
+    return resultados, erros, duracoes
@@ -0,0 +1,63 @@
+# src/ranking.py
+
+import numpy as np
+import pandas as pd
+
+
+def _valores_decrescentes(serie):
+    """Valores como float, com nulos no fim de qualquer ranking decrescente."""
+    valores = pd.to_numeric(serie, errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    return np.where(np.isnan(valores), -np.inf, valores)
+
+
+def posicoes_top_k(df, colunas, k):
+    """
+    Posições (iloc) das k maiores linhas pelas colunas informadas, em ordem decrescente:
+    a primeira coluna ordena e as seguintes desempatam; empates restantes ficam na ordem
+    original (como nlargest com keep="first").
+
+    Seleção parcial: np.partition acha o k-ésimo maior valor da primeira coluna em tempo
+    linear e só os candidatos a partir dele (incluindo empates no limite) são ordenados.
+    """
+    n = len(df)
+    if k <= 0 or n == 0:
+        return np.array([], dtype=np.int64)
+    principal = _valores_decrescentes(df[colunas[0]])
+    if n > k:
+        limite = np.partition(principal, n - k)[n - k]
+        candidatos = np.flatnonzero(principal >= limite)
+    else:
+        candidatos = np.arange(n)
+
+    # np.lexsort ordena pela última chave primeiro: posição original é o último desempate
+    chaves = [candidatos] + [-_valores_decrescentes(df[coluna])[candidatos] for coluna in reversed(colunas[1:])]
+    chaves.append(-principal[candidatos])
+    return candidatos[np.lexsort(chaves)[:k]]
+
+
+def selecionar_top_k(df, colunas, k):
+    """
+    As k maiores linhas do DataFrame pelas colunas informadas (veja posicoes_top_k).
+    """
+    return df.iloc[posicoes_top_k(df, list(colunas), k)]
+
+
+def selecionar_top_k_por_grupo(df, grupo, colunas, k, coluna_posicao="Posicao"):
+    """
+    As k maiores linhas de cada grupo, com a posição (1..k) dentro do grupo. Os grupos
+    saem na ordem de primeira aparição e cada um passa só pela seleção parcial.
+    """
+    colunas = list(colunas)
+    codigos, _ = pd.factorize(df[grupo], use_na_sentinel=False)
+    ordem = np.argsort(codigos, kind="stable")
+    inicios = np.flatnonzero(np.diff(codigos[ordem], prepend=-1))
+    selecionadas, posicoes = [], []
+    for linhas in np.split(ordem, inicios[1:]):
+        escolhidas = linhas[posicoes_top_k(df.iloc[linhas], colunas, k)]
+        selecionadas.append(escolhidas)
+        posicoes.append(np.arange(1, len(escolhidas) + 1))
+    if not selecionadas:
+        return df.iloc[0:0].assign(**{coluna_posicao: pd.Series(dtype="int64")})
+    resultado = df.iloc[np.concatenate(selecionadas)].copy()
+    resultado[coluna_posicao] = np.concatenate(posicoes)
+    return resultado
@@ -0,0 +1,160 @@
+# src/regras.py
+
+import re
+import numpy as np
+import pandas as pd
+from functools import reduce
+
+# Parâmetros padrão das regras de negócio (podem ser sobrescritos por execução)
+PARAMETROS_PADRAO = {
+    "limiar_produtividade_pessoal": 10,   # Apps compartilhados com menos usuários são pessoais
+    "ambiente_promocao": "eletrobras",    # Ambiente cujos apps não pessoais devem ser promovidos
+}
+
+# Condições são tuplas (coluna, operador, valor) ou combinações ("e", [...]) / ("ou", [...]).
+# Valores iniciados por "$" são lidos dos parâmetros (ex.: "$ambiente_promocao").
+#
+# Cada regra gera uma coluna: os casos são avaliados em ordem e o primeiro verdadeiro define
+# o valor (np.select); sem nenhum caso verdadeiro, vale o padrão. As regras rodam na ordem
+# da lista, então uma regra pode usar colunas criadas pelas anteriores.
+REGRAS_CLASSIFICACAO = [
+    {
+        "coluna": "Produtividade_Pessoal",
+        "casos": [(("Usuarios_Compartilhados", "<", "$limiar_produtividade_pessoal"), True)],
+        "padrao": False,
+    },
+    {
+        "coluna": "Promover",
+        "casos": [(("e", [("Produtividade_Pessoal", "==", False),
+                          ("Nome_Ambiente", "==", "$ambiente_promocao")]), True)],
+        "padrao": False,
+    },
+    {
+        "coluna": "ROI",
+        "casos": [(("Classificacao_Plano", "==", "Premium"), "Obrigatório")],
+        "padrao": "Opcional",
+    },
+    {
+        "coluna": "Categoria_App",
+        "casos": [
+            (("Nome_App", "contem", ["system", "configuração", "settings", "coe"]), "Sistema"),
+            (("Nome_App", "contem", ["formulário", "forms", "form"]), "Formulário"),
+            (("Nome_App", "contem", ["teste", "test", "demo"]), "Teste/Demo"),
+        ],
+        "padrao": "Aplicativo",
+    },
+    {
+        "coluna": "Status_Atividade",
+        "casos": [
+            (("Dias_Sem_Uso", "nulo", None), "Nunca Usado"),
+            (("Dias_Sem_Uso", "<=", 30), "Muito Ativo (≤30 dias)"),
+            (("Dias_Sem_Uso", "<=", 90), "Ativo (31-90 dias)"),
+            (("Dias_Sem_Uso", "<=", 180), "Pouco Ativo (91-180 dias)"),
+        ],
+        "padrao": "Inativo (>180 dias)",
+    },
+]
+
+# Score de limpeza: soma dos pontos de cada condição verdadeira, com piso em zero
+PONTUACAO_LIMPEZA = [
+    (("Dias_Sem_Uso", "nulo", None), 100),
+    (("Dias_Sem_Uso", ">", 180), 50),
+    (("Categoria_App", "==", "Teste/Demo"), 30),
+    (("Categoria_App", "==", "Sistema"), -50),
+    (("ou", [("Nome_Criador", "nulo", None), ("Nome_Criador", "contem", ["SYSTEM"])]), 20),
+]
+
+# Score a partir do qual o app é candidato a limpeza
+LIMIAR_LIMPEZA = 80
+
+
+def resolver_parametros(parametros=None):
+    """
+    Parâmetros padrão combinados com os informados.
+    """
+    return {**PARAMETROS_PADRAO, **(parametros or {})}
+
+
+def resolver_valor(valor, parametros):
+    if isinstance(valor, str) and valor.startswith("$"):
+        return parametros[valor[1:]]
+    return valor
+
+
+def padrao_palavras(palavras):
+    """
+    Expressão regular que encontra qualquer uma das palavras (sem diferenciar maiúsculas).
+    """
+    return "|".join(re.escape(palavra.lower()) for palavra in palavras)
+
+
+def avaliar_condicao(df, condicao, parametros):
+    """
+    Avalia uma condição sobre colunas inteiras do DataFrame e retorna uma máscara booleana.
+    """
+    operador = condicao[0]
+    if operador in ("e", "ou"):
+        mascaras = [avaliar_condicao(df, sub, parametros) for sub in condicao[1]]
+        return reduce(np.logical_and if operador == "e" else np.logical_or, mascaras)
+
+    coluna, operador, valor = condicao
+    serie = df[coluna]
+    valor = resolver_valor(valor, parametros)
+    if operador == "nulo":
+        mascara = serie.isna()
+    elif operador == "contem":
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            # Em categóricas o texto é avaliado uma vez por categoria, não por linha
+            categorias = serie.cat.categories.astype("string").str.lower()
+            contem = categorias.str.contains(padrao_palavras(valor), regex=True, na=False)
+            mascara = pd.Series(np.append(np.asarray(contem, dtype=bool), False)[serie.cat.codes], index=serie.index)
+        else:
+            mascara = serie.astype("string").str.lower().str.contains(padrao_palavras(valor), regex=True, na=False)
+    elif operador == "==":
+        mascara = serie == valor
+    elif operador == "!=":
+        mascara = serie != valor
+    elif operador == "<":
+        mascara = serie < valor
+    elif operador == "<=":
+        mascara = serie <= valor
+    elif operador == ">":
+        mascara = serie > valor
+    elif operador == ">=":
+        mascara = serie >= valor
+    else:
+        raise ValueError(f"Operador de regra desconhecido: {operador}")
+    return mascara.fillna(False).to_numpy(dtype=bool)
+
+
+def calcular_dias_sem_uso(datas, data_referencia=None):
+    """
+    Dias inteiros entre a data de referência (padrão: agora) e o último acesso.
+    """
+    data_referencia = pd.Timestamp.now() if data_referencia is None else pd.Timestamp(data_referencia)
+    return (data_referencia - pd.to_datetime(datas, errors='coerce')).dt.days
+
+
+def aplicar_regras(df, parametros=None, data_referencia=None):
+    """
+    Aplica todas as regras de classificação e o score de limpeza em uma única passada,
+    com operações vetorizadas sobre colunas inteiras (sem apply linha a linha).
+    Cria Dias_Sem_Uso, as colunas de REGRAS_CLASSIFICACAO e Score_Limpeza.
+    """
+    parametros = resolver_parametros(parametros)
+    df = df.copy()
+    df['Dias_Sem_Uso'] = calcular_dias_sem_uso(df['Data_Ultimo_Acesso'], data_referencia).astype('Int64')
+
+    for regra in REGRAS_CLASSIFICACAO:
+        condicoes = [avaliar_condicao(df, condicao, parametros) for condicao, _ in regra["casos"]]
+        valores = [valor for _, valor in regra["casos"]]
+        resultado = np.select(condicoes, valores, default=regra["padrao"])
+        if isinstance(regra["padrao"], str):
+            resultado = resultado.astype(object)
+        df[regra["coluna"]] = resultado
+
+    pontos = np.zeros(len(df), dtype=np.int64)
+    for condicao, valor in PONTUACAO_LIMPEZA:
+        pontos += np.where(avaliar_condicao(df, condicao, parametros), valor, 0)
+    df['Score_Limpeza'] = np.maximum(pontos, 0)
+    return df
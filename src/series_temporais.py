@@ -0,0 +1,202 @@
+# src/series_temporais.py
+
+import numpy as np
+import pandas as pd
+
+from armazenamento import FORMATO_PADRAO, caminho_tabela, converter_datas, ler_tabela
+from incremental import ler_auditoria_nova
+
+# Janelas móveis (em dias) das métricas de uso por app
+JANELAS_DIAS = (7, 30, 90)
+
+# Janela do "MAU" na razão DAU/MAU (engajamento diário dos usuários do mês)
+JANELA_MAU = 30
+
+COLUNAS_USO_DIARIO = ['App ID', 'Dia', 'User UPN', 'sessoes', 'Ultimo_Evento']
+
+
+def colunas_janelas(janelas=JANELAS_DIAS):
+    """
+    Colunas por app produzidas por calcular_janelas_uso (além de ID_App).
+    """
+    colunas = []
+    for dias in janelas:
+        colunas += [f'usuarios_{dias}d', f'sessoes_{dias}d']
+    return colunas + ['Ultimo_Acesso_Log', f'DAU_Medio_{JANELA_MAU}d', 'Razao_DAU_MAU']
+
+
+def _uso_diario_vazio():
+    return pd.DataFrame({
+        'App ID': pd.Series(dtype=object),
+        'Dia': pd.Series(dtype='datetime64[us]'),
+        'User UPN': pd.Series(dtype=object),
+        'sessoes': pd.Series(dtype='int64'),
+        'Ultimo_Evento': pd.Series(dtype='datetime64[us]'),
+    })
+
+
+def agregar_uso_diario(df_auditoria):
+    """
+    Agrega os eventos de auditoria em baldes (app, dia, usuário) com o número de sessões
+    e o horário do último evento de cada balde.
+
+    Uma única ordenação (lexsort sobre os códigos ordenados de app, dia e usuário) seguida
+    de uma passada linear que marca onde cada balde começa; as contagens saem das distâncias
+    entre os inícios. Eventos sem app ou sem 'Creation Time' válido ficam de fora.
+    """
+    tempo = df_auditoria['Creation Time']
+    if not pd.api.types.is_datetime64_any_dtype(tempo):
+        tempo = converter_datas(tempo, 'Creation Time')
+    if isinstance(tempo.dtype, pd.DatetimeTZDtype):
+        tempo = tempo.dt.tz_convert(None)
+    validos = (tempo.notna() & df_auditoria['App ID'].notna()).to_numpy()
+    if not validos.any():
+        return _uso_diario_vazio()
+
+    codigos_app, apps = pd.factorize(df_auditoria['App ID'][validos], sort=True)
+    codigos_usuario, usuarios = pd.factorize(df_auditoria['User UPN'][validos], sort=True)
+    instantes = tempo[validos].to_numpy(dtype='datetime64[us]')
+    dias = instantes.astype('datetime64[D]').astype(np.int64)
+
+    ordem = np.lexsort((codigos_usuario, dias, codigos_app))
+    codigos_app, dias, codigos_usuario = codigos_app[ordem], dias[ordem], codigos_usuario[ordem]
+    instantes = instantes[ordem]
+
+    novo_balde = np.ones(len(ordem), dtype=bool)
+    novo_balde[1:] = (
+        (codigos_app[1:] != codigos_app[:-1])
+        | (dias[1:] != dias[:-1])
+        | (codigos_usuario[1:] != codigos_usuario[:-1])
+    )
+    inicios = np.flatnonzero(novo_balde)
+
+    # Eventos sem usuário (código -1) formam um balde próprio, sem usuário
+    usuarios = np.append(np.asarray(usuarios, dtype=object), None)
+    return pd.DataFrame({
+        'App ID': np.asarray(apps, dtype=object)[codigos_app[inicios]],
+        'Dia': dias[inicios].astype('datetime64[D]').astype('datetime64[us]'),
+        'User UPN': usuarios[codigos_usuario[inicios]],
+        'sessoes': np.diff(np.append(inicios, len(ordem))),
+        'Ultimo_Evento': np.maximum.reduceat(instantes, inicios),
+    })
+
+
+def mesclar_uso_diario(anterior, novo):
+    """
+    Une dois conjuntos de baldes diários: sessões somadas e último evento pelo máximo.
+    """
+    if anterior is None or len(anterior) == 0:
+        return novo
+    if len(novo) == 0:
+        return anterior
+    partes = [df[COLUNAS_USO_DIARIO].astype({'App ID': object, 'User UPN': object}) for df in (anterior, novo)]
+    return (
+        pd.concat(partes, ignore_index=True)
+        .groupby(['App ID', 'Dia', 'User UPN'], dropna=False, sort=True)
+        .agg(sessoes=('sessoes', 'sum'), Ultimo_Evento=('Ultimo_Evento', 'max'))
+        .reset_index()
+    )
+
+
+def _sem_fuso(instante):
+    instante = pd.Timestamp(instante)
+    return instante.tz_convert(None) if instante.tzinfo is not None else instante
+
+
+def atualizar_uso_diario(silver_path, bronze_path, formato=FORMATO_PADRAO, df_auditoria=None, reconstruir=False,
+                         eventos_novos=None, marca_eventos=None):
+    """
+    Atualiza a tabela silver/uso_diario (a gravação fica com quem chama, ex.: ContextoPipeline).
+
+    Com df_auditoria (log completo já carregado) os baldes são recalculados do zero. Sem ele,
+    modo incremental (reconstruir=True descarta os baldes gravados):
+      - eventos_novos: eventos ainda não incorporados, já lidos pelas métricas incrementais
+        a partir da marca d'água `marca_eventos` (veja atualizar_metricas_incrementais).
+        Se os baldes gravados vão exatamente até essa marca, os eventos são só agregados e
+        mesclados, sem ler a auditoria de novo;
+      - senão (ou com baldes de outra marca), só os eventos a partir do dia do último
+        evento já agregado são lidos da Bronze e mesclados, com esse dia recalculado.
+    """
+    if df_auditoria is not None:
+        return agregar_uso_diario(df_auditoria)
+
+    anterior = None
+    if not reconstruir and caminho_tabela(silver_path, "uso_diario", formato).exists():
+        anterior = ler_tabela(silver_path, "uso_diario", formato, tipar=True)
+    ultimo_evento = None
+    if anterior is not None and len(anterior) > 0 and pd.notna(anterior['Ultimo_Evento'].max()):
+        ultimo_evento = _sem_fuso(anterior['Ultimo_Evento'].max())
+
+    if eventos_novos is not None:
+        marca = None if marca_eventos is None else _sem_fuso(marca_eventos)
+        if ultimo_evento == marca:
+            print(f"Eventos novos para os baldes diários (já lidos pelas métricas): {len(eventos_novos)}")
+            return mesclar_uso_diario(anterior, agregar_uso_diario(eventos_novos))
+        print("Baldes diários fora da marca d'água das métricas: relendo a auditoria a partir do último dia")
+
+    marca_dagua = None
+    if ultimo_evento is not None:
+        # O último dia agregado é recalculado inteiro a partir da Bronze: eventos que
+        # chegam atrasados com o horário do último evento já agregado não se perdem
+        marca_dagua = ultimo_evento.normalize()
+        anterior = anterior[anterior['Dia'] < marca_dagua]
+    df_novos = ler_auditoria_nova(bronze_path, marca_dagua, formato, eventos_na_marca=[])
+    print(f"Eventos novos para os baldes diários: {len(df_novos)}")
+    return mesclar_uso_diario(anterior, agregar_uso_diario(df_novos))
+
+
+def calcular_janelas_uso(df_uso, data_referencia=None, janelas=JANELAS_DIAS):
+    """
+    Métricas de uso por app em janelas móveis a partir dos baldes diários: usuários únicos e
+    sessões nos últimos N dias, último acesso segundo o log, DAU médio e razão DAU/MAU.
+
+    A janela de N dias cobre o dia de referência e os N-1 anteriores. data_referencia padrão:
+    o dia mais recente do log, para que uma exportação antiga não zere todas as janelas.
+    """
+    if len(df_uso) == 0:
+        return pd.DataFrame(columns=['ID_App'] + colunas_janelas(janelas))
+
+    referencia = df_uso['Dia'].max() if data_referencia is None else pd.Timestamp(data_referencia).normalize()
+    codigos_app, apps = pd.factorize(df_uso['App ID'])
+    codigos_usuario, usuarios = pd.factorize(df_uso['User UPN'])
+    idade = (referencia - df_uso['Dia']).dt.days.to_numpy()
+    sessoes = df_uso['sessoes'].to_numpy(dtype=np.int64)
+    com_usuario = codigos_usuario >= 0
+    # Par (app, usuário) em um único inteiro para contar distintos com np.unique
+    pares = codigos_app.astype(np.int64) * max(len(usuarios), 1) + codigos_usuario
+
+    resultado = {'ID_App': np.asarray(apps, dtype=object)}
+    for dias in janelas:
+        na_janela = (idade >= 0) & (idade < dias)
+        pares_janela = np.unique(pares[na_janela & com_usuario])
+        resultado[f'usuarios_{dias}d'] = np.bincount(pares_janela // max(len(usuarios), 1), minlength=len(apps))
+        resultado[f'sessoes_{dias}d'] = np.bincount(
+            codigos_app[na_janela], weights=sessoes[na_janela], minlength=len(apps)
+        ).astype(np.int64)
+
+    df_janelas = pd.DataFrame(resultado)
+    df_janelas['Ultimo_Acesso_Log'] = df_uso['Ultimo_Evento'].groupby(codigos_app).max().to_numpy()
+
+    # Cada balde com usuário é um usuário ativo em um dia: a soma na janela dividida pelos
+    # dias é o DAU médio; dividido pelos usuários distintos da janela, a razão DAU/MAU
+    no_mes = (idade >= 0) & (idade < JANELA_MAU) & com_usuario
+    dau = np.bincount(codigos_app[no_mes], minlength=len(apps)) / JANELA_MAU
+    mau = np.bincount(np.unique(pares[no_mes]) // max(len(usuarios), 1), minlength=len(apps))
+    df_janelas[f'DAU_Medio_{JANELA_MAU}d'] = dau.round(2)
+    df_janelas['Razao_DAU_MAU'] = np.divide(dau, mau, out=np.zeros(len(apps)), where=mau > 0).round(4)
+    return df_janelas
+
+
+def anexar_janelas_uso(df_apps, df_janelas, janelas=JANELAS_DIAS):
+    """
+    Junta as métricas em janelas aos apps (pela coluna ID_App); apps sem eventos ficam com zero.
+    """
+    df_apps = df_apps.merge(df_janelas, on='ID_App', how='left')
+    for coluna in colunas_janelas(janelas):
+        if coluna == 'Ultimo_Acesso_Log':
+            df_apps[coluna] = pd.to_datetime(df_apps[coluna], errors='coerce')
+        elif coluna.startswith(('usuarios_', 'sessoes_')):
+            df_apps[coluna] = df_apps[coluna].fillna(0).astype(int)
+        else:
+            df_apps[coluna] = df_apps[coluna].fillna(0.0).astype(float)
+    return df_apps
@@ -2,144 +2,180 @@
 
 import pandas as pd
 import numpy as np
-from pathlib import Path
 import warnings
 import sys
+import io
+import contextlib
+
+from armazenamento import FORMATO_PADRAO, caminho_camada, ler_tabela, memoria_mb
+from contexto import COLUNAS_APPS_LIMPEZA, CONTRATO_SILVER_GOLD, ContextoPipeline
+from dimensoes import carregar_dimensoes, normalizar_chaves
+from incremental import atualizar_metricas_incrementais
+from hll import ERRO_PADRAO, EsbocosHLL, precisao_para_erro
+from regras import LIMIAR_LIMPEZA, aplicar_regras
+from series_temporais import anexar_janelas_uso, atualizar_uso_diario, calcular_janelas_uso
+from instrumentacao import etapa
+from paralelo import dados_compartilhados, executar_em_processos, executar_em_threads, numero_trabalhadores, particionar
 
 # Ignorar avisos de Pandas
 warnings.filterwarnings("ignore")
 
-# Configuração dos caminhos
-CURRENT_DIR = Path(__file__).parent
-bronze_path = CURRENT_DIR / "data" / "bronze"
-silver_path = CURRENT_DIR / "data" / "silver"
+# Colunas efetivamente usadas de cada tabela Bronze (as demais não são lidas). Os apps são
+# lidos no modo compacto de ler_tabela: códigos e nomes repetidos (tipo, plano, ambiente,
+# proprietário) como categóricas, contagens e flags como inteiros e booleanos anuláveis.
+COLUNAS_APPS = [
+    'admin_appid', 'admin_displayname', 'admin_appownerdisplayname', 'admin_appenvironmentid',
+    'admin_appcreatedon', 'admin_appmodifiedon', 'admin_applastlaunchedon',
+    'admin_appsharedusers', 'admin_appsharedwithtenant', 'admin_appsharedgroups',
+    'admin_appcomplexityscore', 'admin_appsharededitors', 'admin_appowner',
+    'admin_appownerprincipaltype', 'admin_powerappstype', 'admin_appplanclassification',
+    'admin_appdeleted', 'admin_appowner.admin_recordguidasstring'
+]
+COLUNAS_AUDITORIA = ['App ID', 'User UPN', 'Creation Time']
 
-def processar_camada_silver(use_friendly_names=False):
-    """Combina dados da camada bronze, aplica lógicas de negócio e salva na camada silver."""
-    try:
-        # 1. CARREGAR E FILTRAR DADOS INICIAIS
-        print("Carregando dados da camada Bronze...")
-        df_apps = pd.read_csv(bronze_path / "apps.csv", index_col=False, dtype=str)
-        print(f"Apps carregados: {df_apps.shape[0]} registros")
-        
-        # Filtrar apps não deletados e não SharePointFormApp logo no início
-        print("Aplicando filtros iniciais...")
-        df_apps['admin_appdeleted'] = df_apps['admin_appdeleted'].astype(str).str.lower()
-        df_apps = df_apps[~df_apps['admin_appdeleted'].isin(['true', '1', 'yes'])]
-        df_apps = df_apps[df_apps['admin_powerappstype'] != '597910003']  # SharePointFormApp
-        print(f"Apps após filtros: {df_apps.shape[0]} registros")
-
-        df_ambientes = pd.read_csv(bronze_path / "ambientes.csv", index_col=False, dtype=str)
-        print(f"Ambientes carregados: {df_ambientes.shape[0]} registros")
-        df_auditoria = pd.read_csv(bronze_path / "auditoria.csv", index_col=False, dtype=str)
-        print(f"Auditoria carregada: {df_auditoria.shape[0]} registros")
+# Nomes amigáveis (Power BI) das colunas da camada Silver
+MAPEAMENTO_NOMES = {
+    'admin_appinternalname': 'ID_App',
+    'admin_displayname_app': 'Nome_App',
+    'admin_appownerdisplayname': 'Nome_Criador',
+    'admin_appownerupn': 'Email_Proprietario_App',
+    'admin_displayname_ambiente': 'Nome_Ambiente',
+    'admin_appenvironmentid': 'ID_Ambiente',
+    'admin_appcreatedon': 'Data_Criacao_App',
+    'admin_appmodifiedon': 'Data_Modificacao_App',
+    'admin_applastlaunchedon': 'Data_Ultimo_Acesso',
+    'admin_appsharedusers': 'Usuarios_Compartilhados',
+    'admin_appsharedwithtenant': 'Compartilhado_Tenant',
+    'admin_appsharedgroups': 'Compartilhado_Grupos',
+    'admin_appcomplexityscore': 'Score_Complexidade',
+    'admin_appsharededitors': 'Total_Editores',
+    'admin_appowner': 'ID_Proprietario',
+    'admin_appownerprincipaltype': 'Email_Proprietario',
+    'admin_powerappstype': 'Tipo_App',
+    'admin_appplanclassification': 'Classificacao_Plano'  # Nova coluna para ROI
+}
 
-        # 1. CÁLCULO DE MÉTRICAS DE USO
-        print("Calculando métricas de uso a partir do log de auditoria...")
-        # Usar as colunas corretas do log de auditoria: 'App ID' e 'User UPN'
-        df_metricas = df_auditoria.groupby('App ID').agg(
-            usuarios_unicos=('User UPN', 'nunique'),
-            sessoes_totais=('App ID', 'size')
-        ).reset_index()
-
-        # Renomear a coluna de ID para corresponder ao DataFrame de apps para a junção
-        df_metricas.rename(columns={'App ID': 'admin_appinternalname'}, inplace=True)
-        print(f"Métricas calculadas para {df_metricas.shape[0]} apps únicos")
-
-        # 2. COMBINAÇÃO DE DADOS PRINCIPAIS
-        print("Combinando apps com métricas de uso...")
-
-        # Garantir que df_apps é um DataFrame
-        df_apps = pd.DataFrame(df_apps)
-        
-        if 'admin_appid' in df_apps.columns:
-            df_apps = df_apps.rename(columns={'admin_appid': 'admin_appinternalname'})  # type: ignore
+# Colunas essenciais exportadas para o Power BI
+CAMPOS_ESSENCIAIS = [
+    'ID_App', 'Nome_App', 'Nome_Criador', 'Email_Proprietario_App', 
+    'ID_Ambiente', 'Nome_Ambiente', 'Data_Criacao_App', 'Data_Modificacao_App', 
+    'Data_Ultimo_Acesso', 'usuarios_unicos', 'sessoes_totais', 'Usuarios_Compartilhados', 
+    'Compartilhado_Tenant', 'Compartilhado_Grupos', 'Score_Complexidade', 'total_proprietarios',
+    'Tipo_App',  # Adicionado para manter o tipo
+    'Produtividade_Pessoal',  # Nova regra de classificação
+    'Promover',  # Regra para identificar apps que precisam ser promovidos
+    'Classificacao_Plano',  # Classificação do plano (Standard/Premium)
+    'ROI',  # Regra ROI baseada no licenciamento
+    'Dias_Sem_Uso',  # Dias desde o último acesso
+    'Status_Atividade',  # Muito Ativo / Ativo / Pouco Ativo / Inativo / Nunca Usado
+    'Categoria_App',  # Sistema / Formulário / Teste/Demo / Aplicativo (pelo nome)
+    'Score_Limpeza',  # Prioridade para limpeza (notebook score_clean)
+    'Adocao_Incerta',  # Apenas no modo de contagem aproximada (HyperLogLog)
+    # Uso em janelas móveis a partir dos baldes diários do log (series_temporais.py)
+    'usuarios_7d', 'sessoes_7d', 'usuarios_30d', 'sessoes_30d', 'usuarios_90d', 'sessoes_90d',
+    'Ultimo_Acesso_Log', 'DAU_Medio_30d', 'Razao_DAU_MAU'
+]
 
-        df_apps_com_metricas = pd.merge(df_apps, df_metricas, on='admin_appinternalname', how='left')
+# Resumo por proprietário e ambiente (base dos rankings de proprietários da Gold)
+COLUNAS_RESUMO_PROPRIETARIO = [
+    'ID_Proprietario', 'Nome_Proprietario', 'Email_Proprietario', 'Departamento',
+    'ID_Ambiente', 'Nome_Ambiente', 'total_apps', 'usuarios_unicos', 'sessoes_totais', 'complexidade_total'
+]
 
-        # 2.1 ADIÇÃO DE NOMES AMIGÁVEIS DE AMBIENTE (MÉTODO ROBUSTO)
-        # Limpar nomes de colunas para remover espaços em branco ocultos
-        df_ambientes.columns = df_ambientes.columns.str.strip()
+def calcular_metricas_uso(df_auditoria):
+    """Calcula usuários únicos e sessões por app a partir do log de auditoria completo."""
+    # Usar as colunas corretas do log de auditoria: 'App ID' e 'User UPN'
+    df_metricas = df_auditoria.groupby('App ID', observed=True).agg(
+        usuarios_unicos=('User UPN', 'nunique'),
+        sessoes_totais=('App ID', 'size')
+    ).reset_index()
 
-        # CORREÇÃO DEFINITIVA: Limpar e padronizar as CHAVES de junção.
-        # 1. Remover espaços em branco de ambas as chaves.
-        df_apps_com_metricas['admin_appenvironmentid'] = df_apps_com_metricas['admin_appenvironmentid'].str.strip()
-        df_ambientes['admin_environmentid'] = df_ambientes['admin_environmentid'].str.strip()
-        
-        # 2. Remover o prefixo "Default-" dos IDs no DataFrame de aplicativos.
-        # Sua observação está correta: este prefixo impede a junção correta dos dados.
-        df_apps_com_metricas['admin_appenvironmentid'] = df_apps_com_metricas['admin_appenvironmentid'].str.replace(r'^Default-', '', regex=True)
+    # Renomear a coluna de ID para corresponder ao DataFrame de apps para a junção
+    df_metricas.rename(columns={'App ID': 'admin_appinternalname'}, inplace=True)
+    return df_metricas
 
-        # 2.2 ADIÇÃO DO E-MAIL DOS PROPRIETÁRIOS
-        print("Adicionando e-mails dos proprietários...")
-        
-        # Carregar dados dos usuários da camada Bronze
-        df_usuarios = pd.read_csv(bronze_path / "usuarios.csv", index_col=False, dtype=str)
-        
-        # Fazer junção para obter o e-mail do proprietário
-        df_apps_com_proprietarios = pd.merge(
-            df_apps_com_metricas,
-            df_usuarios[['admin_recordguidasstring', 'admin_useremail', 'admin_userprincipalname']],
-            left_on='admin_appowner.admin_recordguidasstring',
-            right_on='admin_recordguidasstring',
-            how='left',
-            suffixes=('', '_proprietario')
+def calcular_metricas_uso_aproximadas(df_auditoria, erro=ERRO_PADRAO):
+    """
+    Igual a calcular_metricas_uso, mas estima usuarios_unicos com um esboço HyperLogLog
+    por app em vez do nunique exato; margem_usuarios é a margem de erro da estimativa
+    (zero nos apps com contagem exata). Retorna as métricas e os esboços (mescláveis).
+    """
+    esbocos = EsbocosHLL.de_eventos(df_auditoria['App ID'], df_auditoria['User UPN'], precisao_para_erro(erro))
+    estimativa = esbocos.estimar()
+    df_metricas = pd.DataFrame({
+        'admin_appinternalname': esbocos.chaves,
+        'usuarios_unicos': estimativa.round().to_numpy(),
+        'margem_usuarios': esbocos.margem(estimativa).to_numpy()
+    })
+    sessoes = df_auditoria.groupby('App ID', observed=True).size().rename('sessoes_totais')
+    df_metricas = df_metricas.merge(sessoes, left_on='admin_appinternalname', right_index=True, how='outer')
+    return df_metricas, esbocos
+
+def transformar_apps(df_apps, df_metricas, dim_usuarios, dim_ambientes, parametros_regras=None, data_referencia=None):
+    """
+    Enriquece os apps com métricas de uso, proprietários e ambientes (buscas nas dimensões
+    de dimensoes.py), renomeia os campos e aplica as regras de classificação. Cada app é tratado de forma independente, então
+    a função pode rodar sobre qualquer subconjunto (partição) dos apps.
+    """
+    # 2. COMBINAÇÃO DE DADOS PRINCIPAIS
+    print("Combinando apps com métricas de uso...")
+
+    # Garantir que df_apps é um DataFrame
+    df_apps = pd.DataFrame(df_apps)
+    
+    if 'admin_appid' in df_apps.columns:
+        df_apps = df_apps.rename(columns={'admin_appid': 'admin_appinternalname'})  # type: ignore
+
+    with etapa("merge_metricas", linhas_entrada=len(df_apps)) as medida:
+        df_apps_com_metricas = pd.merge(df_apps, df_metricas, on='admin_appinternalname', how='left')
+        medida.linhas_saida = len(df_apps_com_metricas)
+
+    # 2.1 NORMALIZAÇÃO DAS CHAVES DE JUNÇÃO
+    with etapa("normalizar_chaves_ambiente"):
+        # Remover espaços e o prefixo "Default-" dos IDs de ambiente dos apps (o prefixo
+        # impede a correspondência com a tabela de ambientes). Feito só sobre os IDs
+        # distintos; as chaves das dimensões já foram normalizadas na Bronze.
+        df_apps_com_metricas['admin_appenvironmentid'] = normalizar_chaves(
+            df_apps_com_metricas['admin_appenvironmentid'], remover_prefixo_default=True
         )
-        
-        # Usar admin_userprincipalname como e-mail principal, fallback para admin_useremail
-        df_apps_com_proprietarios['admin_appownerupn'] = df_apps_com_proprietarios['admin_userprincipalname'].fillna(
-            df_apps_com_proprietarios['admin_useremail']
+        df_apps_com_metricas['admin_appowner.admin_recordguidasstring'] = normalizar_chaves(
+            df_apps_com_metricas['admin_appowner.admin_recordguidasstring']
         )
 
-        # Restaurar o método pd.merge para ambientes
-        df_apps_completo = pd.merge(
-            df_apps_com_proprietarios,
-            df_ambientes[['admin_environmentid', 'admin_displayname']],
-            left_on='admin_appenvironmentid',
-            right_on='admin_environmentid',
-            how='left',
-            suffixes=('_app', '_ambiente')
-        )
+    # 2.2 ADIÇÃO DO E-MAIL DOS PROPRIETÁRIOS
+    print("Adicionando e-mails dos proprietários...")
 
-        # Preencher nomes de ambiente ausentes com o ID do ambiente como fallback
-        df_apps_completo['admin_displayname_ambiente'].fillna(df_apps_completo['admin_appenvironmentid'], inplace=True)
-        
-        # 3. MAPEAMENTO E LIMPEZA DE DADOS
-        # 3.1 APLICAR FILTRO: REMOVER SHAREPOINTFORMAPP
-        print("Removendo SharePointFormApp (regra de negócio)...")
-        
-        # Aplicar filtro diretamente no DataFrame final antes de salvar
-        df_apps_completo = df_apps_completo[df_apps_completo['admin_powerappstype'] != '597910003']  # SharePointFormApp
-        print(f"Registros após remoção de SharePointFormApp: {df_apps_completo.shape[0]}")
-
-        # Verificar tipos únicos para debug
-        print("Tipos de apps restantes:", np.unique(df_apps_completo['admin_powerappstype']))
-
-        # 3.2 MAPEAMENTO DE NOMES AMIGÁVEIS E PREENCHIMENTO DE NULOS
-        print("Mapeando nomes de colunas e tratando valores nulos...")
-        mapeamento_nomes = {
-            'admin_appinternalname': 'ID_App',
-            'admin_displayname_app': 'Nome_App',
-            'admin_appownerdisplayname': 'Nome_Criador',
-            'admin_appownerupn': 'Email_Proprietario_App',
-            'admin_displayname_ambiente': 'Nome_Ambiente',
-            'admin_appenvironmentid': 'ID_Ambiente',
-            'admin_appcreatedon': 'Data_Criacao_App',
-            'admin_appmodifiedon': 'Data_Modificacao_App',
-            'admin_applastlaunchedon': 'Data_Ultimo_Acesso',
-            'admin_appsharedusers': 'Usuarios_Compartilhados',
-            'admin_appsharedwithtenant': 'Compartilhado_Tenant',
-            'admin_appsharedgroups': 'Compartilhado_Grupos',
-            'admin_appcomplexityscore': 'Score_Complexidade',
-            'admin_appsharededitors': 'Total_Editores',
-            'admin_appowner': 'ID_Proprietario',
-            'admin_appownerprincipaltype': 'Email_Proprietario',
-            'admin_powerappstype': 'Tipo_App',
-            'admin_appplanclassification': 'Classificacao_Plano'  # Nova coluna para ROI
-        }
-        
-        df_apps_completo = df_apps_completo.rename(columns=mapeamento_nomes) # type: ignore
-        
+    df_apps_completo = df_apps_com_metricas.rename(columns={'admin_displayname': 'admin_displayname_app'})
+    with etapa("buscar_proprietarios", linhas_entrada=len(df_apps_completo)) as medida:
+        # Busca na dimensão de usuários por posição (sem merge): UPN, com o e-mail como alternativa
+        posicoes = dim_usuarios.posicoes(df_apps_completo['admin_appowner.admin_recordguidasstring'])
+        df_apps_completo['admin_appownerupn'] = pd.Categorical(dim_usuarios.atributo(posicoes, 'admin_appownerupn'))
+        medida.linhas_saida = int((posicoes >= 0).sum())
+
+    with etapa("buscar_ambientes", linhas_entrada=len(df_apps_completo)) as medida:
+        posicoes = dim_ambientes.posicoes(df_apps_completo['admin_appenvironmentid'])
+        # Nomes de ambiente ausentes ficam com o ID do ambiente como fallback
+        df_apps_completo['admin_displayname_ambiente'] = pd.Series(
+            dim_ambientes.atributo(posicoes, 'admin_displayname'), index=df_apps_completo.index
+        ).fillna(df_apps_completo['admin_appenvironmentid'].astype(object)).astype('category')
+        medida.linhas_saida = int((posicoes >= 0).sum())
+
+    # 3. MAPEAMENTO E LIMPEZA DE DADOS
+    # 3.1 APLICAR FILTRO: REMOVER SHAREPOINTFORMAPP
+    print("Removendo SharePointFormApp (regra de negócio)...")
+    
+    # Aplicar filtro diretamente no DataFrame final antes de salvar
+    df_apps_completo = df_apps_completo[df_apps_completo['admin_powerappstype'] != '597910003']  # SharePointFormApp
+    print(f"Registros após remoção de SharePointFormApp: {df_apps_completo.shape[0]}")
+
+    # Verificar tipos únicos para debug
+    print("Tipos de apps restantes:", np.unique(df_apps_completo['admin_powerappstype']))
+
+    # 3.2 MAPEAMENTO DE NOMES AMIGÁVEIS E PREENCHIMENTO DE NULOS
+    print("Mapeando nomes de colunas e tratando valores nulos...")
+    df_apps_completo = df_apps_completo.rename(columns=MAPEAMENTO_NOMES) # type: ignore
+    
+    with etapa("converter_tipos"):
         # CORREÇÃO: Converter colunas de string para numéricas de forma robusta.
         # Primeiro para um tipo numérico geral, depois preencher NaNs e, finalmente, para o tipo final (int/bool).
         df_apps_completo['usuarios_unicos'] = pd.to_numeric(df_apps_completo['usuarios_unicos'], errors='coerce').fillna(0).astype(int) # type: ignore
@@ -148,87 +184,373 @@ def processar_camada_silver(use_friendly_names=False):
         df_apps_completo['Total_Editores'] = pd.to_numeric(df_apps_completo['Total_Editores'], errors='coerce').fillna(0).astype(int) # type: ignore
         df_apps_completo['Compartilhado_Grupos'] = pd.to_numeric(df_apps_completo['Compartilhado_Grupos'], errors='coerce').fillna(0).astype(int) # type: ignore
         df_apps_completo['Score_Complexidade'] = pd.to_numeric(df_apps_completo['Score_Complexidade'], errors='coerce').fillna(0) # type: ignore
-        
+    
         # Para a coluna booleana, uma conversão segura é verificar a string 'true'.
-        df_apps_completo['Compartilhado_Tenant'] = df_apps_completo['Compartilhado_Tenant'].str.lower() == 'true'
-        
-        # 3.3 REGRA DE CLASSIFICAÇÃO: PRODUTIVIDADE PESSOAL
-        print("Aplicando regra de classificação: Produtividade Pessoal...")
-        df_apps_completo['Produtividade_Pessoal'] = df_apps_completo['Usuarios_Compartilhados'] < 10
-        print(f"Apps classificados como Produtividade Pessoal: {df_apps_completo['Produtividade_Pessoal'].sum()}")
-        
-        # 3.4 REGRA DE CLASSIFICAÇÃO: APLICATIVOS QUE PRECISAM SER PROMOVIDOS
-        print("Aplicando regra de classificação: Aplicativos que precisam ser promovidos...")
-        df_apps_completo['Promover'] = (
-            (df_apps_completo['Produtividade_Pessoal'] == False) & 
-            (df_apps_completo['Nome_Ambiente'] == "eletrobras")
-        )
-        print(f"Apps que precisam ser promovidos: {df_apps_completo['Promover'].sum()}")
-        
-        # 3.5 REGRA DE CLASSIFICAÇÃO: ROI (RETORNO SOBRE INVESTIMENTO)
-        print("Aplicando regra de classificação: ROI...")
-        df_apps_completo['ROI'] = df_apps_completo['Classificacao_Plano'].apply(
-            lambda x: 'Obrigatório' if x == 'Premium' else 'Opcional'
-        )
-        roi_obrigatorio = (df_apps_completo['ROI'] == 'Obrigatório').sum()
-        print(f"Apps com ROI obrigatório (Premium): {roi_obrigatorio}")
-        print(f"Apps com ROI opcional (Standard): {len(df_apps_completo) - roi_obrigatorio}")
-        
+        # Em Parquet a coluna já chega como booleano.
+        if pd.api.types.is_bool_dtype(df_apps_completo['Compartilhado_Tenant']):
+            df_apps_completo['Compartilhado_Tenant'] = df_apps_completo['Compartilhado_Tenant'].fillna(False).astype(bool)
+        else:
+            df_apps_completo['Compartilhado_Tenant'] = df_apps_completo['Compartilhado_Tenant'].str.lower() == 'true'
+    
+    with etapa("converter_datas"):
         # Garantir que as colunas de data sejam do tipo datetime
         colunas_data = ['Data_Criacao_App', 'Data_Modificacao_App', 'Data_Ultimo_Acesso']
         for col in colunas_data:
             if col in df_apps_completo.columns:
                 df_apps_completo[col] = pd.to_datetime(df_apps_completo[col], errors='coerce')
+
+    # 3.3 REGRAS DE CLASSIFICAÇÃO (vetorizadas, veja regras.py)
+    # Produtividade Pessoal, Promover, ROI, categoria, status de atividade e score de limpeza
+    print("Aplicando regras de classificação (Produtividade Pessoal, Promover, ROI, Atividade, Score de Limpeza)...")
+    with etapa("regras_classificacao", linhas_entrada=len(df_apps_completo)):
+        df_apps_completo = aplicar_regras(df_apps_completo, parametros_regras, data_referencia)
+        print(f"Apps classificados como Produtividade Pessoal: {df_apps_completo['Produtividade_Pessoal'].sum()}")
+        print(f"Apps que precisam ser promovidos: {df_apps_completo['Promover'].sum()}")
+        roi_obrigatorio = (df_apps_completo['ROI'] == 'Obrigatório').sum()
+        print(f"Apps com ROI obrigatório (Premium): {roi_obrigatorio}")
+        print(f"Apps com ROI opcional (Standard): {len(df_apps_completo) - roi_obrigatorio}")
+        print(f"Apps candidatos a limpeza (Score ≥ {LIMIAR_LIMPEZA}): {(df_apps_completo['Score_Limpeza'] >= LIMIAR_LIMPEZA).sum()}")
+
+    # Total de proprietários usado na regra de alta adoção
+    df_apps_completo['total_proprietarios'] = 1 + df_apps_completo['Total_Editores']
+    return df_apps_completo
+
+
+def _transformar_particao(tarefa):
+    """Executa métricas e transformação de uma partição dentro de um processo trabalhador."""
+    df_apps, df_auditoria, df_metricas = tarefa
+    dados = dados_compartilhados()
+    esbocos = None
+    # Os prints de cada partição são descartados; o resumo é impresso pelo processo principal
+    with contextlib.redirect_stdout(io.StringIO()):
+        if df_metricas is None:
+            if dados['erro_hll'] is not None:
+                df_metricas, esbocos = calcular_metricas_uso_aproximadas(df_auditoria, dados['erro_hll'])
+            else:
+                df_metricas = calcular_metricas_uso(df_auditoria)
+        df_apps_completo = None
+        if len(df_apps) > 0:
+            df_apps_completo = transformar_apps(df_apps, df_metricas, dados['dim_usuarios'], dados['dim_ambientes'],
+                                                dados['parametros_regras'], dados['data_referencia'])
+    return df_apps_completo, df_metricas, esbocos
+
+def transformar_apps_em_paralelo(df_apps, dim_usuarios, dim_ambientes, trabalhadores=None,
+                                 df_auditoria=None, df_metricas=None, erro_hll=None,
+                                 parametros_regras=None, data_referencia=None):
+    """
+    Particiona apps e eventos de auditoria pelo hash do ID do app e executa as métricas de uso
+    e transformar_apps de cada partição em um pool de processos.
+
+    As dimensões (usuários e ambientes) são enviadas uma vez por processo. O resultado é
+    concatenado na ordem original dos apps, igual ao processamento sequencial.
+    Retorna (apps transformados, métricas de uso por app, esboços HLL ou None).
+    """
+    n_particoes = numero_trabalhadores(trabalhadores)
+    print(f"Processando Silver em paralelo: {n_particoes} partições/processos")
+
+    df_apps = df_apps.copy()
+    df_apps['_ordem'] = np.arange(len(df_apps))
+    particoes_apps = particionar(df_apps, 'admin_appid', n_particoes)
+
+    if df_metricas is not None:
+        particoes_metricas = particionar(df_metricas, 'admin_appinternalname', n_particoes)
+        tarefas = [(apps, None, metricas) for apps, metricas in zip(particoes_apps, particoes_metricas)]
+    else:
+        particoes_auditoria = particionar(df_auditoria, 'App ID', n_particoes)
+        tarefas = [(apps, auditoria, None) for apps, auditoria in zip(particoes_apps, particoes_auditoria)]
+
+    resultados = executar_em_processos(
+        _transformar_particao,
+        tarefas,
+        trabalhadores=n_particoes,
+        compartilhado={
+            'dim_usuarios': dim_usuarios,
+            'dim_ambientes': dim_ambientes,
+            'erro_hll': erro_hll,
+            'parametros_regras': parametros_regras,
+            # Mesma data de referência em todas as partições
+            'data_referencia': pd.Timestamp.now() if data_referencia is None else data_referencia
+        }
+    )
+
+    partes = [df for df, _, _ in resultados if df is not None]
+    if partes:
+        df_apps_completo = pd.concat(partes, ignore_index=True)
+    else:
+        df_apps_completo = transformar_apps(df_apps.iloc[0:0], df_metricas if df_metricas is not None
+                                            else calcular_metricas_uso(df_auditoria.iloc[0:0]),
+                                            dim_usuarios, dim_ambientes, parametros_regras, data_referencia)
+    # Ordem determinística: a mesma do processamento sequencial
+    df_apps_completo = (
+        df_apps_completo.sort_values('_ordem', kind='stable')
+        .drop(columns='_ordem')
+        .reset_index(drop=True)
+    )
+
+    # Cada app cai numa única partição: as métricas das partições não se sobrepõem
+    df_metricas = (
+        pd.concat([metricas for _, metricas, _ in resultados], ignore_index=True)
+        .sort_values('admin_appinternalname', kind='stable')
+        .reset_index(drop=True)
+    )
+    esbocos = None
+    for _, _, parcial in resultados:
+        if parcial is not None:
+            esbocos = parcial if esbocos is None else esbocos.mesclar(parcial)
+    return df_apps_completo, df_metricas, esbocos
+
+def resumir_por_ambiente(df_apps_completo):
+    """
+    Total de apps, usuários únicos e sessões por ambiente (todos os apps, não só os de alta adoção),
+    ordenado pelo ID e nome do ambiente. A ordenação é pelos valores e não pela ordem das
+    categorias: no processamento em paralelo as categorias vêm da união das partições, em
+    outra ordem, e o resumo tem de sair igual ao sequencial.
+    """
+    resumo = df_apps_completo.groupby(['ID_Ambiente', 'Nome_Ambiente'], observed=True, dropna=False, sort=False).agg(
+        total_apps=('ID_App', 'count'),
+        total_usuarios_unicos=('usuarios_unicos', 'sum'),
+        total_sessoes=('sessoes_totais', 'sum')
+    ).reset_index()
+    return resumo.sort_values(['ID_Ambiente', 'Nome_Ambiente'], key=lambda coluna: coluna.astype(object),
+                              na_position='last', kind='stable', ignore_index=True)
+
+def resumir_por_proprietario(df_apps, dim_usuarios):
+    """
+    Apps, usuários, sessões e complexidade por proprietário e ambiente, base dos rankings
+    da Gold. A chave é o GUID do proprietário, não o nome de exibição: donos homônimos não
+    se misturam. Nome e departamento vêm da dimensão de usuários (sem o dono na dimensão,
+    vale o nome registrado no app).
+    """
+    resumo = df_apps.groupby(['admin_appowner.admin_recordguidasstring', 'ID_Ambiente'],
+                             observed=True, dropna=False, sort=False).agg(
+        Nome_Ambiente=('Nome_Ambiente', 'first'),
+        Nome_Criador=('Nome_Criador', 'first'),
+        Email_Proprietario=('Email_Proprietario_App', 'first'),
+        total_apps=('ID_App', 'count'),
+        usuarios_unicos=('usuarios_unicos', 'sum'),
+        sessoes_totais=('sessoes_totais', 'sum'),
+        complexidade_total=('Score_Complexidade', 'sum')
+    ).reset_index().rename(columns={'admin_appowner.admin_recordguidasstring': 'ID_Proprietario'})
+
+    posicoes = dim_usuarios.posicoes(resumo['ID_Proprietario'])
+    resumo['Nome_Proprietario'] = pd.Series(
+        dim_usuarios.atributo(posicoes, 'admin_displayname'), index=resumo.index
+    ).fillna(resumo['Nome_Criador'].astype(object))
+    resumo['Departamento'] = dim_usuarios.atributo(posicoes, 'admin_department')
+    return resumo[COLUNAS_RESUMO_PROPRIETARIO]
+
+def selecionar_apps_limpeza(df_apps_completo):
+    """
+    Todos os apps com status de atividade, dias sem uso e score de limpeza, do maior score
+    para o menor: os candidatos a limpeza (nunca usados, inativos, de teste) não passam no
+    filtro de alta adoção e só aparecem nesta tabela. Empates mantêm a ordem dos apps.
+    Com contagem aproximada, inclui Adocao_Incerta de todos os apps.
+    """
+    colunas = [col for col in [*COLUNAS_APPS_LIMPEZA, 'Adocao_Incerta'] if col in df_apps_completo.columns]
+    return df_apps_completo[colunas].sort_values('Score_Limpeza', ascending=False, kind='stable', ignore_index=True)
+
+def processar_camada_silver(use_friendly_names=False, formato=FORMATO_PADRAO, diretorio_dados=None,
+                            incremental=False, reconstruir_estado=False,
+                            usuarios_aproximados=False, erro_hll=ERRO_PADRAO,
+                            paralelo=False, trabalhadores=None, parametros_regras=None, data_referencia=None,
+                            contexto=None, dimensoes=None):
+    """
+    Combina dados da camada bronze, aplica lógicas de negócio e salva na camada silver.
+
+    Com incremental=True as métricas de uso vêm do estado persistido em
+    silver/estado_metricas, incorporando apenas os eventos de auditoria posteriores
+    à marca d'água da última execução (veja incremental.py).
+    Com usuarios_aproximados=True, usuarios_unicos é estimado por HyperLogLog com erro
+    relativo erro_hll, e apps cuja estimativa está dentro da margem de erro do esboço em
+    torno do limite de alta adoção são marcados em Adocao_Incerta (na tabela apps_limpeza,
+    com todos os apps, e nas de alta adoção).
+    Com paralelo=True, métricas e regras por app rodam em partições num pool de
+    `trabalhadores` processos (padrão: número de CPUs).
+    parametros_regras sobrescreve PARAMETROS_PADRAO de regras.py (limiar de produtividade
+    pessoal, ambiente de promoção); data_referencia é a data usada em Dias_Sem_Uso (padrão: agora).
+    dimensoes: (dim_usuarios, dim_ambientes) já carregadas (ex.: do CacheDimensoes do modo
+    lote), em vez de lidas da Bronze.
+
+    As tabelas de CONTRATO_SILVER_GOLD são publicadas no `contexto` (ContextoPipeline), de
+    onde a Gold as lê em memória; a gravação em disco acontece em segundo plano. Sem contexto,
+    a função cria um próprio e só retorna depois de gravar as tabelas.
+    """
+    contexto_proprio = contexto is None
+    if contexto_proprio:
+        contexto = ContextoPipeline(diretorio_dados, formato)
+    erro_distintos = erro_hll if usuarios_aproximados else None
+    bronze_path = caminho_camada("bronze", diretorio_dados)
+    silver_path = caminho_camada("silver", diretorio_dados)
+    try:
+        # 1. CARREGAR E FILTRAR DADOS INICIAIS
+        with etapa("carregar_bronze") as medida:
+            print("Carregando dados da camada Bronze...")
+            # Tabelas independentes: lidas ao mesmo tempo (no modo incremental a auditoria
+            # é lida depois, só a partir da marca d'água)
+            leituras = {
+                "apps": lambda: ler_tabela(bronze_path, "apps", formato, colunas=COLUNAS_APPS, compacto=True),
+                "dimensoes": lambda: dimensoes or carregar_dimensoes(bronze_path, formato),
+            }
+            if not incremental:
+                leituras["auditoria"] = lambda: ler_tabela(bronze_path, "auditoria", formato, colunas=COLUNAS_AUDITORIA)
+            tabelas, erros, duracoes = executar_em_threads(leituras, prefixo="ler:")
+            for nome, erro in erros.items():
+                print(f"Erro ao carregar {nome} da camada Bronze: {erro}")
+            if erros:
+                raise next(iter(erros.values()))
+            print("Tempo de leitura por tabela: " + ", ".join(f"{nome} {duracao:.2f}s" for nome, duracao in duracoes.items()))
+
+            df_apps = tabelas["apps"]
+            print(f"Apps carregados: {df_apps.shape[0]} registros ({memoria_mb(df_apps):.2f} MB em memória)")
         
+            # Filtrar apps não deletados e não SharePointFormApp logo no início
+            print("Aplicando filtros iniciais...")
+            df_apps = df_apps[~df_apps['admin_appdeleted'].fillna(False).to_numpy(dtype=bool)]
+            df_apps = df_apps[df_apps['admin_powerappstype'] != '597910003']  # SharePointFormApp
+            print(f"Apps após filtros: {df_apps.shape[0]} registros")
+
+            # Dimensões de usuários e ambientes (chaves normalizadas na Bronze)
+            dim_usuarios, dim_ambientes = tabelas["dimensoes"]
+            print(f"Dimensões carregadas: {len(dim_usuarios)} usuários, {len(dim_ambientes)} ambientes")
+            medida.linhas_saida = len(df_apps)
+
+        # 1. CÁLCULO DE MÉTRICAS DE USO
+        with etapa("metricas_uso") as medida:
+            df_metricas = None
+            df_auditoria = None
+            esbocos = None
+            eventos_novos = marca_eventos = None
+            if incremental:
+                print("Atualizando métricas de uso de forma incremental...")
+                # Os eventos novos lidos aqui também alimentam os baldes diários (abaixo)
+                df_metricas, eventos_novos, marca_eventos = atualizar_metricas_incrementais(
+                    bronze_path, formato=formato, reconstruir=reconstruir_estado,
+                    diretorio_dados=diretorio_dados, erro_hll=erro_distintos, retornar_eventos=True
+                )
+            else:
+                df_auditoria = tabelas["auditoria"]
+                print(f"Auditoria carregada: {df_auditoria.shape[0]} registros")
+                print("Calculando métricas de uso a partir do log de auditoria...")
+                # No modo paralelo as métricas são calculadas por partição, junto com os apps
+                if paralelo:
+                    df_metricas = None
+                elif usuarios_aproximados:
+                    df_metricas, esbocos = calcular_metricas_uso_aproximadas(df_auditoria, erro_hll)
+                else:
+                    df_metricas = calcular_metricas_uso(df_auditoria)
+            medida.linhas_entrada = None if df_auditoria is None else len(df_auditoria)
+            medida.linhas_saida = None if df_metricas is None else len(df_metricas)
+
+        # 1.1 SÉRIES TEMPORAIS: BALDES DIÁRIOS E JANELAS MÓVEIS (7/30/90 dias)
+        with etapa("series_temporais") as medida:
+            print("Agregando o log de auditoria em baldes diários por app...")
+            df_uso_diario = atualizar_uso_diario(
+                silver_path, bronze_path, formato,
+                df_auditoria=None if incremental else df_auditoria, reconstruir=reconstruir_estado,
+                eventos_novos=eventos_novos, marca_eventos=marca_eventos
+            )
+            # Os baldes são o estado das próximas execuções incrementais: sempre gravados,
+            # em segundo plano enquanto os apps são transformados
+            contexto.publicar("silver", "uso_diario", df_uso_diario, persistir=True)
+            df_janelas = calcular_janelas_uso(df_uso_diario, data_referencia)
+            print(f"Baldes diários (app, dia, usuário): {len(df_uso_diario)}")
+            medida.linhas_saida = len(df_uso_diario)
+
+        # 2. COMBINAÇÃO, LIMPEZA E REGRAS DE CLASSIFICAÇÃO
+        with etapa("transformar_apps", linhas_entrada=len(df_apps)) as medida:
+            if paralelo:
+                df_apps_completo, df_metricas, esbocos = transformar_apps_em_paralelo(
+                    df_apps, dim_usuarios, dim_ambientes, trabalhadores,
+                    df_auditoria=None if incremental else df_auditoria[['App ID', 'User UPN']],
+                    df_metricas=df_metricas if incremental else None,
+                    erro_hll=None if incremental else erro_distintos,
+                    parametros_regras=parametros_regras,
+                    data_referencia=data_referencia
+                )
+                print(f"Métricas calculadas para {df_metricas.shape[0]} apps únicos")
+                print(f"Registros após transformação em paralelo: {df_apps_completo.shape[0]}")
+            else:
+                print(f"Métricas calculadas para {df_metricas.shape[0]} apps únicos")
+                df_apps_completo = transformar_apps(df_apps, df_metricas, dim_usuarios, dim_ambientes,
+                                                    parametros_regras, data_referencia)
+            df_apps_completo = anexar_janelas_uso(df_apps_completo, df_janelas)
+            df_resumo_ambiente = resumir_por_ambiente(df_apps_completo)
+            medida.linhas_saida = len(df_apps_completo)
+
+        if esbocos is not None:
+            esbocos.salvar(silver_path / "esbocos_usuarios.npz")
+            print(f"Usuários únicos estimados por HyperLogLog (erro relativo ~{esbocos.erro_relativo:.2%})")
+
         # 4. FILTRO DE ALTA ADOÇÃO
-        print("Aplicando filtro de alta adoção...")
-        df_apps_completo['total_proprietarios'] = 1 + df_apps_completo['Total_Editores']
+        with etapa("filtro_alta_adocao", linhas_entrada=len(df_apps_completo)) as medida:
+            print("Aplicando filtro de alta adoção...")
         
-        # Debug: verificar quais tipos ainda existem
-        print("Debug - Tipos de apps antes do filtro final:")
-        print(pd.Series(df_apps_completo['Tipo_App']).value_counts())
+            # Debug: verificar quais tipos ainda existem
+            print("Debug - Tipos de apps antes do filtro final:")
+            print(pd.Series(df_apps_completo['Tipo_App']).value_counts())
         
-        # Aplicar filtros: alta adoção E remover SharePointFormApp (597910002 e 597910003)
-        regra_filtro = (df_apps_completo['usuarios_unicos'] > df_apps_completo['total_proprietarios']) & \
-                      (~df_apps_completo['Tipo_App'].isin(['597910002', '597910003']))  # Formulários
-        df_alta_adocao = df_apps_completo[regra_filtro].copy()
-        print(f"Apps de alta adoção encontrados: {df_alta_adocao.shape[0]}")
+            # Aplicar filtros: alta adoção E remover SharePointFormApp (597910002 e 597910003)
+            regra_filtro = (df_apps_completo['usuarios_unicos'] > df_apps_completo['total_proprietarios']) & \
+                          (~df_apps_completo['Tipo_App'].isin(['597910002', '597910003']))  # Formulários
+
+            # Com contagem aproximada, sinalizar apps cuja estimativa está dentro da margem de erro do limite
+            # (margem do próprio esboço: zero nos apps com poucos usuários, contados sem erro)
+            if usuarios_aproximados:
+                margem = pd.to_numeric(df_apps_completo['margem_usuarios'], errors='coerce').fillna(0)
+                df_apps_completo['Adocao_Incerta'] = (margem > 0) & (
+                    (df_apps_completo['usuarios_unicos'] - df_apps_completo['total_proprietarios']).abs() <= margem
+                )
+                incertos = df_apps_completo['Adocao_Incerta'] & ~df_apps_completo['Tipo_App'].isin(['597910002', '597910003'])
+                print(f"Apps com adoção incerta (limite dentro da margem de erro da estimativa): {incertos.sum()} "
+                      f"({(incertos & regra_filtro).sum()} dentro e {(incertos & ~regra_filtro).sum()} fora da alta adoção)")
+            df_alta_adocao = df_apps_completo[regra_filtro].copy()
+            # A tabela de limpeza tem todos os apps, inclusive os de adoção incerta fora do filtro
+            df_limpeza = selecionar_apps_limpeza(df_apps_completo)
+            print(f"Apps de alta adoção encontrados: {df_alta_adocao.shape[0]}")
         
-        # Debug: verificar tipos restantes
-        print("Debug - Tipos finais:")
-        print(pd.Series(df_alta_adocao['Tipo_App']).value_counts())
+            # Debug: verificar tipos restantes
+            print("Debug - Tipos finais:")
+            print(pd.Series(df_alta_adocao['Tipo_App']).value_counts())
         
-        # 5. DEFINIÇÃO DAS COLUNAS ESSENCIAIS PARA EXPORTAÇÃO
-        campos_essenciais = [
-            'ID_App', 'Nome_App', 'Nome_Criador', 'Email_Proprietario_App', 
-            'ID_Ambiente', 'Nome_Ambiente', 'Data_Criacao_App', 'Data_Modificacao_App', 
-            'Data_Ultimo_Acesso', 'usuarios_unicos', 'sessoes_totais', 'Usuarios_Compartilhados', 
-            'Compartilhado_Tenant', 'Compartilhado_Grupos', 'Score_Complexidade', 'total_proprietarios',
-            'Tipo_App',  # Adicionado para manter o tipo
-            'Produtividade_Pessoal',  # Nova regra de classificação
-            'Promover',  # Regra para identificar apps que precisam ser promovidos
-            'Classificacao_Plano',  # Classificação do plano (Standard/Premium)
-            'ROI'  # Regra ROI baseada no licenciamento
-        ]
-
-        # Filtrar SharePointFormApp antes de criar o DataFrame final
-        df_alta_adocao = pd.DataFrame(df_alta_adocao)
-        df_alta_adocao = df_alta_adocao[df_alta_adocao['Tipo_App'] != '597910003']
+            # 5. SELEÇÃO DAS COLUNAS ESSENCIAIS PARA EXPORTAÇÃO (veja CAMPOS_ESSENCIAIS)
+            # Filtrar SharePointFormApp antes de criar o DataFrame final
+            df_alta_adocao = pd.DataFrame(df_alta_adocao)
+            df_alta_adocao = df_alta_adocao[df_alta_adocao['Tipo_App'] != '597910003']
         
-        # Usar df_alta_adocao já filtrado
-        colunas_finais = [col for col in campos_essenciais if col in df_alta_adocao.columns]
-        df_power_bi = pd.DataFrame(df_alta_adocao[colunas_finais])
+            # Usar df_alta_adocao já filtrado
+            colunas_finais = [col for col in CAMPOS_ESSENCIAIS if col in df_alta_adocao.columns]
+            df_power_bi = pd.DataFrame(df_alta_adocao[colunas_finais])
+            medida.linhas_saida = len(df_power_bi)
 
-        # 6. EXPORTAÇÃO DOS ARQUIVOS FINAIS
+        with etapa("resumo_proprietarios", linhas_entrada=len(df_alta_adocao)) as medida:
+            df_resumo_proprietarios = resumir_por_proprietario(df_alta_adocao, dim_usuarios)
+            medida.linhas_saida = len(df_resumo_proprietarios)
+
+        # 6. PUBLICAÇÃO DAS TABELAS PARA A GOLD (gravadas em disco em segundo plano)
         # Tabela principal para Power BI com apps de alta adoção
-        caminho_power_bi = silver_path / "apps_com_metricas.csv"
-        df_power_bi.to_csv(caminho_power_bi, index=False)
-        print(f"Tabela para Power BI salva com {df_power_bi.shape[0]} registros em {caminho_power_bi}")
+        with etapa("publicar_silver", linhas_entrada=len(df_power_bi)):
+            contexto.publicar("silver", "apps_com_metricas", df_power_bi)
+            contexto.publicar("silver", "apps_alta_adocao", df_power_bi)
+            contexto.publicar("silver", "metricas_uso_auditoria", df_metricas)
+            contexto.publicar("silver", "resumo_por_ambiente", df_resumo_ambiente)
+            contexto.publicar("silver", "resumo_por_proprietario", df_resumo_proprietarios)
+            contexto.publicar("silver", "apps_limpeza", df_limpeza)
+            contexto.verificar_contrato("silver", CONTRATO_SILVER_GOLD)
+            print(f"Tabela para Power BI com {df_power_bi.shape[0]} registros; "
+                  f"resumo de {len(df_resumo_ambiente)} ambientes e {len(df_resumo_proprietarios)} "
+                  f"pares proprietário/ambiente; {len(df_limpeza)} apps na tabela de limpeza "
+                  f"({(df_limpeza['Score_Limpeza'] >= LIMIAR_LIMPEZA).sum()} candidatos)")
+
+        if contexto_proprio:
+            with etapa("gravar_silver"):
+                for nome, caminho in contexto.aguardar("silver").items():
+                    print(f"Salvo: {caminho}")
 
         print("\nCamada Silver processada com sucesso!")
         # Retorna um dicionário com as contagens para o resumo final
         return {
-            "apps_com_metricas": df_power_bi.shape[0]
+            "apps_com_metricas": df_power_bi.shape[0],
+            "uso_diario": len(df_uso_diario)
         }
 
     except FileNotFoundError as e:
@@ -240,6 +562,9 @@ def processar_camada_silver(use_friendly_names=False):
     except Exception as e:
         print(f"Ocorreu um erro inesperado na camada Silver: {e}")
         return {}  # Retornar dicionário vazio em caso de falha
+    finally:
+        if contexto_proprio:
+            contexto.fechar()
 
 if __name__ == '__main__':
     processar_camada_silver(use_friendly_names=True)
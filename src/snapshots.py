@@ -0,0 +1,166 @@
+# src/snapshots.py
+
+import hashlib
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+
+from armazenamento import DIRETORIO_DADOS, ESQUEMAS, para_arrow
+from dag import forma_canonica, hash_dataframe
+
+# Snapshots em Arrow IPC (Feather v2) das tabelas Silver e Gold, para notebooks e dashboards:
+# abertos com memory map, sem copiar nem reinterpretar os dados (veja abrir_snapshot)
+DIRETORIO_SNAPSHOTS = "snapshots"
+ARQUIVO_MANIFESTO = "manifesto.json"
+EXTENSAO = ".arrow"
+
+
+def caminho_snapshots(diretorio_dados=None):
+    return Path(diretorio_dados or DIRETORIO_DADOS) / DIRETORIO_SNAPSHOTS
+
+
+def caminho_snapshot(camada, nome, diretorio_dados=None):
+    return caminho_snapshots(diretorio_dados) / camada / f"{nome}{EXTENSAO}"
+
+
+def para_tabela_arrow(df, nome):
+    """
+    Tabela Arrow do DataFrame: com o esquema de armazenamento.py quando a tabela tem um
+    (GUIDs como dicionário), senão com os tipos do próprio DataFrame.
+    """
+    if nome in ESQUEMAS:
+        return para_arrow(df, nome)
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def assinatura_snapshot(df, nome):
+    """
+    Hash do conteúdo publicado: o DataFrame na forma canônica (dag.forma_canonica), que não
+    depende de a tabela vir da memória ou do disco, mais o esquema Arrow usado na gravação.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(hash_dataframe(forma_canonica(df)).encode("utf-8"))
+    h.update(json.dumps(ESQUEMAS.get(nome, {}), sort_keys=True, default=str).encode("utf-8"))
+    return h.hexdigest()
+
+
+def gravar_snapshot(tabela, caminho):
+    """
+    Grava a tabela Arrow em formato IPC de arquivo, sem compressão (compressão impede a
+    leitura sem cópia). O arquivo é trocado de uma vez: quem já mapeou a versão anterior
+    continua lendo-a até fechar.
+    """
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    temporario = caminho.with_suffix(".tmp")
+    with pa.OSFile(str(temporario), "wb") as arquivo, pa.ipc.new_file(arquivo, tabela.schema) as escritor:
+        escritor.write_table(tabela)
+    os.replace(temporario, caminho)
+    return caminho
+
+
+def ler_manifesto(diretorio_dados=None):
+    """
+    Manifesto dos snapshots publicados ({} se ainda não há nenhum).
+    """
+    caminho = caminho_snapshots(diretorio_dados) / ARQUIVO_MANIFESTO
+    if not caminho.exists():
+        return {}
+    with open(caminho, encoding="utf-8") as arquivo:
+        return json.load(arquivo)
+
+
+def _gravar_manifesto(manifesto, diretorio_dados=None):
+    caminho = caminho_snapshots(diretorio_dados) / ARQUIVO_MANIFESTO
+    temporario = caminho.with_suffix(".tmp")
+    with open(temporario, "w", encoding="utf-8") as arquivo:
+        json.dump(manifesto, arquivo, indent=2, ensure_ascii=False)
+    os.replace(temporario, caminho)
+
+
+def publicar_snapshots(tabelas, diretorio_dados=None):
+    """
+    Grava os snapshots de {(camada, nome): DataFrame} e atualiza o manifesto.
+
+    Tabelas com o mesmo conteúdo da publicação anterior (veja assinatura_snapshot) não são
+    regravadas. O manifesto é gravado por último, com o instante da publicação, e é o
+    que os leitores consultam para saber se há dados novos: sem nenhuma mudança, ele não
+    é tocado.
+    Retorna {"camada/nome": registros} das tabelas regravadas.
+    """
+    anteriores = ler_manifesto(diretorio_dados).get("tabelas", {})
+    registros_manifesto = {}
+    gravadas = {}
+    for (camada, nome), df in tabelas.items():
+        chave = f"{camada}/{nome}"
+        caminho = caminho_snapshot(camada, nome, diretorio_dados)
+        assinatura = assinatura_snapshot(df, nome)
+        anterior = anteriores.get(chave)
+        if anterior is None or anterior["hash"] != assinatura or not caminho.exists():
+            gravar_snapshot(para_tabela_arrow(df, nome), caminho)
+            gravadas[chave] = len(df)
+        registros_manifesto[chave] = {
+            "arquivo": str(caminho.relative_to(caminho_snapshots(diretorio_dados))),
+            "registros": len(df),
+            "colunas": [str(coluna) for coluna in df.columns],
+            "hash": assinatura,
+        }
+    if not gravadas and registros_manifesto.keys() == anteriores.keys():
+        return gravadas
+    _gravar_manifesto({
+        "publicado_em": datetime.now().isoformat(timespec="microseconds"),
+        "tabelas": registros_manifesto,
+    }, diretorio_dados)
+    return gravadas
+
+
+def publicar_do_contexto(contexto, tabelas_por_camada, diretorio_dados=None):
+    """
+    Publica snapshots das tabelas {camada: [nomes]} a partir do ContextoPipeline: as
+    publicadas na execução vêm da memória, as demais do disco. Tabelas inexistentes (ex.:
+    tabelas Gold vazias, que não são gravadas) ficam de fora.
+    """
+    tabelas = {}
+    for camada, nomes in tabelas_por_camada.items():
+        for nome in nomes:
+            try:
+                tabelas[(camada, nome)] = contexto.obter(camada, nome)
+            except FileNotFoundError:
+                continue
+    return publicar_snapshots(tabelas, diretorio_dados)
+
+
+def abrir_snapshot(nome, camada="silver", colunas=None, diretorio_dados=None):
+    """
+    Abre o snapshot como tabela Arrow mapeada em memória: nada é copiado nem lido do disco
+    até as colunas serem usadas, então abrir leva milissegundos em qualquer tamanho.
+    """
+    caminho = caminho_snapshot(camada, nome, diretorio_dados)
+    if not caminho.exists():
+        raise FileNotFoundError(f"Snapshot {camada}/{nome} não encontrado em {caminho}. Execute o pipeline (main.py).")
+    tabela = pa.ipc.open_file(pa.memory_map(str(caminho), "r")).read_all()
+    return tabela if colunas is None else tabela.select(colunas)
+
+
+def carregar_snapshot(nome, camada="silver", colunas=None, diretorio_dados=None, tipos_arrow=False):
+    """
+    Snapshot como DataFrame pandas.
+
+    Com tipos_arrow=True as colunas ficam com tipos pd.ArrowDtype apontando para o arquivo
+    mapeado (sem cópia). Sem isso, colunas numéricas e datas viram NumPy e GUIDs viram
+    categóricas, como nos DataFrames do pipeline (uma cópia, ainda sem interpretar texto).
+    """
+    tabela = abrir_snapshot(nome, camada, colunas, diretorio_dados)
+    if tipos_arrow:
+        return tabela.to_pandas(types_mapper=pd.ArrowDtype)
+    return tabela.to_pandas(split_blocks=True)
+
+
+def listar_snapshots(diretorio_dados=None):
+    """
+    Tabelas publicadas, com registros e colunas (do manifesto).
+    """
+    return ler_manifesto(diretorio_dados).get("tabelas", {})
@@ -0,0 +1,23 @@
+# tests/conftest.py
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# O gerador de dados sintéticos fica em benchmarks/ (os módulos de src/ entram no path
+# pela configuração do pytest no pyproject.toml)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "benchmarks"))
+
+from gerar_dados import gerar_dados  # noqa: E402
+
+# Escala dos dados de teste: 300 apps, 600 usuários e 8 ambientes (veja dimensoes_para)
+LINHAS_AUDITORIA_TESTE = 3000
+
+
+@pytest.fixture(scope="session")
+def fontes_sinteticas(tmp_path_factory):
+    """
+    Os quatro CSVs sintéticos, no formato de FONTES_DE_DADOS ({fonte: caminho}).
+    """
+    return gerar_dados(tmp_path_factory.mktemp("fontes"), LINHAS_AUDITORIA_TESTE)
@@ -0,0 +1,20 @@
+# tests/test_armazenamento.py
+#
+# Tipagem das leituras: datas ISO 8601 e fora do ISO (exports do Dataverse).
+
+import pandas as pd
+
+from armazenamento import preparar_tipos
+
+
+def test_datas_fora_do_iso_nao_viram_nulo(capsys):
+    df = pd.DataFrame({"Creation Time": ["2025-03-01 00:01:55", "3/1/2025 4:05 PM", "2025-03-01T10:00:00Z",
+                                         None, "", "não é data"]})
+    datas = preparar_tipos(df, "auditoria")["Creation Time"]
+
+    assert datas.dtype == "datetime64[us]"
+    assert datas.tolist()[:3] == [pd.Timestamp("2025-03-01 00:01:55"), pd.Timestamp("2025-03-01 16:05"),
+                                  pd.Timestamp("2025-03-01 10:00")]
+    assert datas[3:].isna().all()
+    # Só o valor preenchido e inválido gera aviso
+    assert "1 valores de data inválidos em auditoria.Creation Time" in capsys.readouterr().out
@@ -0,0 +1,108 @@
+# tests/test_cache.py
+#
+# Cache das etapas por impressão digital: acerto, falha, restauração das saídas e
+# remoção das entradas menos usadas (LRU).
+
+import pytest
+
+from cache import CacheEtapas
+
+MODULOS = ["armazenamento"]
+
+
+class Etapa:
+    """
+    Etapa de teste: grava as tabelas pedidas em saidas_em e conta as execuções.
+    """
+
+    def __init__(self, diretorio, tabelas):
+        self.diretorio = diretorio
+        self.tabelas = tabelas
+        self.execucoes = 0
+
+    def __call__(self):
+        self.execucoes += 1
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        for nome, conteudo in self.tabelas.items():
+            (self.diretorio / nome).write_text(conteudo, encoding="utf-8")
+        return {"registros": len(self.tabelas)}
+
+
+@pytest.fixture
+def dados(tmp_path):
+    entrada = tmp_path / "bronze" / "apps.csv"
+    entrada.parent.mkdir(parents=True)
+    entrada.write_text("a,b\n1,2\n", encoding="utf-8")
+    return tmp_path
+
+
+def _executar(cache, dados, etapa, config=None):
+    return cache.executar("silver", etapa, [dados / "bronze" / "apps.csv"], MODULOS, config or {},
+                          dados / "silver")
+
+
+def test_acerto_e_falha(dados):
+    etapa = Etapa(dados / "silver", {"apps.csv": "x\n1\n"})
+
+    assert _executar(CacheEtapas(dados), dados, etapa) == {"registros": 1}
+    cache = CacheEtapas(dados)
+    assert _executar(cache, dados, etapa) == {"registros": 1}
+    assert etapa.execucoes == 1
+    assert cache.reaproveitadas == {"silver"}
+
+    # Entrada, configuração ou forcar mudam: a etapa executa de novo
+    (dados / "bronze" / "apps.csv").write_text("a,b\n1,3\n", encoding="utf-8")
+    _executar(CacheEtapas(dados), dados, etapa)
+    _executar(CacheEtapas(dados), dados, etapa, {"incremental": True})
+    _executar(CacheEtapas(dados, forcar=True), dados, etapa, {"incremental": True})
+    assert etapa.execucoes == 4
+
+
+def test_restaura_saidas_apagadas_ou_alteradas(dados):
+    etapa = Etapa(dados / "silver", {"apps.csv": "x\n1\n", "resumo.csv": "y\n2\n"})
+    _executar(CacheEtapas(dados), dados, etapa)
+
+    (dados / "silver" / "apps.csv").unlink()
+    (dados / "silver" / "resumo.csv").write_text("alterado\n", encoding="utf-8")
+    _executar(CacheEtapas(dados), dados, etapa)
+
+    assert etapa.execucoes == 1
+    assert (dados / "silver" / "apps.csv").read_text(encoding="utf-8") == "x\n1\n"
+    assert (dados / "silver" / "resumo.csv").read_text(encoding="utf-8") == "y\n2\n"
+
+
+def test_guarda_saidas_que_a_etapa_nao_regravou(dados):
+    # Primeira configuração grava as duas tabelas; a segunda só regrava uma (como um nó da
+    # Gold sem mudança), mas a entrada dela no cache tem de devolver as duas
+    _executar(CacheEtapas(dados), dados, Etapa(dados / "silver", {"apps.csv": "x\n1\n", "resumo.csv": "y\n2\n"}))
+    parcial = Etapa(dados / "silver", {"apps.csv": "x\n9\n"})
+    _executar(CacheEtapas(dados), dados, parcial, {"paralelo": True})
+
+    for arquivo in (dados / "silver").iterdir():
+        arquivo.unlink()
+    _executar(CacheEtapas(dados), dados, parcial, {"paralelo": True})
+
+    assert parcial.execucoes == 1
+    assert (dados / "silver" / "apps.csv").read_text(encoding="utf-8") == "x\n9\n"
+    assert (dados / "silver" / "resumo.csv").read_text(encoding="utf-8") == "y\n2\n"
+
+
+def test_remove_entradas_menos_usadas(dados):
+    etapa = Etapa(dados / "silver", {"apps.csv": "x\n1\n"})
+    for versao in range(3):
+        _executar(CacheEtapas(dados, max_entradas=2), dados, etapa, {"versao": versao})
+    # A versão 1 é usada de novo e passa a ser a mais recente
+    _executar(CacheEtapas(dados, max_entradas=2), dados, etapa, {"versao": 1})
+    assert etapa.execucoes == 3
+
+    cache = CacheEtapas(dados, max_entradas=2)
+    _executar(cache, dados, etapa, {"versao": 3})
+    assert etapa.execucoes == 4
+    assert len(cache.manifesto["etapas"]["silver"]) == 2
+    assert len(list((cache.diretorio / "silver").iterdir())) == 2
+
+    # Versão 1 continua no cache; a 2 (menos usada) saiu
+    _executar(CacheEtapas(dados, max_entradas=2), dados, etapa, {"versao": 1})
+    assert etapa.execucoes == 4
+    _executar(CacheEtapas(dados, max_entradas=2), dados, etapa, {"versao": 2})
+    assert etapa.execucoes == 5
@@ -0,0 +1,104 @@
+# tests/test_consultas.py
+#
+# Serviço de consultas pelo cliente no mesmo processo: filtros, paginação e invalidação
+# quando o pipeline grava uma execução nova (com ou sem snapshots).
+
+import os
+
+import pandas as pd
+import pytest
+
+from armazenamento import caminho_camada, caminho_tabela, ler_tabela, salvar_tabela
+from bronze import processar_camada_bronze
+from consultas import ClienteConsultas, ServicoConsultas
+from contexto import ContextoPipeline
+from gold import processar_camada_gold
+from main import TABELAS_SNAPSHOTS
+from silver import processar_camada_silver
+from snapshots import caminho_snapshot, publicar_do_contexto, publicar_snapshots
+
+DATA_REFERENCIA = pd.Timestamp("2025-07-01")
+
+
+@pytest.fixture
+def diretorio_dados(fontes_sinteticas, tmp_path):
+    processar_camada_bronze(diretorio_dados=tmp_path, fontes_de_dados=fontes_sinteticas)
+    processar_camada_silver(diretorio_dados=tmp_path, data_referencia=DATA_REFERENCIA)
+    processar_camada_gold(diretorio_dados=tmp_path)
+    with ContextoPipeline(diretorio_dados=tmp_path) as contexto:
+        publicar_do_contexto(contexto, TABELAS_SNAPSHOTS, tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def cliente(diretorio_dados):
+    return ClienteConsultas(ServicoConsultas(diretorio_dados, intervalo_verificacao_s=0))
+
+
+def _apps(diretorio_dados):
+    return ler_tabela(caminho_camada("silver", diretorio_dados), "apps_com_metricas", tipar=True)
+
+
+def test_filtros(cliente, diretorio_dados):
+    apps = _apps(diretorio_dados)
+    ambiente = apps["Nome_Ambiente"].dropna().iloc[0]
+
+    status, corpo = cliente.get(f"/tabelas/apps_com_metricas?ambiente={ambiente}&tamanho_pagina=1000")
+    assert status == 200
+    assert corpo["total"] == (apps["Nome_Ambiente"] == ambiente).sum()
+    assert {registro["Nome_Ambiente"] for registro in corpo["registros"]} == {ambiente}
+
+    criador = apps["Nome_Criador"].dropna().iloc[0]
+    trecho = criador[:4].upper()
+    status, corpo = cliente.get(f"/tabelas/apps_com_metricas?proprietario={trecho}&tamanho_pagina=1000")
+    assert status == 200
+    assert corpo["total"] > 0
+    assert criador in {registro["Nome_Criador"] for registro in corpo["registros"]}
+
+    assert cliente.get("/tabelas/nao_existe")[0] == 404
+    assert cliente.get("/tabelas/apps_com_metricas?cor=azul")[0] == 400
+    assert cliente.get("/tabelas/apps_com_metricas?ordenar_por=nao_existe")[0] == 400
+
+
+def test_paginacao(cliente, diretorio_dados):
+    total = len(_apps(diretorio_dados))
+    url = "/tabelas/apps_com_metricas?ordenar_por=usuarios_unicos,ID_App&ordem=asc&tamanho_pagina=7"
+
+    _, primeira = cliente.get(url)
+    assert primeira["total"] == total
+    assert primeira["paginas"] == -(-total // 7)
+
+    ids = []
+    for pagina in range(1, primeira["paginas"] + 1):
+        _, corpo = cliente.get(f"{url}&pagina={pagina}")
+        assert len(corpo["registros"]) == min(7, total - (pagina - 1) * 7)
+        ids += [registro["ID_App"] for registro in corpo["registros"]]
+    _, tudo = cliente.get("/tabelas/apps_com_metricas?ordenar_por=usuarios_unicos,ID_App&ordem=asc&tamanho_pagina=1000")
+    assert ids == [registro["ID_App"] for registro in tudo["registros"]]
+
+    usuarios = [registro["usuarios_unicos"] for registro in tudo["registros"]]
+    assert usuarios == sorted(usuarios)
+
+
+def test_invalidacao(cliente, diretorio_dados):
+    servico = cliente.servico
+    url = "/tabelas/apps_com_metricas?tamanho_pagina=1"
+    apps = _apps(diretorio_dados)
+
+    assert cliente.get(url)[1]["total"] == len(apps)
+    assert cliente.get(url)[1]["total"] == len(apps)
+    assert servico.acertos == 1
+
+    # Execução que grava a Silver sem publicar snapshots: a camada, mais nova, vale
+    silver_path = caminho_camada("silver", diretorio_dados)
+    salvar_tabela(apps.head(10), silver_path, "apps_com_metricas")
+    snapshot = caminho_snapshot("silver", "apps_com_metricas", diretorio_dados).stat().st_mtime
+    os.utime(caminho_tabela(silver_path, "apps_com_metricas"), (snapshot + 1, snapshot + 1))
+    assert cliente.get(url)[1]["total"] == 10
+
+    # Publicação nova de snapshots: o snapshot volta a ser a fonte mais nova
+    publicar_snapshots({("silver", "apps_com_metricas"): apps.head(20)}, diretorio_dados)
+    caminho = caminho_snapshot("silver", "apps_com_metricas", diretorio_dados)
+    os.utime(caminho, (snapshot + 2, snapshot + 2))
+    assert cliente.get(url)[1]["total"] == 20
+    assert servico.acertos == 1
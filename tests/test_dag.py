@@ -0,0 +1,155 @@
+# tests/test_dag.py
+#
+# GrafoTabelas: ordem topológica, erros de declaração, nós pulados quando as entradas não
+# mudam (e relidos com `carregar` quando um dependente recalcula) e propagação de falhas.
+
+from collections import Counter
+
+import pandas as pd
+import pytest
+
+from dag import GrafoTabelas
+
+
+class Execucao:
+    """
+    Grafo de teste (fontes apps e eventos) com contadores de cálculo, gravação e releitura:
+
+        apps ──► ativos ──► resumo ◄── totais ◄── eventos
+          └────► contagem_apps
+
+    ativos é intermediária (não é gravada); com falhar=True, totais levanta erro.
+    """
+
+    def __init__(self, falhar=False):
+        self.calculos = Counter()
+        self.carregadas = []
+        self.gravadas = {}
+        self.estado = {}
+        self.falhar = falhar
+        self.grafo = GrafoTabelas()
+        calculos = self.calculos
+
+        @self.grafo.tabela("ativos", entradas=["apps"], salvar=False)
+        def ativos(apps):
+            calculos["ativos"] += 1
+            return apps[apps["ativo"]]
+
+        @self.grafo.tabela("totais", entradas=["eventos"])
+        def totais(eventos):
+            calculos["totais"] += 1
+            if self.falhar:
+                raise RuntimeError("falha simulada")
+            return eventos.groupby("app", as_index=False)["sessoes"].sum()
+
+        @self.grafo.tabela("resumo", entradas=["ativos", "totais"])
+        def resumo(ativos, totais):
+            calculos["resumo"] += 1
+            return ativos.merge(totais, on="app", how="left")
+
+        @self.grafo.tabela("contagem_apps", entradas=["apps"])
+        def contagem_apps(apps):
+            calculos["contagem_apps"] += 1
+            return pd.DataFrame({"apps": [len(apps)]})
+
+    def gravar(self, nome, df):
+        self.gravadas[nome] = df
+        return len(df)
+
+    def carregar(self, nome):
+        self.carregadas.append(nome)
+        return self.gravadas[nome]
+
+    def executar(self, fontes, **opcoes):
+        return self.grafo.executar(fontes, self.gravar, self.carregar, self.estado, trabalhadores=2, **opcoes)
+
+
+def _fontes(sessoes=(3, 4, 5)):
+    return {
+        "apps": pd.DataFrame({"app": ["a", "b", "c"], "ativo": [True, True, False]}),
+        "eventos": pd.DataFrame({"app": ["a", "a", "b"], "sessoes": list(sessoes)}),
+    }
+
+
+def test_ordem_topologica():
+    ordem = Execucao().grafo.ordem_topologica(_fontes())
+    assert sorted(ordem) == ["ativos", "contagem_apps", "resumo", "totais"]
+    assert ordem.index("ativos") < ordem.index("resumo")
+    assert ordem.index("totais") < ordem.index("resumo")
+
+
+def test_erros_de_declaracao():
+    grafo = GrafoTabelas()
+    grafo.tabela("a", entradas=["b"])(lambda b: b)
+    grafo.tabela("b", entradas=["a"])(lambda a: a)
+    with pytest.raises(ValueError, match="Ciclo"):
+        grafo.ordem_topologica({})
+
+    grafo = GrafoTabelas()
+    grafo.tabela("a", entradas=["fonte_inexistente"])(lambda fonte_inexistente: fonte_inexistente)
+    with pytest.raises(ValueError, match="desconhecidas"):
+        grafo.ordem_topologica({"apps": pd.DataFrame()})
+    with pytest.raises(ValueError, match="já registrada"):
+        grafo.tabela("a", entradas=[])(lambda: pd.DataFrame())
+
+
+def test_pula_nos_sem_mudanca():
+    execucao = Execucao()
+    primeira = execucao.executar(_fontes())
+    assert primeira == {"totais": 2, "resumo": 2, "contagem_apps": 1}
+    assert set(execucao.gravadas) == {"totais", "resumo", "contagem_apps"}
+
+    # Mesmas fontes: só o intermediário (não gravado) é recalculado
+    execucao.calculos.clear()
+    assert execucao.executar(_fontes()) == primeira
+    assert execucao.calculos == Counter({"ativos": 1})
+    assert execucao.carregadas == []
+
+    # Só os eventos mudam: totais e resumo recalculam, contagem_apps é mantida
+    execucao.calculos.clear()
+    resultado = execucao.executar(_fontes(sessoes=(3, 4, 50)))
+    assert execucao.calculos == Counter({"ativos": 1, "totais": 1, "resumo": 1})
+    assert resultado == primeira
+    assert execucao.gravadas["resumo"].set_index("app").loc["b", "sessoes"] == 50
+
+    # recalcular=True ignora o estado
+    execucao.calculos.clear()
+    execucao.executar(_fontes(sessoes=(3, 4, 50)), recalcular=True)
+    assert execucao.calculos == Counter({"ativos": 1, "totais": 1, "resumo": 1, "contagem_apps": 1})
+
+
+def test_reler_entrada_pulada():
+    # totais é mantida, mas resumo recalcula (ativos mudou): totais é relida do disco
+    execucao = Execucao()
+    execucao.executar(_fontes())
+    fontes = _fontes()
+    fontes["apps"]["ativo"] = [True, False, True]
+    execucao.calculos.clear()
+    execucao.executar(fontes)
+
+    assert execucao.carregadas == ["totais"]
+    assert "totais" not in execucao.calculos
+    assert execucao.gravadas["resumo"]["app"].tolist() == ["a", "c"]
+
+
+def test_falha_propaga_aos_dependentes(capsys):
+    execucao = Execucao()
+    execucao.executar(_fontes())
+
+    execucao.falhar = True
+    execucao.calculos.clear()
+    resultado = execucao.executar(_fontes(sessoes=(1, 1, 1)))
+
+    # Os nós independentes continuam; os dependentes da falha não são calculados
+    assert resultado == {"contagem_apps": 1}
+    assert execucao.calculos == Counter({"ativos": 1, "totais": 1})
+    assert "totais" not in execucao.estado
+    saida = capsys.readouterr().out
+    assert "Erro ao gerar totais" in saida
+    assert "resumo: não calculada" in saida
+
+    # Sem estado da tabela que falhou, a próxima execução recalcula
+    execucao.falhar = False
+    execucao.calculos.clear()
+    assert execucao.executar(_fontes(sessoes=(1, 1, 1))) == {"totais": 2, "resumo": 2, "contagem_apps": 1}
+    assert execucao.calculos["totais"] == 1
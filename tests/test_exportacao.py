@@ -0,0 +1,66 @@
+# tests/test_exportacao.py
+#
+# Exportação particionada por ambiente: partições sem mudança não são regravadas, só as que
+# mudaram; partições que deixaram de existir são removidas.
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from exportacao import caminho_exportacao, exportar, ler_manifesto
+
+
+def _apps(usuarios_env2=5):
+    return pd.DataFrame({
+        "ID_App": ["a1", "a2", "a3", "a4", "a5"],
+        "Nome_Ambiente": ["env1", "env2", "env1", "env3", None],
+        "usuarios_unicos": [10, usuarios_env2, 3, 7, 1],
+    })
+
+
+def _exportar(df, diretorio, **opcoes):
+    return exportar({("silver", "apps"): df}, diretorio, excel=False, **opcoes)
+
+
+def _arquivos(diretorio):
+    """{arquivo relativo: inode}: os.replace troca o inode de todo arquivo regravado."""
+    raiz = caminho_exportacao(diretorio) / "silver" / "apps"
+    return {arquivo.relative_to(raiz).as_posix(): arquivo.stat().st_ino
+            for arquivo in raiz.rglob("*.parquet")}
+
+
+@pytest.mark.parametrize("hive", [False, True], ids=["pasta", "hive"])
+def test_regrava_so_particoes_alteradas(tmp_path, hive):
+    assert _exportar(_apps(), tmp_path, hive=hive) == {"silver/apps": 5}
+    antes = _arquivos(tmp_path)
+    assert len(antes) == 4
+
+    # Mesmos dados em outra ordem: nada é regravado nem o manifesto muda
+    manifesto = ler_manifesto(tmp_path)
+    assert _exportar(_apps().iloc[::-1], tmp_path, hive=hive) == {}
+    assert _arquivos(tmp_path) == antes
+    assert ler_manifesto(tmp_path) == manifesto
+
+    # Só env2 muda: só a partição dela é regravada
+    assert _exportar(_apps(usuarios_env2=50), tmp_path, hive=hive) == {"silver/apps": 1}
+    depois = _arquivos(tmp_path)
+    alterados = [arquivo for arquivo in antes if depois[arquivo] != antes[arquivo]]
+    assert len(alterados) == 1 and "env2" in alterados[0]
+
+    tabela = pq.read_table(caminho_exportacao(tmp_path) / "silver" / "apps" / alterados[0])
+    assert tabela.column("usuarios_unicos").to_pandas().astype(int).tolist() == [50]
+
+
+def test_regrava_particao_apagada_e_remove_obsoletas(tmp_path):
+    _exportar(_apps(), tmp_path)
+    raiz = caminho_exportacao(tmp_path) / "silver" / "apps"
+
+    (raiz / "env1.parquet").unlink()
+    assert _exportar(_apps(), tmp_path) == {"silver/apps": 2}
+    assert (raiz / "env1.parquet").exists()
+
+    # env3 some da tabela: o arquivo é removido e as demais partições ficam como estão
+    antes = _arquivos(tmp_path)
+    assert _exportar(_apps()[lambda df: df["Nome_Ambiente"] != "env3"], tmp_path) == {}
+    assert set(_arquivos(tmp_path)) == set(antes) - {"env3.parquet"}
+    assert "env3" not in ler_manifesto(tmp_path)["tabelas"]["silver/apps"]["particoes"]
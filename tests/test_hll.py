@@ -0,0 +1,37 @@
+# tests/test_hll.py
+#
+# Esboços HyperLogLog: contagem exata no modo esparso e margem de erro só no modo denso.
+
+import numpy as np
+
+from hll import EsbocosHLL, erro_da_precisao, limite_esparso
+
+PRECISAO = 12
+
+
+def _esbocos():
+    # App "pequeno" com 5 usuários (esparso) e app "grande" com 5000 (denso)
+    usuarios_grandes = [f"u{i}@x.com" for i in range(5000)]
+    chaves = ["pequeno"] * 5 + ["grande"] * len(usuarios_grandes)
+    valores = [f"p{i}@x.com" for i in range(5)] + usuarios_grandes
+    return EsbocosHLL.de_eventos(chaves, valores, PRECISAO)
+
+
+def test_margem_zero_no_modo_esparso():
+    esbocos = _esbocos()
+    assert 5000 > limite_esparso(PRECISAO)
+    estimativa = esbocos.estimar()
+    margem = esbocos.margem(estimativa)
+
+    assert estimativa["pequeno"] == 5
+    assert margem["pequeno"] == 0
+    assert np.isclose(margem["grande"], estimativa["grande"] * erro_da_precisao(PRECISAO))
+    assert abs(estimativa["grande"] - 5000) <= 3 * margem["grande"]
+
+
+def test_mesclar_mantem_contagem_exata():
+    a = EsbocosHLL.de_eventos(["app"] * 3, ["a", "b", "c"], PRECISAO)
+    b = EsbocosHLL.de_eventos(["app"] * 3, ["c", "d", "e"], PRECISAO)
+    unido = a.mesclar(b)
+    assert unido.estimar()["app"] == 5
+    assert unido.margem()["app"] == 0
@@ -0,0 +1,63 @@
+# tests/test_incremental.py
+#
+# Métricas incrementais (marca d'água, eventos atrasados na marca, estado de pares ou de
+# esboços): depois de cargas incrementais o resultado tem de ser igual ao recálculo completo
+# no mesmo modo.
+
+import pandas as pd
+import pytest
+
+from armazenamento import caminho_camada, salvar_tabela
+from incremental import COLUNA_ID_EVENTO, atualizar_metricas_incrementais
+from silver import calcular_metricas_uso, calcular_metricas_uso_aproximadas
+
+
+@pytest.fixture(scope="module")
+def auditoria(fontes_sinteticas):
+    return pd.read_csv(fontes_sinteticas["auditoria"], dtype=str)
+
+
+def _gravar_bronze(df, diretorio, formato):
+    salvar_tabela(df, caminho_camada("bronze", diretorio), "auditoria", formato)
+
+
+def _atualizar(diretorio, formato, erro_hll):
+    return atualizar_metricas_incrementais(caminho_camada("bronze", diretorio), formato=formato,
+                                           diretorio_dados=diretorio, erro_hll=erro_hll)
+
+
+def _ordenar(df):
+    colunas = ['admin_appinternalname', 'usuarios_unicos', 'sessoes_totais']
+    return df[colunas].astype({'admin_appinternalname': str}).sort_values(colunas[0], ignore_index=True)
+
+
+@pytest.mark.parametrize("formato", ["csv", "parquet"])
+@pytest.mark.parametrize("com_id", [True, False], ids=["id_evento", "conteudo"])
+@pytest.mark.parametrize("erro_hll", [None, 0.02], ids=["exato", "hll"])
+def test_incremental_igual_ao_recalculo(auditoria, tmp_path, formato, com_id, erro_hll):
+    # Com o Id do evento ou, sem ele, eventos identificados pelo conteúdo (app, usuário, horário)
+    df = auditoria.rename(columns={"Id": COLUNA_ID_EVENTO}) if com_id else auditoria.drop(columns="Id")
+    df = df.sort_values("Creation Time", kind="stable", ignore_index=True)
+    marca = df["Creation Time"].iloc[len(df) * 3 // 5]
+    primeira_carga = df[df["Creation Time"] <= marca]
+
+    # Evento atrasado: chega na segunda carga com o mesmo horário da marca d'água
+    atrasado = primeira_carga.iloc[[-1]].copy()
+    atrasado["User UPN"] = "atrasado@x.com"
+    if com_id:
+        atrasado[COLUNA_ID_EVENTO] = "atrasado-1"
+    completo = pd.concat([primeira_carga, atrasado, df[df["Creation Time"] > marca]], ignore_index=True)
+
+    _gravar_bronze(primeira_carga, tmp_path, formato)
+    _atualizar(tmp_path, formato, erro_hll)
+    _gravar_bronze(completo, tmp_path, formato)
+    _atualizar(tmp_path, formato, erro_hll)
+    # Sem eventos novos o estado não muda (nada é contado duas vezes)
+    resultado = _atualizar(tmp_path, formato, erro_hll)
+
+    # No modo HLL, a união dos esboços de cada carga é igual ao esboço de todo o log
+    if erro_hll is None:
+        esperado = calcular_metricas_uso(completo)
+    else:
+        esperado, _ = calcular_metricas_uso_aproximadas(completo, erro_hll)
+    pd.testing.assert_frame_equal(_ordenar(resultado), _ordenar(esperado), check_dtype=False)
@@ -0,0 +1,86 @@
+# tests/test_lote.py
+#
+# Modo lote: validação do manifesto de tenants e isolamento entre tenants (um tenant que
+# falha não interrompe os outros nem entra no consolidado).
+
+import json
+
+import pandas as pd
+import pytest
+
+from armazenamento import caminho_camada, ler_tabela
+from lote import DIRETORIO_CONSOLIDADO, DIRETORIO_LOTE, carregar_manifesto, processar_lote
+
+DATA_REFERENCIA = pd.Timestamp("2025-07-01")
+
+FONTES = {"apps": "apps.csv", "ambientes": "ambientes.csv", "auditoria": "auditoria.csv",
+          "usuarios": "usuarios.csv"}
+
+
+def _gravar_manifesto(diretorio, manifesto):
+    caminho = diretorio / "manifesto.json"
+    caminho.write_text(json.dumps(manifesto), encoding="utf-8")
+    return caminho
+
+
+def test_manifesto_resolve_fontes_e_parametros(tmp_path):
+    caminho = _gravar_manifesto(tmp_path, {
+        "parametros_ranking": {"top_proprietarios": 30, "top_apps": 10},
+        "tenants": [
+            {"nome": "tenant_a", "fontes": FONTES, "parametros_ranking": {"top_apps": 20}},
+            {"nome": "tenant-b", "fontes": FONTES, "parametros_regras": {"limiar_produtividade_pessoal": 5}},
+        ],
+    })
+    tenants, ranking_geral = carregar_manifesto(caminho)
+
+    assert ranking_geral == {"top_proprietarios": 30, "top_apps": 10}
+    assert [tenant["nome"] for tenant in tenants] == ["tenant_a", "tenant-b"]
+    assert tenants[0]["fontes"]["apps"] == str(tmp_path / "apps.csv")
+    assert tenants[0]["parametros_ranking"] == {"top_proprietarios": 30, "top_apps": 20}
+    assert tenants[1]["parametros_ranking"] == ranking_geral
+    assert tenants[1]["parametros_regras"] == {"limiar_produtividade_pessoal": 5}
+
+
+@pytest.mark.parametrize("tenants, mensagem", [
+    ([], "sem tenants"),
+    ([{"nome": "../fora", "fontes": FONTES}], "Nome de tenant inválido"),
+    ([{"fontes": FONTES}], "Nome de tenant inválido"),
+    ([{"nome": "a", "fontes": FONTES}, {"nome": "a", "fontes": FONTES}], "Tenant repetido"),
+    ([{"nome": "a", "fontes": {"apps": "apps.csv"}}], "sem as fontes: ambientes, auditoria, usuarios"),
+    ([{"nome": "a", "fontes": FONTES, "parametros_regras": {"limiar": 3}}], "parâmetros de regras desconhecidos: limiar"),
+], ids=["vazio", "nome_com_barra", "sem_nome", "repetido", "fontes_faltando", "regra_desconhecida"])
+def test_manifesto_invalido(tmp_path, tenants, mensagem):
+    caminho = _gravar_manifesto(tmp_path, {"tenants": tenants})
+    with pytest.raises(ValueError, match=mensagem):
+        carregar_manifesto(caminho)
+
+
+def _consolidado(diretorio):
+    caminho = caminho_camada(f"{DIRETORIO_LOTE}/{DIRETORIO_CONSOLIDADO}/gold", diretorio)
+    return {nome: ler_tabela(caminho, nome, tipar=True)
+            for nome in ("resumo_tenants", "analise_por_ambiente", "top_proprietarios", "metricas_executivas_kpis")}
+
+
+def test_tenant_com_erro_nao_interrompe_os_outros(fontes_sinteticas, tmp_path):
+    tenants = [
+        {"nome": nome, "fontes": fontes_sinteticas, "parametros_regras": {}, "parametros_ranking": {}}
+        for nome in ("norte", "quebrado", "sul")
+    ]
+    tenants[1]["fontes"] = {**fontes_sinteticas, "auditoria": str(tmp_path / "inexistente.csv")}
+
+    registros, erros = processar_lote(tenants, diretorio_dados=tmp_path / "lote", simultaneos=3,
+                                      data_referencia=DATA_REFERENCIA)
+
+    assert set(erros) == {"quebrado"}
+    assert "Bronze" in str(erros["quebrado"])
+    assert set(registros) == {"norte", "sul"}
+    consolidado = _consolidado(tmp_path / "lote")
+    assert consolidado["resumo_tenants"]["Tenant"].tolist() == ["norte", "sul"]
+    for nome, tabela in consolidado.items():
+        assert set(tabela["Tenant"]) == {"norte", "sul"}, nome
+
+    # O consolidado é o mesmo de um lote só com os tenants que deram certo
+    processar_lote([tenants[0], tenants[2]], diretorio_dados=tmp_path / "sem_falha", simultaneos=2,
+                   data_referencia=DATA_REFERENCIA)
+    for nome, tabela in _consolidado(tmp_path / "sem_falha").items():
+        pd.testing.assert_frame_equal(consolidado[nome], tabela, obj=nome)
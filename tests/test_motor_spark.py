@@ -0,0 +1,99 @@
+# tests/test_motor_spark.py
+#
+# Paridade do motor Spark (modo local) com o pandas: as mesmas regras e a mesma
+# transformação da Silver devem dar o mesmo resultado. Pulado sem pyspark/delta-spark.
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyspark")
+pytest.importorskip("delta")
+
+from armazenamento import caminho_camada, ler_tabela  # noqa: E402
+from bronze import processar_camada_bronze  # noqa: E402
+from dimensoes import carregar_dimensoes  # noqa: E402
+from motor_spark import aplicar_regras_spark, criar_sessao_spark, transformar_silver_spark  # noqa: E402
+from regras import REGRAS_CLASSIFICACAO, aplicar_regras  # noqa: E402
+from silver import COLUNAS_APPS, COLUNAS_AUDITORIA, calcular_metricas_uso, transformar_apps  # noqa: E402
+
+# Data fixa: Dias_Sem_Uso (e as regras que dependem dele) não variam com o dia do teste
+DATA_REFERENCIA = pd.Timestamp("2025-07-01")
+
+COLUNAS_REGRAS = ['Dias_Sem_Uso', *[regra["coluna"] for regra in REGRAS_CLASSIFICACAO], 'Score_Limpeza']
+COLUNAS_SILVER = ['ID_App', 'ID_Ambiente', 'Nome_Ambiente', 'usuarios_unicos', 'sessoes_totais',
+                  'total_proprietarios', *COLUNAS_REGRAS]
+
+
+@pytest.fixture(scope="module")
+def spark():
+    sessao = criar_sessao_spark("local[1]", nome_app="CoEGovernancaTestes")
+    # Conversão pandas → Spark pelo Arrow: nulos do pandas (NaN, NA, NaT) viram nulos do Spark
+    sessao.conf.set("spark.sql.execution.arrow.pyspark.enabled", "true")
+    yield sessao
+    sessao.stop()
+
+
+@pytest.fixture(scope="module")
+def bronze_path(fontes_sinteticas, tmp_path_factory):
+    diretorio = tmp_path_factory.mktemp("dados")
+    processar_camada_bronze(diretorio_dados=diretorio, fontes_de_dados=fontes_sinteticas)
+    return caminho_camada("bronze", diretorio)
+
+
+def _para_spark(spark, df):
+    # Colunas de texto (inclusive categóricas) com tipo explícito: colunas só com nulos
+    # continuam string, como nas tabelas Delta da Bronze
+    textos = {
+        coluna: "string" for coluna in df.columns
+        if isinstance(df[coluna].dtype, pd.CategoricalDtype) or pd.api.types.is_string_dtype(df[coluna])
+    }
+    return spark.createDataFrame(df.astype(textos))
+
+
+def _valor(valor):
+    # Mesma representação nos dois motores: o toPandas devolve inteiros com nulos como float
+    if pd.isna(valor):
+        return None
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    return str(valor)
+
+
+def _normalizar(df, colunas):
+    return df[colunas].sort_values('ID_App').reset_index(drop=True).astype(object).map(_valor)
+
+
+def _silver_pandas(bronze_path):
+    # Os mesmos passos de silver.processar_camada_silver até transformar_apps
+    df_apps = ler_tabela(bronze_path, "apps", colunas=COLUNAS_APPS, compacto=True)
+    df_apps = df_apps[~df_apps['admin_appdeleted'].fillna(False).to_numpy(dtype=bool)]
+    df_apps = df_apps[df_apps['admin_powerappstype'] != '597910003']
+    dim_usuarios, dim_ambientes = carregar_dimensoes(bronze_path, "csv")
+    df_metricas = calcular_metricas_uso(ler_tabela(bronze_path, "auditoria", colunas=COLUNAS_AUDITORIA))
+    return transformar_apps(df_apps, df_metricas, dim_usuarios, dim_ambientes, data_referencia=DATA_REFERENCIA)
+
+
+def test_regras_spark_iguais_ao_pandas(spark, bronze_path):
+    entrada = _silver_pandas(bronze_path).drop(columns=COLUNAS_REGRAS)
+    esperado = aplicar_regras(entrada, data_referencia=DATA_REFERENCIA)
+
+    obtido = aplicar_regras_spark(_para_spark(spark, entrada), data_referencia=DATA_REFERENCIA)
+    colunas = ['ID_App', *COLUNAS_REGRAS]
+    pd.testing.assert_frame_equal(
+        _normalizar(obtido.select(*colunas).toPandas(), colunas),
+        _normalizar(esperado, colunas)
+    )
+
+
+def test_transformar_silver_spark_igual_ao_pandas(spark, bronze_path):
+    esperado = _silver_pandas(bronze_path)
+
+    fontes = [
+        _para_spark(spark, ler_tabela(bronze_path, nome))
+        for nome in ("apps", "ambientes", "auditoria", "usuarios")
+    ]
+    obtido, _, _ = transformar_silver_spark(*fontes, data_referencia=DATA_REFERENCIA)
+    pd.testing.assert_frame_equal(
+        _normalizar(obtido.select(*COLUNAS_SILVER).toPandas(), COLUNAS_SILVER),
+        _normalizar(esperado, COLUNAS_SILVER)
+    )
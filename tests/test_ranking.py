@@ -0,0 +1,51 @@
+# tests/test_ranking.py
+#
+# Seleção parcial dos rankings (ranking.py) contra a ordenação completa do pandas, com
+# muitos empates, nulos e vários critérios de desempate.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ranking import posicoes_top_k, selecionar_top_k_por_grupo
+
+
+def _dados(semente, n=200):
+    rng = np.random.default_rng(semente)
+    df = pd.DataFrame({
+        # Poucos valores distintos: empates em todas as colunas
+        "usuarios": rng.integers(0, 5, n).astype(float),
+        "sessoes": rng.integers(0, 3, n),
+        "complexidade": rng.integers(0, 2, n).astype(float),
+        "ambiente": rng.choice(["env1", "env2", "env3"], n),
+    })
+    df.loc[rng.random(n) < 0.1, "usuarios"] = np.nan
+    df.loc[rng.random(n) < 0.1, "complexidade"] = np.nan
+    return df
+
+
+def _ordenacao_completa(df, colunas):
+    return df.sort_values(colunas, ascending=False, kind="stable", na_position="last")
+
+
+@pytest.mark.parametrize("semente", range(5))
+@pytest.mark.parametrize("colunas", [["usuarios"], ["usuarios", "sessoes"], ["sessoes", "complexidade", "usuarios"]])
+@pytest.mark.parametrize("k", [0, 1, 7, 50, 200, 500])
+def test_top_k_igual_a_ordenacao_completa(semente, colunas, k):
+    df = _dados(semente)
+    esperado = _ordenacao_completa(df, colunas).head(k).index.to_numpy()
+    assert df.index[posicoes_top_k(df, colunas, k)].tolist() == esperado.tolist()
+
+
+@pytest.mark.parametrize("semente", range(3))
+def test_top_k_por_grupo(semente):
+    df = _dados(semente)
+    colunas = ["usuarios", "sessoes"]
+    resultado = selecionar_top_k_por_grupo(df, "ambiente", colunas, 5)
+
+    for ambiente, grupo in resultado.groupby("ambiente", sort=False):
+        esperado = _ordenacao_completa(df[df["ambiente"] == ambiente], colunas).head(5)
+        assert grupo.index.tolist() == esperado.index.tolist()
+        assert grupo["Posicao"].tolist() == list(range(1, len(esperado) + 1))
+    # Grupos na ordem de primeira aparição
+    assert resultado["ambiente"].unique().tolist() == df["ambiente"].unique().tolist()
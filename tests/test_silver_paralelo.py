@@ -0,0 +1,36 @@
+# tests/test_silver_paralelo.py
+#
+# Paridade da Silver em paralelo (partições em processos) com a sequencial: as mesmas
+# tabelas, nas mesmas linhas e na mesma ordem.
+
+import pandas as pd
+import pytest
+
+from armazenamento import caminho_camada, ler_tabela
+from bronze import processar_camada_bronze
+from silver import processar_camada_silver
+
+# Data fixa: Dias_Sem_Uso (e as regras que dependem dele) não variam com o dia do teste
+DATA_REFERENCIA = pd.Timestamp("2025-07-01")
+
+TABELAS = ["apps_com_metricas", "apps_alta_adocao", "apps_limpeza", "resumo_por_ambiente",
+           "resumo_por_proprietario", "metricas_uso_auditoria", "uso_diario"]
+
+
+def _silver(fontes, diretorio, **opcoes):
+    processar_camada_bronze(diretorio_dados=diretorio, fontes_de_dados=fontes)
+    resultado = processar_camada_silver(diretorio_dados=diretorio, data_referencia=DATA_REFERENCIA, **opcoes)
+    assert resultado, "a camada Silver falhou"
+    silver_path = caminho_camada("silver", diretorio)
+    return {nome: ler_tabela(silver_path, nome, tipar=True) for nome in TABELAS}
+
+
+@pytest.mark.parametrize("usuarios_aproximados", [False, True], ids=["exato", "hll"])
+def test_paralelo_igual_ao_sequencial(fontes_sinteticas, tmp_path, usuarios_aproximados):
+    sequencial = _silver(fontes_sinteticas, tmp_path / "sequencial", usuarios_aproximados=usuarios_aproximados)
+    paralelo = _silver(fontes_sinteticas, tmp_path / "paralelo", usuarios_aproximados=usuarios_aproximados,
+                       paralelo=True, trabalhadores=3)
+
+    for nome in TABELAS:
+        assert len(sequencial[nome]) > 0, nome
+        pd.testing.assert_frame_equal(paralelo[nome], sequencial[nome], obj=nome)